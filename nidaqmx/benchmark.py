@@ -0,0 +1,286 @@
+"""
+Micro- and macrobenchmarks of the nidaqmx package.
+
+The benchmarks are run by the ``nidaqmx.bench`` script (see
+`main`). Results are printed as JSON with latency percentiles, so
+that runs against different driver versions, devices or machines can
+be compared. Set the ``NIDAQMX_LIBRARY`` environment variable to
+benchmark another driver library, and use NI-DAQmx simulated devices
+to run the benchmarks without hardware.
+
+Available benchmarks:
+
+  call
+    Overhead of `nidaqmx.libnidaqmx.CALL` for a trivial driver call.
+  scalar_read, scalar_write
+    Rate of on-demand single-sample AI reads and AO writes.
+  ai_read
+    Buffered AI read throughput at several chunk sizes.
+  ao_write
+    Buffered AO write throughput.
+  di_read
+    On-demand DI read rate in line-per-byte and packed modes.
+  callback
+    Every N samples event dispatch rate.
+"""
+
+from __future__ import print_function, division, absolute_import
+
+import sys
+import json
+import time
+import ctypes
+import socket
+import platform
+from optparse import OptionParser
+
+import numpy as np
+
+from . import libnidaqmx
+from .libnidaqmx import (CALL, System, AnalogInputTask, AnalogOutputTask,
+                         DigitalInputTask, uInt32)
+
+__all__ = ['run_benchmarks', 'main']
+
+benchmark_names = ['call', 'scalar_read', 'scalar_write', 'ai_read',
+                   'ao_write', 'di_read', 'callback']
+
+timer = getattr(time, 'perf_counter', time.time)
+
+def summarize(durations, count=1):
+    """
+    Returns statistics of per-iteration ``durations`` in seconds.
+
+    Parameters
+    ----------
+
+    durations : sequence
+      The duration of each iteration.
+
+    count : int
+      The number of items (samples, calls) processed per iteration,
+      used to compute the rate.
+    """
+    # pylint: disable=no-member
+    d = np.asarray(durations, dtype=np.float64)
+    if not d.size:
+        return dict(iterations=0)
+    p50, p90, p99 = np.percentile(d, [50, 90, 99])
+    total = d.sum()
+    return dict(iterations=int(d.size),
+                mean=float(d.mean()), min=float(d.min()), max=float(d.max()),
+                p50=float(p50), p90=float(p90), p99=float(p99),
+                rate=float(d.size * count / total) if total > 0 else None)
+
+def _time_calls(func, iterations):
+    durations = np.empty(iterations, dtype=np.float64) # pylint: disable=no-member
+    for i in range(iterations):
+        t = timer()
+        func()
+        durations[i] = timer() - t
+    return durations
+
+def bench_call(options):
+    d = uInt32(0)
+    ref = ctypes.byref(d)
+    return summarize(_time_calls(lambda: CALL('GetSysNIDAQMajorVersion', ref),
+                                 options.iterations))
+
+def bench_scalar_read(options):
+    task = AnalogInputTask()
+    try:
+        task.create_voltage_channel('%s/ai0' % (options.device), min_val=-10, max_val=10)
+        task.read_scalar()
+        return summarize(_time_calls(task.read_scalar, options.iterations))
+    finally:
+        task.clear()
+
+def bench_scalar_write(options):
+    task = AnalogOutputTask()
+    try:
+        task.create_voltage_channel('%s/ao0' % (options.device), min_val=-10, max_val=10)
+        return summarize(_time_calls(lambda: task.write(0.0), options.iterations))
+    finally:
+        task.clear()
+
+def bench_ai_read(options):
+    results = {}
+    for chunk in options.chunk_sizes:
+        task = AnalogInputTask()
+        try:
+            task.create_voltage_channel('%s/ai0' % (options.device), min_val=-10, max_val=10)
+            task.configure_timing_sample_clock(rate=options.rate,
+                                               samples_per_channel=max(4*chunk, 1000))
+            task.start()
+            durations = []
+            end = timer() + options.duration
+            while timer() < end:
+                t = timer()
+                task.read(chunk)
+                durations.append(timer() - t)
+            task.stop()
+            results[str(chunk)] = summarize(durations, chunk)
+        finally:
+            task.clear()
+    return results
+
+def bench_ao_write(options):
+    chunk = max(options.chunk_sizes)
+    task = AnalogOutputTask()
+    try:
+        task.create_voltage_channel('%s/ao0' % (options.device), min_val=-10, max_val=10)
+        task.configure_timing_sample_clock(rate=options.rate,
+                                           samples_per_channel=4*chunk)
+        task.set_regeneration(False)
+        data = np.zeros(chunk, dtype=np.float64) # pylint: disable=no-member
+        for i in range(4):
+            task.write(data, auto_start=False)
+        task.start()
+        durations = []
+        end = timer() + options.duration
+        while timer() < end:
+            t = timer()
+            task.write(data, auto_start=False)
+            durations.append(timer() - t)
+        task.stop()
+        return summarize(durations, chunk)
+    finally:
+        task.clear()
+
+def bench_di_read(options):
+    results = {}
+    for mode in ['lines', 'packed']:
+        task = DigitalInputTask()
+        try:
+            if mode == 'lines':
+                task.create_channel('%s/port0/line0:7' % (options.device))
+                read = lambda: task.read(1)
+            else:
+                task.create_channel('%s/port0/line0:7' % (options.device),
+                                    grouping='for_all_lines')
+                read = lambda: task.read_packed(1)
+            task.start()
+            results[mode] = summarize(_time_calls(read, options.iterations))
+            task.stop()
+        finally:
+            task.clear()
+    return results
+
+def bench_callback(options):
+    samples = max(1, int(options.rate // 1000))
+    times = []
+    def callback(task, event_type, samples, cb_data):
+        times.append(timer())
+        return 0
+    task = AnalogInputTask()
+    try:
+        task.create_voltage_channel('%s/ai0' % (options.device), min_val=-10, max_val=10)
+        task.configure_timing_sample_clock(rate=options.rate,
+                                           samples_per_channel=100*samples)
+        task.set_read_overwrite('overwrite')
+        task.register_every_n_samples_event(callback, samples=samples)
+        task.start()
+        time.sleep(options.duration)
+        task.stop()
+    finally:
+        task.clear()
+    result = summarize(np.diff(times), samples) # pylint: disable=no-member
+    result['samples_per_event'] = samples
+    result['expected_interval'] = samples / options.rate
+    return result
+
+def run_benchmarks(options, names=None):
+    """
+    Runs benchmarks and returns their results as a dictionary.
+
+    Parameters
+    ----------
+
+    options :
+      An object with attributes ``device``, ``iterations``,
+      ``duration``, ``rate`` and ``chunk_sizes``, see `main`.
+
+    names : {list, None}
+      The names of benchmarks to run, by default all of
+      `benchmark_names`.
+
+    Returns
+    -------
+
+    report : dict
+      The ``meta`` item describes the system, the ``results`` item
+      holds the results of every benchmark or the error that it
+      raised.
+    """
+    if names is None:
+        names = benchmark_names
+    system = System()
+    meta = dict(time=time.strftime('%Y-%m-%dT%H:%M:%S'),
+                host=socket.gethostname(),
+                platform=platform.platform(),
+                python=platform.python_version(),
+                numpy=np.__version__,
+                driver_version=system.version,
+                device=options.device,
+                iterations=options.iterations,
+                duration=options.duration,
+                rate=options.rate)
+    try:
+        meta['product_type'] = str(libnidaqmx.Device(options.device).get_product_type())
+    except RuntimeError as msg:
+        meta['product_type'] = None
+        print('Failed to query %s: %s' % (options.device, msg), file=sys.stderr)
+    results = {}
+    for name in names:
+        func = globals()['bench_' + name]
+        print('Running %s benchmark' % (name), file=sys.stderr)
+        try:
+            results[name] = func(options)
+        except Exception as msg: # pylint: disable=broad-except
+            results[name] = dict(error=str(msg))
+    return dict(meta=meta, results=results)
+
+def main(argv=None):
+    """
+    Entry point of the ``nidaqmx.bench`` script.
+    """
+    parser = OptionParser(usage='''\
+%prog [options]
+
+Description:
+  %prog runs nidaqmx benchmarks and prints the results as JSON.
+  Benchmarks: ''' + ', '.join(benchmark_names))
+    parser.add_option('--device', type='string',
+                      help='Device to benchmark. Default: first device of the system.')
+    parser.add_option('--benchmarks', type='string', default=','.join(benchmark_names),
+                      help='Comma separated list of benchmarks. Default: %default.')
+    parser.add_option('--iterations', type='int', default=1000,
+                      help='Iterations of call benchmarks. Default: %default.')
+    parser.add_option('--duration', type='float', default=2.0,
+                      help='Seconds to run streaming benchmarks. Default: %default.')
+    parser.add_option('--rate', type='float', default=100e3,
+                      help='Sample clock rate of streaming benchmarks. Default: %default.')
+    parser.add_option('--chunk-sizes', type='string', default='100,1000,10000',
+                      help='Comma separated samples per read. Default: %default.')
+    parser.add_option('--output', type='string',
+                      help='File to write the JSON report to. Default: stdout.')
+    options, args = parser.parse_args(argv)
+    options.chunk_sizes = [int(c) for c in options.chunk_sizes.split(',')]
+    if options.device is None:
+        devices = System().devices
+        if not devices:
+            parser.error('No NI-DAQ devices found, use --device.')
+        options.device = devices[0]
+    options.device = str(options.device)
+    names = [n.strip() for n in options.benchmarks.split(',') if n.strip()]
+    for name in names:
+        if name not in benchmark_names:
+            parser.error('Unknown benchmark %r' % (name))
+    report = run_benchmarks(options, names)
+    text = json.dumps(report, indent=2, sort_keys=True)
+    if options.output:
+        with open(options.output, 'w') as f:
+            f.write(text + '\n')
+    else:
+        print(text)
+    return 0
@@ -0,0 +1,281 @@
+"""
+Helpers for processing counter input streams.
+
+.. autosummary::
+
+  CounterUnwrapper
+  EncoderPipeline
+
+Example usage
+=============
+
+The following example logs rising edges counted by ``Dev1/ctr0`` as
+monotonic 64-bit counts, no matter how often the 32-bit count
+register rolls over::
+
+>>> from nidaqmx import CounterInputTask
+>>> from nidaqmx.counters import CounterUnwrapper
+>>> task = CounterInputTask()
+>>> task.create_channel_count_edges('Dev1/ctr0')
+>>> task.configure_timing_sample_clock(source='/Dev1/PFI9', rate=1e6)
+>>> unwrapper = CounterUnwrapper()
+>>> task.start()
+>>> while True:
+...     counts = unwrapper.update(task.read(100000))
+
+Position, velocity and acceleration of a linear encoder sampled at
+10 kHz, smoothed over 20 samples, are obtained with::
+
+>>> from nidaqmx.counters import EncoderPipeline
+>>> task = CounterInputTask()
+>>> task.create_channel_linear_encoder('Dev1/ctr0', decodingType='X4',
+...                                    units='Meters', distPerPulse=1e-6)
+>>> task.configure_timing_sample_clock(source='/Dev1/PFI9', rate=1e4)
+>>> pipeline = EncoderPipeline(1e4, window=20)
+>>> task.start()
+>>> while True:
+...     position, velocity, acceleration = pipeline.read(task, 1000)
+
+"""
+
+from __future__ import print_function, division, absolute_import
+
+import numpy as np
+
+__all__ = ['CounterUnwrapper', 'EncoderPipeline']
+
+class CounterUnwrapper(object):
+    """
+    Unwraps rollovers of a counter register into monotonic 64-bit
+    counts across consecutive read chunks.
+
+    Parameters
+    ----------
+
+    bits : int
+      The width of the counter register. Use 32 for M and X Series
+      devices and 24 for E Series devices.
+
+    bidirectional : bool
+      If False then the counter is assumed to count up only and
+      consecutive samples may differ by up to ``2**bits - 1``
+      counts. If True, for instance for counters with
+      ``direction='ext'``, consecutive samples are assumed to differ
+      by less than ``2**(bits-1)`` counts in either direction.
+
+    Attributes
+    ----------
+
+    last : {int, None}
+      The last unwrapped count, None before the first update.
+    rollovers : int
+      The number of register rollovers seen so far.
+    """
+
+    def __init__(self, bits=32, bidirectional=False):
+        self.bits = bits
+        self.bidirectional = bidirectional
+        self._mask = (1 << bits) - 1
+        self.reset()
+
+    def reset(self):
+        """
+        Forget the state so that the next chunk starts a new stream.
+        """
+        self.last = None
+        self._last_raw = None
+        self.rollovers = 0
+
+    def update(self, data, out=None):
+        """
+        Unwraps a chunk of raw counter samples.
+
+        Parameters
+        ----------
+
+        data : array
+          Raw counter samples as returned by
+          `nidaqmx.CounterInputTask.read`. Signed 32-bit arrays are
+          interpreted as unsigned.
+
+        out : {array, None}
+          An optional ``int64`` array of at least ``len(data)``
+          elements to write the unwrapped counts to.
+
+        Returns
+        -------
+
+        counts : array
+          The unwrapped ``int64`` counts, a view of `out` when given.
+        """
+        # pylint: disable=no-member
+        data = np.asarray(data).ravel()
+        if data.dtype.kind == 'i':
+            data = data.view(data.dtype.str.replace('i', 'u'))
+        n = data.size
+        if out is None:
+            out = np.empty(n, dtype=np.int64)
+        else:
+            out = out[:n]
+        if not n:
+            return out
+        mask = self._mask
+        # The deltas between consecutive raw samples are computed in
+        # place in the output buffer and summed up afterwards.
+        np.bitwise_and(data, np.uint64(mask), out=out, casting='unsafe')
+        first_raw, last_raw = int(out[0]), int(out[-1])
+        out[1:] -= out[:-1]
+        if self._last_raw is None:
+            start = first_raw
+            out[0] = 0
+        else:
+            start = self.last
+            out[0] -= self._last_raw
+        if self.bidirectional:
+            half = 1 << (self.bits - 1)
+            self.rollovers += int(np.count_nonzero(out < -half)
+                                  + np.count_nonzero(out >= half))
+            out += half
+            out &= mask
+            out -= half
+        else:
+            self.rollovers += int(np.count_nonzero(out < 0))
+            out &= mask
+        np.cumsum(out, out=out)
+        out += start
+        self.last = int(out[-1])
+        self._last_raw = last_raw
+        return out
+
+class EncoderPipeline(object):
+    """
+    Derives velocity and acceleration from a stream of encoder
+    positions.
+
+    Velocity and acceleration are computed with backward finite
+    differences over `window` samples, that is, a boxcar average of
+    the sample-to-sample differences::
+
+      velocity[n] = (position[n] - position[n-window]) / (window*dt)
+      acceleration[n] = (velocity[n] - velocity[n-window]) / (window*dt)
+
+    The last `window` positions and velocities are carried over to the
+    next chunk so that the results do not depend on how the stream is
+    split into chunks. Before the history is filled, the first
+    position is repeated, i.e. the encoder is assumed to start at
+    rest.
+
+    Parameters
+    ----------
+
+    rate : float
+      The sample clock rate of the encoder task in Hz.
+
+    window : int
+      The number of samples to difference over. Use 1 for no
+      smoothing.
+    """
+
+    def __init__(self, rate, window=1):
+        if window < 1:
+            raise ValueError('Expected window >= 1 but got %r' % (window,))
+        self.rate = float(rate)
+        self.window = int(window)
+        self._scale = self.rate / self.window
+        self._capacity = 0
+        self._out = None
+        self.reset()
+
+    def reset(self):
+        """
+        Forget the history so that the next chunk starts a new stream.
+        """
+        self._position_tail = None
+        self._velocity_tail = None
+
+    def _reserve(self, n):
+        if n > self._capacity:
+            # pylint: disable=no-member
+            self._capacity = n
+            self._x = np.empty(self.window + n, dtype=np.float64)
+            self._v = np.empty(self.window + n, dtype=np.float64)
+            self._out = np.empty((3, n), dtype=np.float64)
+
+    def process(self, positions, out=None):
+        """
+        Processes a chunk of encoder positions.
+
+        Parameters
+        ----------
+
+        positions : array
+          The positions as returned by `nidaqmx.CounterInputTask.read`.
+
+        out : {array, None}
+          An optional ``float64`` array of shape ``(3, n)``, ``n >=
+          len(positions)``, to write position, velocity and
+          acceleration rows to. If None then an internal buffer is
+          used that is overwritten by the next call.
+
+        Returns
+        -------
+
+        position, velocity, acceleration : array
+          Views of the rows of `out`.
+        """
+        # pylint: disable=no-member
+        positions = np.asarray(positions, dtype=np.float64).ravel()
+        n = positions.size
+        w = self.window
+        self._reserve(n)
+        if out is None:
+            out = self._out
+        position, velocity, acceleration = out[0, :n], out[1, :n], out[2, :n]
+        if not n:
+            return position, velocity, acceleration
+        if self._position_tail is None:
+            self._position_tail = np.empty(w, dtype=np.float64)
+            self._position_tail.fill(positions[0])
+            self._velocity_tail = np.zeros(w, dtype=np.float64)
+
+        x = self._x[:w + n]
+        x[:w] = self._position_tail
+        x[w:] = positions
+        np.subtract(x[w:], x[:n], out=velocity)
+        velocity *= self._scale
+
+        v = self._v[:w + n]
+        v[:w] = self._velocity_tail
+        v[w:] = velocity
+        np.subtract(v[w:], v[:n], out=acceleration)
+        acceleration *= self._scale
+
+        position[:] = positions
+        self._position_tail[:] = x[n:]
+        self._velocity_tail[:] = v[n:]
+        return position, velocity, acceleration
+
+    def read(self, task, samples_per_channel=None, timeout=10.0, out=None):
+        """
+        Reads a chunk of positions from an encoder task and processes
+        it.
+
+        Parameters
+        ----------
+
+        task : nidaqmx.CounterInputTask
+          A task with a linear encoder channel.
+
+        samples_per_channel, timeout :
+          See `nidaqmx.CounterInputTask.read`.
+
+        out : {array, None}
+          See `process`.
+
+        Returns
+        -------
+
+        position, velocity, acceleration : array
+        """
+        data = task.read(samples_per_channel, timeout=timeout)
+        return self.process(data, out=out)
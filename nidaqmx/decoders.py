@@ -0,0 +1,450 @@
+"""
+Streaming serial protocol decoders for sampled digital lines.
+
+.. autosummary::
+
+  UARTDecoder
+  SPIDecoder
+  I2CDecoder
+
+The decoders consume chunks of samples as returned by
+`nidaqmx.DigitalInputTask.read` (one byte per line, see
+`nidaqmx.digital.pack_lines`) or `nidaqmx.libnidaqmx.DigitalTask.read_packed`
+(one ``uint32`` word per sample). Lines are identified by their bit
+position in the packed word. Edges are found with vectorized
+comparisons and bits are sliced out with fancy indexing, so that the
+Python overhead is per chunk rather than per sample. Incomplete frames
+at the end of a chunk are carried over to the next chunk.
+
+Each ``decode`` call returns an array of frame records whose
+``index`` field holds the absolute sample index of the first bit of
+the frame.
+
+Example usage
+=============
+
+>>> import sys
+>>> import numpy as np
+>>> from nidaqmx import DigitalInputTask
+>>> from nidaqmx.decoders import UARTDecoder
+>>> task = DigitalInputTask()
+>>> task.create_channel('Dev1/port0/line0:7', grouping='for_all_lines')
+>>> task.configure_timing_sample_clock(rate=10e6)
+>>> uart = UARTDecoder(10e6, 115200, line=3)
+>>> task.start()
+>>> while True:
+...     frames = uart.decode(task.read_packed(100000))
+...     sys.stdout.write(frames['data'].astype(np.uint8).tobytes())
+
+"""
+
+from __future__ import print_function, division, absolute_import
+
+import numpy as np
+
+from .digital import pack_lines
+
+__all__ = ['UARTDecoder', 'SPIDecoder', 'I2CDecoder',
+           'uart_frame_dtype', 'spi_frame_dtype', 'i2c_frame_dtype']
+
+uart_frame_dtype = np.dtype([('index', np.int64), ('data', np.uint16),
+                             ('parity_error', np.bool_),
+                             ('framing_error', np.bool_)])
+spi_frame_dtype = np.dtype([('index', np.int64), ('mosi', np.uint32),
+                            ('miso', np.uint32)])
+i2c_frame_dtype = np.dtype([('index', np.int64), ('data', np.uint8),
+                            ('ack', np.bool_), ('start', np.bool_)])
+
+def _as_words(data):
+    """
+    Returns packed ``uint32`` words of the chunk `data`.
+    """
+    # pylint: disable=no-member
+    data = np.asarray(data)
+    if data.dtype == np.uint32:
+        if data.ndim == 2:
+            if data.shape[1] == 1:
+                return data[:, 0]
+            return np.bitwise_or.reduce(data, axis=1)
+        return data
+    return pack_lines(data)
+
+def _line(words, bit):
+    """
+    Returns the levels of line `bit` as an ``int8`` array.
+    """
+    # pylint: disable=no-member
+    return ((words >> np.uint32(bit)) & 1).astype(np.int8)
+
+def _edges(level, previous, direction):
+    """
+    Returns the indices of samples that differ from the preceding
+    sample in the given direction (+1 rising, -1 falling).
+    """
+    # pylint: disable=no-member
+    d = np.empty(level.size, dtype=np.int8)
+    d[0] = level[0] - previous
+    np.subtract(level[1:], level[:-1], out=d[1:])
+    return np.nonzero(d == direction)[0]
+
+class _BitGrouper(object):
+    """
+    Groups a stream of sampled bits into words within segments
+    (e.g. chip select or START/STOP framing) and keeps the bits of an
+    incomplete word for the next chunk.
+    """
+
+    def __init__(self, nbits, ncols, msb_first=True):
+        self.nbits = nbits
+        self.ncols = ncols
+        if msb_first:
+            self._shift = np.arange(nbits - 1, -1, -1, dtype=np.uint32)
+        else:
+            self._shift = np.arange(nbits, dtype=np.uint32)
+        self.reset()
+
+    def reset(self):
+        # pylint: disable=no-member
+        self._index = np.zeros(0, dtype=np.int64)
+        self._bits = np.zeros((self.ncols, 0), dtype=np.uint32)
+        self._segment = np.zeros(0, dtype=np.int64)
+
+    def feed(self, index, bits, segment, open_segment):
+        """
+        Returns the absolute index of the first bit, the words and the
+        segment of every complete word. The bits of an incomplete
+        word in segment `open_segment` are kept for the next call,
+        those of other segments are dropped.
+        """
+        # pylint: disable=no-member
+        index = np.concatenate((self._index, index))
+        bits = np.concatenate((self._bits, bits), axis=1)
+        segment = np.concatenate((self._segment, segment))
+        n = index.size
+        if not n:
+            return index, bits, segment
+        first = np.nonzero(np.diff(segment))[0] + 1
+        starts = np.zeros(n, dtype=np.int64)
+        starts[first] = first
+        np.maximum.accumulate(starts, out=starts)
+        position = np.arange(n, dtype=np.int64) - starts
+        group_start = np.nonzero(position % self.nbits == 0)[0]
+        group_size = np.diff(np.append(group_start, n))
+        complete = group_size == self.nbits
+        last = group_start[-1]
+        if not complete[-1] and segment[last] == open_segment:
+            self._index = index[last:]
+            self._bits = bits[:, last:]
+            self._segment = segment[last:]
+        else:
+            self.reset()
+        weighted = bits << self._shift[position % self.nbits]
+        words = np.add.reduceat(weighted, group_start, axis=1)
+        group_start = group_start[complete]
+        return index[group_start], words[:, complete], segment[group_start]
+
+class UARTDecoder(object):
+    """
+    Decodes asynchronous serial frames (start bit, data bits LSB
+    first, optional parity bit, stop bits) of an idle-high line.
+
+    Parameters
+    ----------
+
+    sample_rate : float
+      The sample clock rate of the digital input task in Hz.
+
+    baud_rate : float
+      The bit rate of the serial line.
+
+    line : int
+      The bit position of the line in the packed word.
+
+    data_bits : int
+      The number of data bits.
+
+    parity : {None, 'even', 'odd'}
+      The parity bit, if any.
+
+    stop_bits : int
+      The number of stop bits.
+    """
+
+    def __init__(self, sample_rate, baud_rate, line=0, data_bits=8,
+                 parity=None, stop_bits=1):
+        if parity not in [None, 'even', 'odd']:
+            raise ValueError('Expected parity None|even|odd but got %r' % (parity,))
+        self.samples_per_bit = samples_per_bit = sample_rate / baud_rate
+        if samples_per_bit < 3:
+            raise ValueError('Need at least 3 samples per bit but got %s' % (samples_per_bit))
+        self.line = line
+        self.data_bits = data_bits
+        self.parity = parity
+        self.stop_bits = stop_bits
+        nbits = 1 + data_bits + (parity is not None)
+        # Sample every bit in its middle, the last position is the
+        # middle of the first stop bit.
+        self._positions = ((np.arange(1, nbits + 1) + 0.5) * samples_per_bit).astype(np.int64)
+        self._frame_size = int(self._positions[-1]) + 1
+        self._weights = (1 << np.arange(data_bits)).astype(np.uint16)
+        self.reset()
+
+    def reset(self):
+        """
+        Forget the stream state.
+        """
+        # pylint: disable=no-member
+        self._tail = np.zeros(0, dtype=np.int8)
+        self._previous = 1
+        self._offset = 0
+
+    def decode(self, data):
+        """
+        Decodes a chunk of samples.
+
+        Parameters
+        ----------
+
+        data : array
+          Packed words or line-per-byte samples.
+
+        Returns
+        -------
+
+        frames : array
+          The array of `uart_frame_dtype` records.
+        """
+        # pylint: disable=no-member
+        level = np.concatenate((self._tail, _line(_as_words(data), self.line)))
+        n = level.size
+        offset = self._offset
+        if not n:
+            return np.zeros(0, dtype=uart_frame_dtype)
+        candidates = _edges(level, self._previous, -1)
+        fits = candidates[candidates + self._frame_size <= n]
+        # A frame may start with any falling edge that follows the
+        # middle of the stop bit of the previous frame.
+        successor = np.searchsorted(fits, fits + self._positions[-1], 'left').tolist()
+        chain = []
+        i = 0 if fits.size else None
+        while i is not None and i < len(successor):
+            chain.append(i)
+            i = successor[i]
+        starts = fits[chain]
+        resume = n
+        if starts.size:
+            after = starts[-1] + self._positions[-1]
+        else:
+            after = 0
+        pending = candidates[candidates >= after]
+        if pending.size:
+            resume = int(pending[0])
+        if resume > 0:
+            self._previous = int(level[resume - 1])
+        self._tail = level[resume:].copy()
+        self._offset = offset + resume
+
+        bits = level[starts[:, None] + self._positions]
+        frames = np.zeros(starts.size, dtype=uart_frame_dtype)
+        frames['index'] = starts + offset
+        data_bits = bits[:, :self.data_bits].astype(np.uint16)
+        frames['data'] = np.dot(data_bits, self._weights)
+        if self.parity is not None:
+            ones = bits[:, :self.data_bits + 1].sum(axis=1)
+            frames['parity_error'] = (ones % 2) != (self.parity == 'odd')
+        frames['framing_error'] = bits[:, -1] == 0
+        return frames
+
+class SPIDecoder(object):
+    """
+    Decodes SPI words sampled on the clock edges of the SPI mode.
+
+    Parameters
+    ----------
+
+    sclk, mosi, miso : int
+      The bit positions of the clock and data lines in the packed
+      word. Use None for an unused data line.
+
+    cs : {int, None}
+      The bit position of the active-low chip select line. Words are
+      aligned to the assertion of chip select. If None then words are
+      aligned to the first clock edge seen.
+
+    mode : {0, 1, 2, 3}
+      The SPI mode, i.e. ``2*CPOL + CPHA``.
+
+    bits : int
+      The number of bits per word.
+
+    msb_first : bool
+      The bit order of words.
+    """
+
+    def __init__(self, sclk, mosi=None, miso=None, cs=None, mode=0, bits=8,
+                 msb_first=True):
+        if mode not in [0, 1, 2, 3]:
+            raise ValueError('Expected mode 0|1|2|3 but got %r' % (mode,))
+        self.sclk = sclk
+        self.mosi = mosi
+        self.miso = miso
+        self.cs = cs
+        self.mode = mode
+        self.bits = bits
+        # Modes 0 and 3 sample on rising, modes 1 and 2 on falling edges.
+        self._direction = 1 if mode in [0, 3] else -1
+        self._grouper = _BitGrouper(bits, 2, msb_first=msb_first)
+        self.reset()
+
+    def reset(self):
+        """
+        Forget the stream state.
+        """
+        self._previous = None
+        self._segment = 0
+        self._offset = 0
+        self._grouper.reset()
+
+    def decode(self, data):
+        """
+        Decodes a chunk of samples.
+
+        Parameters
+        ----------
+
+        data : array
+          Packed words or line-per-byte samples.
+
+        Returns
+        -------
+
+        frames : array
+          The array of `spi_frame_dtype` records.
+        """
+        # pylint: disable=no-member
+        words = _as_words(data)
+        n = words.size
+        if not n:
+            return np.zeros(0, dtype=spi_frame_dtype)
+        previous = words[0] if self._previous is None else self._previous
+        sclk = _line(words, self.sclk)
+        index = _edges(sclk, (previous >> self.sclk) & 1, self._direction)
+        if self.cs is None:
+            segment = np.zeros(index.size, dtype=np.int64)
+        else:
+            cs = _line(words, self.cs)
+            index = index[cs[index] == 0]
+            asserted = _edges(cs, (previous >> self.cs) & 1, -1)
+            segment = np.searchsorted(asserted, index, 'right') + self._segment
+            self._segment += asserted.size
+            if cs[-1]:
+                # Chip select is deasserted, the next word starts a new
+                # segment.
+                self._segment += 1
+        sampled = np.zeros((2, index.size), dtype=np.uint32)
+        if self.mosi is not None:
+            sampled[0] = (words[index] >> self.mosi) & 1
+        if self.miso is not None:
+            sampled[1] = (words[index] >> self.miso) & 1
+        self._previous = int(words[-1])
+        start, values, _ = self._grouper.feed(index + self._offset, sampled,
+                                              segment, self._segment)
+        self._offset += n
+        frames = np.zeros(start.size, dtype=spi_frame_dtype)
+        frames['index'] = start
+        frames['mosi'] = values[0]
+        frames['miso'] = values[1]
+        return frames
+
+class I2CDecoder(object):
+    """
+    Decodes I2C bytes with their acknowledge bits.
+
+    A START (or repeated START) condition begins a new transfer whose
+    first byte holds the address and read/write bit; such bytes are
+    flagged with ``start=True``. A STOP condition ends the transfer.
+
+    Parameters
+    ----------
+
+    scl, sda : int
+      The bit positions of the clock and data lines in the packed
+      word.
+    """
+
+    def __init__(self, scl, sda):
+        self.scl = scl
+        self.sda = sda
+        self._grouper = _BitGrouper(9, 1)
+        self.reset()
+
+    def reset(self):
+        """
+        Forget the stream state.
+        """
+        self._previous = None
+        self._segment = 0
+        self._in_transfer = False
+        self._last_segment = -1
+        self._offset = 0
+        self._grouper.reset()
+
+    def decode(self, data):
+        """
+        Decodes a chunk of samples.
+
+        Parameters
+        ----------
+
+        data : array
+          Packed words or line-per-byte samples.
+
+        Returns
+        -------
+
+        frames : array
+          The array of `i2c_frame_dtype` records.
+        """
+        # pylint: disable=no-member
+        words = _as_words(data)
+        n = words.size
+        if not n:
+            return np.zeros(0, dtype=i2c_frame_dtype)
+        previous = words[0] if self._previous is None else self._previous
+        scl = _line(words, self.scl)
+        sda = _line(words, self.sda)
+        sda_previous = (previous >> self.sda) & 1
+        index = _edges(scl, (previous >> self.scl) & 1, 1)
+        # START and STOP conditions are SDA edges while SCL is high,
+        # each of them begins a new segment. Bits are collected only
+        # in segments that begin with a START.
+        start = _edges(sda, sda_previous, -1)
+        start = start[scl[start] == 1]
+        stop = _edges(sda, sda_previous, 1)
+        stop = stop[scl[stop] == 1]
+        boundary = np.concatenate((start, stop))
+        order = boundary.argsort(kind='mergesort')
+        boundary = boundary[order]
+        is_start = np.concatenate((np.ones(start.size, dtype=bool),
+                                   np.zeros(stop.size, dtype=bool)))[order]
+        k = np.searchsorted(boundary, index, 'right')
+        in_transfer = np.append(self._in_transfer, is_start)[k]
+        index = index[in_transfer]
+        segment = k[in_transfer] + self._segment
+        self._segment += boundary.size
+        if boundary.size:
+            self._in_transfer = bool(is_start[-1])
+        open_segment = self._segment if self._in_transfer else -1
+        sampled = ((words[index] >> self.sda) & 1).astype(np.uint32).reshape((1, index.size))
+        self._previous = int(words[-1])
+        first, values, segments = self._grouper.feed(index + self._offset, sampled,
+                                                     segment, open_segment)
+        self._offset += n
+        frames = np.zeros(first.size, dtype=i2c_frame_dtype)
+        frames['index'] = first
+        frames['data'] = values[0] >> 1
+        frames['ack'] = (values[0] & 1) == 0
+        if segments.size:
+            frames['start'] = segments != np.append(self._last_segment, segments[:-1])
+            self._last_segment = segments[-1]
+        return frames
@@ -0,0 +1,244 @@
+"""
+Helpers for processing digital input streams.
+
+.. autosummary::
+
+  ChangeDetectionReader
+  extract_edges
+  pack_lines
+
+Example usage
+=============
+
+Digital input tasks using change detection timing acquire a sample
+only when a line changes, but the samples carry no timing
+information. To timestamp the samples, count the edges of the
+100 MHz timebase with a counter that is clocked by the change
+detection event::
+
+>>> from nidaqmx import DigitalInputTask, CounterInputTask
+>>> from nidaqmx.digital import ChangeDetectionReader
+>>> task = DigitalInputTask()
+>>> task.create_channel('Dev1/port0/line0:7', grouping='for_all_lines')
+>>> task.configure_timing_change_detection('Dev1/port0/line0:7',
+...                                        'Dev1/port0/line0:7')
+>>> clock = CounterInputTask()
+>>> clock.create_channel_count_edges('Dev1/ctr0')
+>>> clock.set_terminal_count_edges('Dev1/ctr0', '/Dev1/100MHzTimebase')
+>>> clock.configure_timing_sample_clock(source='/Dev1/ChangeDetectionEvent',
+...                                     rate=1e6)
+>>> reader = ChangeDetectionReader(task, clock, timebase_rate=100e6)
+>>> reader.start()
+>>> words, times, edges = reader.read(1000)
+>>> print(edges['line'], edges['direction'], edges['time'])
+
+"""
+
+from __future__ import print_function, division, absolute_import
+
+import numpy as np
+
+from .counters import CounterUnwrapper
+
+__all__ = ['ChangeDetectionReader', 'extract_edges', 'pack_lines',
+           'edge_dtype']
+
+#: The record type of edge events: the line number (bit position in
+#: the packed word), the direction (+1 for rising and -1 for falling
+#: edges) and the time of the sample that contains the edge.
+edge_dtype = np.dtype([('line', np.uint8), ('direction', np.int8),
+                       ('time', np.float64)])
+
+def pack_lines(data, out=None):
+    """
+    Packs line-per-byte samples into ``uint32`` words.
+
+    Parameters
+    ----------
+
+    data : array
+      The samples as returned by `nidaqmx.DigitalInputTask.read` with
+      ``fill_mode='group_by_scan_number'``, one column per line. Line
+      ``i`` is stored in bit ``i`` of the word.
+
+    out : {array, None}
+      An optional ``uint32`` array to write the words to.
+
+    Returns
+    -------
+
+    words : array
+    """
+    # pylint: disable=no-member
+    data = np.asarray(data)
+    if data.ndim == 1:
+        data = data.reshape((data.size, 1))
+    if out is None:
+        out = np.zeros(data.shape[0], dtype=np.uint32)
+    else:
+        out = out[:data.shape[0]]
+        out.fill(0)
+    if data.shape[1] > 32:
+        raise ValueError('Cannot pack %s lines into 32-bit words' % (data.shape[1]))
+    line = np.empty(data.shape[0], dtype=np.uint32)
+    for i in range(data.shape[1]):
+        np.not_equal(data[:, i], 0, out=line, casting='unsafe')
+        line <<= i
+        out |= line
+    return out
+
+def extract_edges(words, times, previous=None, mask=0xffffffff):
+    """
+    Finds the line transitions in a sequence of packed digital words.
+
+    Parameters
+    ----------
+
+    words : array
+      The ``uint32`` words, one per sample.
+
+    times : array
+      The time (or any other label) of each sample.
+
+    previous : {int, None}
+      The word preceding ``words[0]``, for instance the last word of
+      the previous chunk. If None then the first sample does not
+      produce edges.
+
+    mask : int
+      The bit mask of lines to look at.
+
+    Returns
+    -------
+
+    edges : array
+      The array of `edge_dtype` records ordered by time and line.
+    """
+    # pylint: disable=no-member
+    words = np.asarray(words, dtype=np.uint32).ravel()
+    times = np.asarray(times)
+    n = words.size
+    if not n:
+        return np.zeros(0, dtype=edge_dtype)
+    changed = np.empty(n, dtype=np.uint32)
+    changed[0] = words[0] if previous is None else previous
+    changed[1:] = words[:-1]
+    changed ^= words
+    changed &= mask
+    index = np.nonzero(changed)[0]
+    if not index.size:
+        return np.zeros(0, dtype=edge_dtype)
+    nbits = int(mask).bit_length()
+    shifts = np.arange(nbits, dtype=np.uint32)
+    bits = (changed[index, None] >> shifts) & 1
+    row, line = np.nonzero(bits)
+    sample = index[row]
+    edges = np.empty(row.size, dtype=edge_dtype)
+    edges['line'] = line
+    level = (words[sample] >> line.astype(np.uint32)) & 1
+    edges['direction'] = 2 * level.astype(np.int8) - 1
+    edges['time'] = times[sample]
+    return edges
+
+class ChangeDetectionReader(object):
+    """
+    Reads a change detection digital input task together with the
+    timestamps of its samples and extracts edge events.
+
+    Parameters
+    ----------
+
+    task : nidaqmx.DigitalInputTask
+      A task configured with
+      `nidaqmx.libnidaqmx.Task.configure_timing_change_detection`. All
+      channels must belong to the same port, their packed words are
+      OR-ed together.
+
+    timestamp_task : {nidaqmx.CounterInputTask, None}
+      An edge counting task that counts a timebase and is clocked by
+      the change detection event of the device. If None then the
+      sample index is used as the time of a sample.
+
+    timebase_rate : float
+      The rate of the timebase counted by `timestamp_task` in Hz.
+
+    mask : int
+      The bit mask of lines to extract edges from.
+    """
+
+    def __init__(self, task, timestamp_task=None, timebase_rate=100e6,
+                 mask=0xffffffff):
+        self.task = task
+        self.timestamp_task = timestamp_task
+        self.timebase_rate = float(timebase_rate)
+        self.mask = mask
+        self._unwrapper = CounterUnwrapper()
+        self.reset()
+
+    def reset(self):
+        """
+        Forget the stream state.
+        """
+        self._previous = None
+        self._samples = 0
+        self._unwrapper.reset()
+
+    def start(self):
+        """
+        Starts the timestamp task, if any, and the digital input task.
+        """
+        self.reset()
+        if self.timestamp_task is not None:
+            self.timestamp_task.start()
+        self.task.start()
+
+    def stop(self):
+        """
+        Stops the digital input task and the timestamp task, if any.
+        """
+        self.task.stop()
+        if self.timestamp_task is not None:
+            self.timestamp_task.stop()
+
+    def read(self, samples_per_channel=None, timeout=10.0):
+        """
+        Reads a chunk of change detection samples.
+
+        Parameters
+        ----------
+
+        samples_per_channel, timeout :
+          See `nidaqmx.libnidaqmx.DigitalTask.read_packed`.
+
+        Returns
+        -------
+
+        words : array
+          The ``uint32`` packed samples.
+
+        times : array
+          The time of each sample in seconds since the timestamp
+          counter was started, or the sample index if there is no
+          timestamp task.
+
+        edges : array
+          The edge events of the chunk as `edge_dtype` records.
+        """
+        # pylint: disable=no-member
+        data = self.task.read_packed(samples_per_channel, timeout=timeout)
+        if data.shape[1] == 1:
+            words = data[:, 0]
+        else:
+            words = np.bitwise_or.reduce(data, axis=1)
+        n = words.size
+        if self.timestamp_task is None:
+            times = np.arange(self._samples, self._samples + n, dtype=np.float64)
+        else:
+            ticks = self.timestamp_task.read(n, timeout=timeout)
+            times = self._unwrapper.update(ticks).astype(np.float64)
+            times /= self.timebase_rate
+        edges = extract_edges(words, times, previous=self._previous, mask=self.mask)
+        if n:
+            self._previous = int(words[-1])
+        self._samples += n
+        return words, times, edges
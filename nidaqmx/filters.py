@@ -0,0 +1,219 @@
+"""
+Streaming FIR filtering and decimation of analog input data.
+
+.. autosummary::
+
+  FIRDecimator
+  lowpass
+
+Example usage
+=============
+
+Decimate 1 MS/s data of 8 channels to 10 kS/s in two stages while
+reading::
+
+>>> from nidaqmx import AnalogInputTask
+>>> from nidaqmx.filters import FIRDecimator
+>>> task = AnalogInputTask()
+>>> task.create_voltage_channel('Dev1/ai0:7', min_val=-10, max_val=10)
+>>> task.configure_timing_sample_clock(rate=1e6)
+>>> stage1, stage2 = FIRDecimator(10), FIRDecimator(10)
+>>> task.start()
+>>> while True:
+...     data = stage2.process(stage1.process(task.read(100000)))
+...     data.tofile(f)
+
+"""
+
+from __future__ import print_function, division, absolute_import
+
+import numpy as np
+from numpy.lib.stride_tricks import as_strided
+
+__all__ = ['FIRDecimator', 'lowpass']
+
+def lowpass(numtaps, cutoff, window='hamming'):
+    """
+    Returns the taps of a windowed-sinc lowpass FIR filter with unit
+    gain at zero frequency.
+
+    Parameters
+    ----------
+
+    numtaps : int
+      The number of taps.
+
+    cutoff : float
+      The cutoff frequency in cycles per sample, ``0 < cutoff < 0.5``.
+
+    window : {'hamming', 'hann', 'blackman'}
+      The window applied to the sinc function.
+    """
+    # pylint: disable=no-member
+    if not 0 < cutoff < 0.5:
+        raise ValueError('Expected 0 < cutoff < 0.5 but got %r' % (cutoff,))
+    windows = dict(hamming=np.hamming, hann=np.hanning, blackman=np.blackman)
+    if window not in windows:
+        raise ValueError('Unknown window %r' % (window,))
+    n = np.arange(numtaps, dtype=np.float64) - (numtaps - 1) / 2
+    taps = np.sinc(2 * cutoff * n) * windows[window](numtaps)
+    taps /= taps.sum()
+    return taps
+
+class FIRDecimator(object):
+    """
+    Polyphase FIR decimator that keeps the filter state across read
+    chunks.
+
+    Only every `factor`-th filter output is computed: the input
+    windows of the outputs of a chunk are taken as a strided view of
+    the filter history followed by the chunk, and all outputs of all
+    channels are computed with one ``np.einsum`` call. The last
+    ``len(taps) - 1`` samples and the decimation phase are carried
+    over, so the output does not depend on how the stream is split
+    into chunks. For large factors, cascading decimators of smaller
+    factors is faster than a single long filter.
+
+    Parameters
+    ----------
+
+    factor : int
+      The decimation factor.
+
+    taps : {array, None}
+      The FIR filter taps. By default ``lowpass(16*factor + 1,
+      0.4/factor)``.
+
+    fill_mode : {'group_by_scan_number', 'group_by_channel'}
+      The layout of the chunks, see
+      `nidaqmx.libnidaqmx.AnalogInputTask.read`. The output has the
+      same layout.
+    """
+
+    def __init__(self, factor, taps=None, fill_mode='group_by_scan_number'):
+        # pylint: disable=no-member
+        if factor < 1:
+            raise ValueError('Expected factor >= 1 but got %r' % (factor,))
+        if fill_mode not in ['group_by_scan_number', 'group_by_channel']:
+            raise ValueError('Unknown fill_mode %r' % (fill_mode,))
+        if taps is None:
+            taps = lowpass(16 * factor + 1, 0.4 / factor)
+        self.factor = int(factor)
+        self.taps = np.asarray(taps, dtype=np.float64)
+        self._reversed = self.taps[::-1].copy()
+        self.fill_mode = fill_mode
+        self.channels = None
+
+    def reset(self):
+        """
+        Forget the filter state. The history is zero, i.e. the stream
+        is assumed to be preceded by zeros.
+        """
+        self.channels = None
+
+    def _allocate(self, channels):
+        # pylint: disable=no-member
+        self.channels = channels
+        self._buffer = np.zeros((self.taps.size - 1, channels), dtype=np.float64)
+        self._out = np.empty((0, channels), dtype=np.float64)
+        # The position in the buffer of the first input sample of the
+        # window of the next output.
+        self._start = 0
+
+    def _check_out(self, out, nout, channels, single):
+        # Returns a (samples, channels) view of out; a copy would not
+        # be seen by the caller.
+        if not isinstance(out, np.ndarray) or out.dtype != np.float64:
+            raise ValueError('Expected out to be a float64 array but got %r'
+                             % (getattr(out, 'dtype', type(out)),))
+        if single:
+            if out.ndim != 1 or out.shape[0] < nout:
+                raise ValueError('Expected out of shape (>=%s,) but got %s'
+                                 % (nout, out.shape))
+            return out[:nout, np.newaxis]
+        if self.fill_mode == 'group_by_scan_number':
+            if out.ndim != 2 or out.shape[0] < nout or out.shape[1] != channels:
+                raise ValueError('Expected out of shape (>=%s, %s) but got %s'
+                                 % (nout, channels, out.shape))
+            return out[:nout]
+        if out.ndim != 2 or out.shape[0] != channels or out.shape[1] < nout:
+            raise ValueError('Expected out of shape (%s, >=%s) but got %s'
+                             % (channels, nout, out.shape))
+        return out[:, :nout].T
+
+    def process(self, data, out=None):
+        """
+        Filters and decimates a chunk of samples.
+
+        Parameters
+        ----------
+
+        data : array
+          A ``(samples, channels)`` array for 'group_by_scan_number' or
+          a ``(channels, samples)`` array for 'group_by_channel'
+          layout. A 1-d array is taken as samples of a single channel.
+
+        out : {array, None}
+          A ``float64`` array with room for the outputs, in the same
+          layout as `data`; it may be a strided view. If None then an
+          internal buffer is used that is overwritten by the next
+          call.
+
+        Returns
+        -------
+
+        decimated : array
+          The outputs of the chunk, a view of `out` or of the internal
+          buffer. Its length varies by one between chunks when the
+          chunk length is not a multiple of `factor`.
+
+        Raises
+        ------
+
+        ValueError
+          If `out` is not a ``float64`` array of the layout of `data`
+          with room for the outputs.
+        """
+        # pylint: disable=no-member
+        data = np.asarray(data, dtype=np.float64)
+        single = data.ndim == 1
+        if single:
+            data = data.reshape((data.size, 1))
+        elif self.fill_mode == 'group_by_channel':
+            data = data.T
+        n, channels = data.shape
+        if self.channels is None:
+            self._allocate(channels)
+        elif channels != self.channels:
+            raise ValueError('Expected %s channels but got %s' % (self.channels, channels))
+        ntaps = self.taps.size
+        history = ntaps - 1
+        total = history + n
+        if self._buffer.shape[0] < total:
+            buf = np.empty((total, channels), dtype=np.float64)
+            buf[:history] = self._buffer[:history]
+            self._buffer = buf
+        buf = self._buffer
+        buf[history:total] = data
+
+        start = self._start
+        nout = max(0, (total - ntaps - start) // self.factor + 1)
+        if out is None:
+            if self._out.shape[0] < nout:
+                self._out = np.empty((nout, channels), dtype=np.float64)
+            result = self._out[:nout]
+        else:
+            result = self._check_out(out, nout, channels, single)
+        if nout:
+            s0, s1 = buf.strides
+            windows = as_strided(buf[start:], shape=(nout, ntaps, channels),
+                                 strides=(self.factor * s0, s0, s1))
+            np.einsum('i,mic->mc', self._reversed, windows, out=result)
+        self._start = start + nout * self.factor - n
+        if history:
+            buf[:history] = buf[n:total]
+        if single:
+            return result[:, 0]
+        if self.fill_mode == 'group_by_channel':
+            return result.T
+        return result
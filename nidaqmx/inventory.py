@@ -0,0 +1,240 @@
+"""
+Persistent cache of device capabilities.
+
+Querying the channel lists and bus information of every device takes
+dozens of driver calls per device. `DeviceInventory` keeps the results
+in a local JSON file keyed by the driver version and device serial
+number, so that tools can start without enumerating the hardware
+again.
+
+.. autosummary::
+
+  DeviceInventory
+  get_inventory
+
+Example usage
+=============
+
+>>> from nidaqmx.inventory import get_inventory
+>>> inventory = get_inventory()
+>>> for record in inventory.devices():
+...     print(record['name'], record['product_type'])
+>>> inventory.collect('analog_input_channels')
+['Dev1/ai0', 'Dev1/ai1', ..., 'Dev2/ai31']
+>>> inventory.refresh(background=True) # pick up changes for the next start
+
+"""
+
+from __future__ import print_function, division, absolute_import
+
+import os
+import sys
+import json
+import threading
+
+from .libnidaqmx import System, DeviceSnapshot, clear_string_property_cache
+
+__all__ = ['DeviceInventory', 'get_inventory', 'device_fields']
+
+#: Device properties held by an inventory record, see
+#: `nidaqmx.libnidaqmx.DeviceSnapshot`.
+device_fields = list(DeviceSnapshot.scalar_fields + DeviceSnapshot.list_fields)
+
+def _default_path():
+    return os.environ.get('NIDAQMX_INVENTORY',
+                          os.path.join(os.path.expanduser('~'), '.nidaqmx',
+                                       'inventory.json'))
+
+def _decode(value):
+    if isinstance(value, bytes) and not isinstance(value, str):
+        return value.decode('utf-8')
+    if isinstance(value, list):
+        return [_decode(v) for v in value]
+    return value
+
+def query_device(device):
+    """
+    Returns the inventory record of `device` queried from the driver.
+    """
+    return _record(DeviceSnapshot.query(device))
+
+def _record(snapshot):
+    return dict((key, _decode(value)) for key, value in snapshot.as_dict().items())
+
+class DeviceInventory(object):
+    """
+    Device capability cache persisted to a JSON file.
+
+    Records are stored under the key ``'<driver version>/<serial
+    number>'``, so that a record is not used for a replaced device or
+    after a driver upgrade. Devices without a serial number, such as
+    simulated devices, are keyed by name.
+
+    Parameters
+    ----------
+
+    path : {str, None}
+      The cache file. Defaults to the ``NIDAQMX_INVENTORY``
+      environment variable or ``~/.nidaqmx/inventory.json``.
+    """
+
+    def __init__(self, path=None):
+        self.path = path or _default_path()
+        self._lock = threading.RLock()
+        self._records = {}
+        self.load()
+
+    def load(self):
+        """
+        Loads records from the cache file, if it exists.
+        """
+        try:
+            with open(self.path, 'r') as f:
+                records = json.load(f)
+        except (IOError, OSError, ValueError):
+            records = {}
+        with self._lock:
+            self._records = records
+
+    def save(self):
+        """
+        Writes records to the cache file atomically.
+        """
+        with self._lock:
+            text = json.dumps(self._records, indent=1, sort_keys=True)
+        directory = os.path.dirname(self.path)
+        try:
+            if directory and not os.path.isdir(directory):
+                os.makedirs(directory)
+            tmp = '%s.%s.tmp' % (self.path, os.getpid())
+            with open(tmp, 'w') as f:
+                f.write(text)
+            if os.name == 'nt' and os.path.exists(self.path):
+                os.remove(self.path)
+            os.rename(tmp, self.path)
+        except (IOError, OSError) as msg:
+            print('Failed to save device inventory to %r: %s' % (self.path, msg),
+                  file=sys.stderr)
+
+    @staticmethod
+    def _key(version, name, serial_number):
+        if serial_number:
+            return '%s/%s' % (version, serial_number)
+        return '%s/name:%s' % (version, name)
+
+    def _store(self, version, record):
+        key = self._key(version, record['name'], record['serial_number'])
+        with self._lock:
+            self._records[key] = record
+
+    def devices(self, validate=True):
+        """
+        Returns the inventory records of the devices of the system.
+
+        Parameters
+        ----------
+
+        validate : bool
+          If True then the driver version, device names and serial
+          numbers are queried (two calls plus one call per device) to
+          find the records and devices missing from the cache are
+          queried and saved. If False then the cached records are
+          returned without calling the driver; use this only when the
+          cache is known to be fresh.
+
+        Returns
+        -------
+
+        records : list
+          A list of dictionaries with the ``name`` of the device and
+          the items of `device_fields`.
+        """
+        if not validate:
+            with self._lock:
+                return sorted(self._records.values(), key=lambda r: r['name'])
+        system = System()
+        version = system.version
+        records = []
+        missing = False
+        for device in system.devices:
+            key = self._key(version, str(device), device.get_serial_number())
+            with self._lock:
+                record = self._records.get(key)
+            if record is None or record['name'] != str(device):
+                # Channel names contain the device name, so a renamed
+                # device is queried again. The cached strings of the
+                # name may belong to the device that had it before.
+                clear_string_property_cache(device)
+                record = query_device(device)
+                self._store(version, record)
+                missing = True
+            records.append(record)
+        if missing:
+            self.save()
+        return records
+
+    def collect(self, field, validate=True):
+        """
+        Returns the concatenated list `field` of all devices, for
+        instance all ``'digital_input_lines'`` of the system.
+        """
+        result = []
+        for record in self.devices(validate=validate):
+            result.extend(record.get(field) or [])
+        return result
+
+    def refresh(self, background=False):
+        """
+        Queries all devices from the driver and saves the cache.
+
+        The devices are queried concurrently, see
+        `nidaqmx.libnidaqmx.System.snapshot`.
+
+        Parameters
+        ----------
+
+        background : bool
+          If True then the refresh runs in a daemon thread and this
+          method returns immediately.
+
+        Returns
+        -------
+
+        thread : {threading.Thread, None}
+          The refresh thread when `background` is True.
+        """
+        if background:
+            thread = threading.Thread(target=self.refresh)
+            thread.daemon = True
+            thread.start()
+            return thread
+        clear_string_property_cache()
+        snapshot = System().snapshot()
+        version = snapshot.version
+        records = [_record(device) for device in snapshot.devices]
+        with self._lock:
+            self._records = {}
+            for record in records:
+                self._store(version, record)
+        self.save()
+        return None
+
+    def clear(self):
+        """
+        Removes all records and the cache file.
+        """
+        with self._lock:
+            self._records = {}
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+_inventory = None
+
+def get_inventory():
+    """
+    Returns the shared `DeviceInventory` using the default cache file.
+    """
+    global _inventory # pylint: disable=global-statement
+    if _inventory is None:
+        _inventory = DeviceInventory()
+    return _inventory
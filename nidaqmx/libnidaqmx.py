@@ -17,11 +17,16 @@ from __future__ import print_function, division, unicode_literals, absolute_impo
 import os
 import sys
 import textwrap
+import functools
+import threading
 import numpy as np
 import ctypes
 import ctypes.util
 import warnings
-from inspect import getargspec
+try:
+    from inspect import getfullargspec as getargspec
+except ImportError: # Python 2
+    from inspect import getargspec
 
 ########################################################################
 
@@ -48,8 +53,7 @@ float32 = ctypes.c_float
 float64 = ctypes.c_double
 void_p = ctypes.c_void_p
 
-# Increase default_buf_size value when receiving RuntimeError
-# with "Buffer is too small to fit the string." message.
+# Minimal size of the string buffers, see get_string_property.
 default_buf_size = 3000
 
 ########################################################################
@@ -107,6 +111,9 @@ def _find_library():
         header_name, libname, libfile = _find_library_nt()
     else:
         header_name, libname, libfile = _find_library_linux()
+    # Allows using another driver version or a stand-in library, for
+    # instance for benchmarking.
+    libfile = os.environ.get('NIDAQMX_LIBRARY', libfile)
 
     lib = None
     if libfile is None:
@@ -251,26 +258,189 @@ def CHK(return_code, funcname, *args):
 
 ########################################################################
 
+if sys.version_info[0] >= 3:
+    unicode = str # pylint: disable=redefined-builtin,invalid-name
+
+def _convert_args(name, args):
+    new_args = []
+    for a in args:
+        if isinstance(a, unicode):
+            if sys.version_info[0] < 3:
+                print(name, 'argument', a, 'is unicode', file=sys.stderr)
+            new_args.append (a.encode('utf-8'))
+        else:
+            new_args.append (a)
+    return new_args
+
+def _config_method(key):
+    """
+    Returns the method name of a `Task.apply_config` key.
+    """
+    return key[0] if isinstance(key, tuple) else key
+
+def _to_json(value):
+    """
+    Returns `value` converted to JSON serializable types.
+    """
+    if isinstance(value, (list, tuple)):
+        return [_to_json(v) for v in value]
+    if isinstance(value, dict):
+        return dict((str(k), _to_json(v)) for k, v in value.items())
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, bytes) and not isinstance(value, str):
+        return value.decode('utf-8')
+    if isinstance(value, str):
+        return str(value) # e.g. Device instance
+    return value
+
+def _count_configuration(func):
+    """
+    Returns a task method that counts the changes of the task
+    configuration, see `Task.describe`.
+    """
+    @functools.wraps(func)
+    def method(self, *args, **kws):
+        self._configuration_count += 1
+        return func(self, *args, **kws)
+    return method
+
+def _record_call(func):
+    """
+    Returns a task method that records its calls for `Task.to_config`
+    and counts them as configuration changes. Calls made from within
+    another recorded method are not recorded.
+    """
+    name = func.__name__
+    argnames = getargspec(func).args[1:]
+    @functools.wraps(func)
+    def method(self, *args, **kws):
+        self._configuration_count += 1
+        self._config_depth += 1
+        try:
+            result = func(self, *args, **kws)
+        finally:
+            self._config_depth -= 1
+        if not self._config_depth:
+            args, kws = _to_json(args), _to_json(kws)
+            self._record_config_call(name, args, kws, _config_selector(argnames, args, kws))
+        return result
+    return method
+
+def _config_selector(argnames, args, kws):
+    """
+    Returns the arguments of a recorded ``set_*`` call that select
+    what is set, e.g. the channel, no matter whether they are passed
+    by position or by keyword. The value is the last parameter of a
+    ``set_*`` method and is left out.
+    """
+    bound = dict(zip(argnames, args))
+    bound.update(kws)
+    value = argnames[-1] if argnames else None
+    return sorted([k, v] for k, v in bound.items() if k != value)
+
 def CALL(name, *args):
     """
     Calls libnidaqmx function ``name`` and arguments ``args``.
     """
     funcname = 'DAQmx' + name
     func = getattr(libnidaqmx, funcname)
-    new_args = []
-    for a in args:
-        if isinstance(a, unicode):
-            print(name, 'argument', a, 'is unicode', file=sys.stderr)
-            new_args.append (bytes(a,))# encoding='utf-8'))
-            #for python 3 change above line to
-            #new_args.append (bytes(a, encoding='utf-8'))
-        else:
-            new_args.append (a)
+    new_args = _convert_args(name, args)
     # pylint: disable=star-args
     r = func(*new_args)
     r = CHK(r, funcname, *new_args)
     return r
 
+# Per-thread string buffers reused by get_string_property.
+_string_buffers = threading.local()
+# Values of device string properties, such as channel lists, by
+# function name and arguments. They change only when a device is
+# renamed or replaced, see clear_string_property_cache.
+_string_cache = {}
+
+def get_string_property(name, *args, **kws):
+    """
+    Returns the value of a string property.
+
+    Calls libnidaqmx function ``name`` with arguments ``args`` followed
+    by a string buffer and its size. The required buffer size is first
+    queried from the driver by passing a zero size, so that strings of
+    any length can be retrieved. The buffer is reused by subsequent
+    calls in the same thread.
+
+    Parameters
+    ----------
+    name : str
+      The function name without the ``DAQmx`` prefix, for instance
+      ``'GetDevAIPhysicalChans'``.
+    args :
+      The arguments preceding the buffer, for instance the device
+      name.
+    cache : bool
+      If True then the value is cached by ``name`` and ``args``. Use
+      only for properties that cannot change while the driver is
+      loaded, see `clear_string_property_cache`.
+
+    Returns
+    -------
+    value : str
+    """
+    cache = kws.pop('cache', False)
+    if kws:
+        raise TypeError('Unexpected keyword arguments: %s' % (', '.join(kws)))
+    if cache:
+        key = (name,) + args
+        value = _string_cache.get(key)
+        if value is not None:
+            return value
+    funcname = 'DAQmx' + name
+    func = getattr(libnidaqmx, funcname)
+    new_args = _convert_args(name, args)
+    while True:
+        # pylint: disable=star-args
+        size = func(*(new_args + [None, 0]))
+        if size <= 0:
+            CHK(size, funcname, *new_args)
+            value = b''
+            break
+        buf = getattr(_string_buffers, 'buf', None)
+        if buf is None or len(buf) < size:
+            buf = _string_buffers.buf = ctypes.create_string_buffer(
+                max(size, default_buf_size))
+        r = func(*(new_args + [ctypes.byref(buf), uInt32(size)]))
+        if error_map.get(r) == 'BufferTooSmallForString':
+            # the value grew after the size query
+            continue
+        CHK(r, funcname, *new_args)
+        value = buf.value
+        break
+    if not isinstance(value, str):
+        value = value.decode('utf-8') # Python 3
+    if cache:
+        _string_cache[key] = value
+    return value
+
+def clear_string_property_cache(device=None):
+    """
+    Forgets the cached values of string properties, for instance after
+    devices have been renamed or reconfigured in MAX.
+
+    Parameters
+    ----------
+    device : {str, None}
+      If given then only the values of this device name are
+      forgotten.
+    """
+    if device is None:
+        _string_cache.clear()
+        return
+    for key in list(_string_cache):
+        if str(device) in key[1:]:
+            _string_cache.pop(key, None)
+
+def _split_names(value):
+    return [n.strip() for n in value.split(',') if n.strip()]
+
 def make_pattern(paths, _main=True):
     """
     Returns a pattern string from a list of path strings.
@@ -377,10 +547,7 @@ class Device(str):
         """
         Indicates the product name of the device.
         """
-        buf_size = default_buf_size
-        buf = ctypes.create_string_buffer(b'\000' * buf_size)
-        CALL ('GetDevProductType', self, ctypes.byref (buf), buf_size)
-        return buf.value
+        return get_string_property('GetDevProductType', self, cache=True)
 
     def get_product_number(self):
         """
@@ -408,20 +575,15 @@ class Device(str):
         Parameters
         ----------
         buf_size : {int, None}
-          Size of the buffer for retrieving information. If ``buf_size``
-          is ``None`` then `nidaqmx.libnidaqmx.default_buf_size` will be
-          used.
+          Unused, the required buffer size is obtained from the
+          driver. Kept for backward compatibility.
 
         Returns
         -------
         names : list
         """
-        if buf_size is None:
-            buf_size = default_buf_size
-        buf = ctypes.create_string_buffer(b'\000' * buf_size)
-        CALL ('GetDevAIPhysicalChans', self, ctypes.byref (buf), buf_size)
-        names = [n.strip() for n in buf.value.split(',') if n.strip()]
-        return names        
+        names = _split_names(get_string_property('GetDevAIPhysicalChans', self, cache=True))
+        return names
 
     def get_analog_output_channels(self, buf_size=None):
         """
@@ -431,20 +593,15 @@ class Device(str):
         Parameters
         ----------
         buf_size : {int, None}
-          Size of the buffer for retrieving information. If ``buf_size``
-          is ``None`` then `nidaqmx.libnidaqmx.default_buf_size` will be
-          used.
+          Unused, the required buffer size is obtained from the
+          driver. Kept for backward compatibility.
 
         Returns
         -------
         names : list
         """
-        if buf_size is None:
-            buf_size = default_buf_size
-        buf = ctypes.create_string_buffer(b'\000' * buf_size)
-        CALL('GetDevAOPhysicalChans', self, ctypes.byref (buf), buf_size)
-        names = [n.strip() for n in buf.value.split(',') if n.strip()]
-        return names        
+        names = _split_names(get_string_property('GetDevAOPhysicalChans', self, cache=True))
+        return names
 
     def get_digital_input_lines(self, buf_size=None):
         """
@@ -454,20 +611,15 @@ class Device(str):
         Parameters
         ----------
         buf_size : {int, None}
-          Size of the buffer for retrieving information. If ``buf_size``
-          is ``None`` then `nidaqmx.libnidaqmx.default_buf_size` will be
-          used.
+          Unused, the required buffer size is obtained from the
+          driver. Kept for backward compatibility.
 
         Returns
         -------
         names : list
         """
-        if buf_size is None:
-            buf_size = default_buf_size
-        buf = ctypes.create_string_buffer(b'\000' * buf_size)
-        CALL ('GetDevDILines', self, ctypes.byref (buf), buf_size)
-        names = [n.strip() for n in buf.value.split(',') if n.strip()]
-        return names        
+        names = _split_names(get_string_property('GetDevDILines', self, cache=True))
+        return names
 
     def get_digital_input_ports(self, buf_size=None):
         """
@@ -477,20 +629,15 @@ class Device(str):
         Parameters
         ----------
         buf_size : {int, None}
-          Size of the buffer for retrieving information. If ``buf_size``
-          is ``None`` then `nidaqmx.libnidaqmx.default_buf_size` will be
-          used.
+          Unused, the required buffer size is obtained from the
+          driver. Kept for backward compatibility.
 
         Returns
         -------
         names : list
         """
-        if buf_size is None:
-            buf_size = default_buf_size
-        buf = ctypes.create_string_buffer(b'\000' * buf_size)
-        CALL ('GetDevDIPorts', self, ctypes.byref (buf), buf_size)
-        names = [n.strip() for n in buf.value.split(',') if n.strip()]
-        return names        
+        names = _split_names(get_string_property('GetDevDIPorts', self, cache=True))
+        return names
 
     def get_digital_output_lines(self, buf_size=None):
         """
@@ -500,20 +647,15 @@ class Device(str):
         Parameters
         ----------
         buf_size : {int, None}
-          Size of the buffer for retrieving information. If ``buf_size``
-          is ``None`` then `nidaqmx.libnidaqmx.default_buf_size` will be
-          used.
+          Unused, the required buffer size is obtained from the
+          driver. Kept for backward compatibility.
 
         Returns
         -------
         names : list
         """
-        if buf_size is None:
-            buf_size = default_buf_size
-        buf = ctypes.create_string_buffer(b'\000' * buf_size)
-        CALL ('GetDevDOLines', self, ctypes.byref (buf), buf_size)
-        names = [n.strip() for n in buf.value.split(',') if n.strip()]
-        return names        
+        names = _split_names(get_string_property('GetDevDOLines', self, cache=True))
+        return names
 
     def get_digital_output_ports(self, buf_size=None):
         """
@@ -523,20 +665,15 @@ class Device(str):
         Parameters
         ----------
         buf_size : {int, None}
-          Size of the buffer for retrieving information. If ``buf_size``
-          is ``None`` then `nidaqmx.libnidaqmx.default_buf_size` will be
-          used.
+          Unused, the required buffer size is obtained from the
+          driver. Kept for backward compatibility.
 
         Returns
         -------
         names : list
         """
-        if buf_size is None:
-            buf_size = default_buf_size
-        buf = ctypes.create_string_buffer(b'\000' * buf_size)
-        CALL ('GetDevDOPorts', self, ctypes.byref (buf), buf_size)
-        names = [n.strip() for n in buf.value.split(',') if n.strip()]
-        return names        
+        names = _split_names(get_string_property('GetDevDOPorts', self, cache=True))
+        return names
 
     def get_counter_input_channels (self, buf_size=None):
         """
@@ -546,20 +683,15 @@ class Device(str):
         Parameters
         ----------
         buf_size : {int, None}
-          Size of the buffer for retrieving information. If ``buf_size``
-          is ``None`` then `nidaqmx.libnidaqmx.default_buf_size` will be
-          used.
+          Unused, the required buffer size is obtained from the
+          driver. Kept for backward compatibility.
 
         Returns
         -------
         names : list
         """
-        if buf_size is None:
-            buf_size = default_buf_size
-        buf = ctypes.create_string_buffer(b'\000' * buf_size)
-        CALL ('GetDevCIPhysicalChans', self, ctypes.byref (buf), buf_size)
-        names = [n.strip() for n in buf.value.split(',') if n.strip()]
-        return names        
+        names = _split_names(get_string_property('GetDevCIPhysicalChans', self, cache=True))
+        return names
 
     def get_counter_output_channels (self, buf_size=None):
         """
@@ -569,20 +701,15 @@ class Device(str):
         Parameters
         ----------
         buf_size : {int, None}
-          Size of the buffer for retrieving information. If ``buf_size``
-          is ``None`` then `nidaqmx.libnidaqmx.default_buf_size` will be
-          used.
+          Unused, the required buffer size is obtained from the
+          driver. Kept for backward compatibility.
 
         Returns
         -------
         names : list
         """
-        if buf_size is None:
-            buf_size = default_buf_size
-        buf = ctypes.create_string_buffer(b'\000' * buf_size)
-        CALL ('GetDevCOPhysicalChans', self, ctypes.byref (buf), buf_size)
-        names = [n.strip() for n in buf.value.split(',') if n.strip()]
-        return names        
+        names = _split_names(get_string_property('GetDevCOPhysicalChans', self, cache=True))
+        return names
 
     def get_bus_type(self):
         """
@@ -694,10 +821,7 @@ class System(object):
         """
         Indicates the names of all devices installed in the system.
         """
-        buf_size = default_buf_size
-        buf = ctypes.create_string_buffer(b'\000' * buf_size)
-        CALL ('GetSysDevNames', ctypes.byref (buf), buf_size)
-        names = [Device(n.strip()) for n in buf.value.split(',') if n.strip()]
+        names = [Device(n) for n in _split_names(get_string_property('GetSysDevNames'))]
         return names
 
     @property
@@ -706,10 +830,7 @@ class System(object):
         Indicates an array that contains the names of all tasks saved
         on the system.
         """
-        buf_size = default_buf_size
-        buf = ctypes.create_string_buffer(b'\000' * buf_size)
-        CALL ('GetSysTasks', ctypes.byref (buf), buf_size)
-        names = [n.strip() for n in buf.value.split(',') if n.strip()]
+        names = _split_names(get_string_property('GetSysTasks'))
         return names
 
     @property
@@ -718,12 +839,203 @@ class System(object):
         Indicates an array that contains the names of all global
         channels saved on the system.
         """
-        buf_size = default_buf_size
-        buf = ctypes.create_string_buffer(b'\000' * buf_size)
-        CALL ('GetSysGlobalChans', ctypes.byref (buf), buf_size)
-        names = [n.strip() for n in buf.value.split(',') if n.strip()]
+        names = _split_names(get_string_property('GetSysGlobalChans'))
         return names
 
+    def snapshot(self, processes=None):
+        """
+        Queries the properties of all devices concurrently.
+
+        Each device is queried in a worker thread of a thread pool, so
+        the total time is about that of the slowest device rather than
+        the sum over all devices.
+
+        Parameters
+        ----------
+
+        processes : {int, None}
+          The number of worker threads. By default one thread per
+          device.
+
+        Returns
+        -------
+
+        snapshot : SystemSnapshot
+        """
+        from multiprocessing.pool import ThreadPool
+        devices = self.devices
+        system_info = dict(version=self.version,
+                           tasks=tuple(self.tasks),
+                           global_channels=tuple(self.global_channels))
+        if not devices:
+            return SystemSnapshot(devices=(), **system_info)
+        pool = ThreadPool(processes or len(devices))
+        try:
+            snapshots = pool.map(DeviceSnapshot.query, devices)
+        finally:
+            pool.close()
+            pool.join()
+        return SystemSnapshot(devices=tuple(snapshots), **system_info)
+
+class _Snapshot(object):
+    """
+    Base class of immutable property snapshots.
+    """
+
+    __slots__ = ()
+
+    def __init__(self, **kws):
+        for name in self.__slots__:
+            object.__setattr__(self, name, kws.get(name))
+
+    def __setattr__(self, name, value):
+        raise AttributeError('%s is read-only' % (self.__class__.__name__))
+
+    __delattr__ = __setattr__
+
+    def __repr__(self):
+        return '%s(%s)' % (self.__class__.__name__,
+                           ', '.join('%s=%r' % (name, getattr(self, name))
+                                     for name in self.__slots__
+                                     if not name.startswith('_')))
+
+class DeviceSnapshot(_Snapshot):
+    """
+    Immutable snapshot of the properties of a `Device`.
+
+    Channel, line and port lists are tuples. The `make_pattern`
+    summaries of the lists are computed once when the snapshot is
+    created and are available as attributes with the ``_pattern``
+    suffix, for instance ``analog_input_channels_pattern``. Properties
+    that the device does not support are None.
+
+    See also
+    --------
+    System.snapshot
+    """
+
+    #: Names of the scalar properties.
+    scalar_fields = ('product_type', 'product_number', 'serial_number', 'bus')
+    #: Names of the channel, line and port list properties.
+    list_fields = ('analog_input_channels', 'analog_output_channels',
+                   'digital_input_lines', 'digital_input_ports',
+                   'digital_output_lines', 'digital_output_ports',
+                   'counter_input_channels', 'counter_output_channels')
+
+    __slots__ = (('name',) + scalar_fields + list_fields
+                 + tuple(field + '_pattern' for field in list_fields))
+
+    @classmethod
+    def query(cls, device):
+        """
+        Returns the snapshot of `device` queried from the driver.
+        """
+        device = Device(device)
+        kws = dict(name=str(device))
+        for field in cls.scalar_fields + cls.list_fields:
+            try:
+                value = getattr(device, 'get_' + field)()
+            except RuntimeError:
+                continue
+            if field in cls.list_fields:
+                kws[field] = tuple(value)
+                kws[field + '_pattern'] = make_pattern(value) or None
+            else:
+                kws[field] = value
+        return cls(**kws)
+
+    def as_dict(self):
+        """
+        Returns the properties as a dictionary of lists and scalars.
+        """
+        d = dict(name=self.name)
+        for field in self.scalar_fields:
+            d[field] = getattr(self, field)
+        for field in self.list_fields:
+            value = getattr(self, field)
+            d[field] = None if value is None else list(value)
+        return d
+
+class SystemSnapshot(_Snapshot):
+    """
+    Immutable snapshot of the `System` properties and of all devices.
+
+    Attributes
+    ----------
+    version
+    tasks
+    global_channels
+    devices : tuple
+      `DeviceSnapshot` instances in the order of `System.devices`.
+
+    See also
+    --------
+    System.snapshot
+    """
+
+    __slots__ = ('version', 'tasks', 'global_channels', 'devices')
+
+    def __getitem__(self, name):
+        """
+        Returns the `DeviceSnapshot` of the device `name`.
+        """
+        for device in self.devices:
+            if device.name == name:
+                return device
+        raise KeyError(name)
+
+    def collect(self, field):
+        """
+        Returns the concatenated list `field` of all devices, for
+        instance all ``'analog_input_channels'`` of the system.
+        """
+        result = []
+        for device in self.devices:
+            result.extend(getattr(device, field) or ())
+        return result
+
+class ChannelDescription(_Snapshot):
+    """
+    Immutable snapshot of the properties of a virtual channel of a
+    task. Properties that do not apply to the channel are None.
+
+    See also
+    --------
+    Task.describe
+    """
+
+    __slots__ = ('name', 'physical_channel_name', 'channel_type', 'is_global',
+                 'measurement_type', 'min', 'max', 'units',
+                 'data_transfer_mechanism', 'high', 'low', 'auto_zero_mode',
+                 'timebase_rate', 'duplicate_count_prevention')
+
+class TaskDescription(_Snapshot):
+    """
+    Immutable snapshot of the properties of a task and its channels.
+
+    Attributes
+    ----------
+    name
+    devices : tuple
+    channel_type
+    channel_io_type
+    buffer_size
+    sample_clock_rate
+    sample_mode
+    samples_per_channel
+    channels : tuple
+      `ChannelDescription` instances in the order of
+      `Task.get_names_of_channels`.
+
+    See also
+    --------
+    Task.describe
+    """
+
+    __slots__ = ('name', 'devices', 'channel_type', 'channel_io_type',
+                 'buffer_size', 'sample_clock_rate', 'sample_mode',
+                 'samples_per_channel', 'channels')
+
 class Task(uInt32):
 
     """
@@ -774,12 +1086,17 @@ class Task(uInt32):
         unnecessary memory.
         """
         name = str(name)
-        super(Task, self).__init__(0)
+        # Not super(): on Python 3 a __class__ cell, created by any
+        # use of super in the class body, is rejected by the ctypes
+        # metaclass.
+        uInt32.__init__(self, 0)
+        self._configuration_count = 0
+        self._description = None
+        self._applied_config = (None, {})
+        self._config_calls = []
+        self._config_depth = 0
         CALL('CreateTask', name, ctypes.byref(self))
-        buf_size = max(len(name)+1, default_buf_size)
-        buf = ctypes.create_string_buffer(b'\000' * buf_size)
-        CALL('GetTaskName', self, ctypes.byref(buf), buf_size)
-        self.name = buf.value
+        self.name = get_string_property('GetTaskName', self)
         self.sample_mode = None
         self.samples_per_channel = None
 
@@ -822,6 +1139,9 @@ class Task(uInt32):
         """
         if self.value:
             r = libnidaqmx.DAQmxClearTask(self)
+            # The handle is invalid now, also when clearing failed;
+            # do not clear it again from __del__.
+            self.value = 0
             if r:
                 warnings.warn("DAQmxClearTask failed with error code %s (%r)" % (r, error_map.get(r)))
 
@@ -916,19 +1236,14 @@ class Task(uInt32):
         Parameters
         ----------
         buf_size : {int, None}
-          Size of the buffer for retrieving information. If ``buf_size``
-          is ``None`` then `nidaqmx.libnidaqmx.default_buf_size` will be
-          used.
+          Unused, the required buffer size is obtained from the
+          driver. Kept for backward compatibility.
 
         Returns
         -------
         names : list
         """
-        if buf_size is None:
-            buf_size = default_buf_size
-        buf = ctypes.create_string_buffer(b'\000' * buf_size)
-        CALL('GetTaskChannels', self, ctypes.byref(buf), buf_size)
-        names = [n.strip() for n in buf.value.split(',') if n.strip()]
+        names = _split_names(get_string_property('GetTaskChannels', self))
         n = self.get_number_of_channels()
         assert len(names)==n,repr((names, n))
         return names
@@ -941,19 +1256,14 @@ class Task(uInt32):
         Parameters
         ----------
         buf_size : {int, None}
-          Size of the buffer for retrieving information. If ``buf_size``
-          is ``None`` then `nidaqmx.libnidaqmx.default_buf_size` will be
-          used.
+          Unused, the required buffer size is obtained from the
+          driver. Kept for backward compatibility.
 
         Returns
         -------
         names : list
         """
-        if buf_size is None:
-            buf_size = default_buf_size
-        buf = ctypes.create_string_buffer(b'\000' * buf_size)
-        CALL('GetTaskDevices', self, ctypes.byref(buf), buf_size)
-        names = [n.strip() for n in buf.value.split(',') if n.strip()]
+        names = _split_names(get_string_property('GetTaskDevices', self))
         return names
 
     def alter_state(self, state):
@@ -1004,6 +1314,152 @@ class Task(uInt32):
         state_val = self._get_map_value ('state', state_map, state)
         return CALL('TaskControl', self, state_val) == 0
 
+    def apply_config(self, config, commit=True):
+        """
+        Applies a task configuration, calling only the methods whose
+        arguments differ from the previously applied configuration.
+
+        Parameters
+        ----------
+
+        config : {dict, list}
+          A dictionary or a list of ``(key, value)`` pairs. A key is
+          the name of a ``set_*`` or ``configure_*`` method, or a tuple
+          of the method name and its leading arguments, such as a
+          channel name. A value is a dictionary of keyword arguments, a
+          tuple of positional arguments or a single argument. For
+          example::
+
+            {'configure_timing_sample_clock': dict(rate=1e4, samples_per_channel=10000),
+             'set_buffer_size': 100000,
+             ('set_max', 'Dev1/ai0'): 5.0,
+             'set_read_offset': 0}
+
+          ``configure_*`` items are applied before ``set_*`` items,
+          otherwise items are applied in the order of `config`. Since
+          ``configure_*`` methods may reset other properties, all
+          ``set_*`` items are applied again when a ``configure_*``
+          item has changed.
+
+        commit : bool
+          If True and any item was applied then the task is committed
+          with ``alter_state('commit')``, so that the driver verifies
+          and programs the new configuration once.
+
+        Returns
+        -------
+
+        applied : list
+          The keys of the applied items.
+
+        Notes
+        -----
+        When the task has been reconfigured by other means since the
+        last call, for instance by calling a setter directly, the whole
+        configuration is applied.
+        """
+        count, previous = self._applied_config
+        if count != self._configuration_count:
+            previous = {}
+        items = list(config.items() if hasattr(config, 'items') else config)
+        items.sort(key=lambda item: 0 if _config_method(item[0]).startswith('configure_') else 1)
+        current = dict(previous)
+        applied = []
+        force = False
+        for key, value in items:
+            method = _config_method(key)
+            if not force and key in previous and previous[key] == value:
+                continue
+            if not (method.startswith('set_') or method.startswith('configure_')):
+                raise ValueError('Expected set_* or configure_* method name but got %r' % (method,))
+            args = tuple(key[1:]) if isinstance(key, tuple) else ()
+            if isinstance(value, dict):
+                getattr(self, method)(*args, **value)
+            elif isinstance(value, tuple):
+                getattr(self, method)(*(args + value))
+            else:
+                getattr(self, method)(*(args + (value,)))
+            if method.startswith('configure_'):
+                force = True
+            current[key] = value
+            applied.append(key)
+        if applied and commit:
+            self.alter_state('commit')
+        self._applied_config = (self._configuration_count, current)
+        return applied
+
+    def _record_config_call(self, method, args, kws, selector):
+        calls = self._config_calls
+        if method.startswith('configure_'):
+            # a configure call sets all properties of its group
+            calls[:] = [c for c in calls if c[0] != method]
+        elif method.startswith('set_'):
+            # a set call replaces the previous one for the same
+            # channel or other selecting arguments
+            calls[:] = [c for c in calls if c[0] != method or c[3] != selector]
+        calls.append([method, args, kws, selector])
+
+    def to_config(self):
+        """
+        Returns the task definition in a JSON serializable form.
+
+        The definition consists of the calls of ``create_*``,
+        ``configure_*`` and ``set_*`` methods made so far, in order,
+        so it covers channels, timing, triggers and buffer
+        settings. A call that is superseded by a later call of the
+        same method (for the same channel) is dropped.
+
+        Returns
+        -------
+
+        config : dict
+          A dictionary with items ``type`` (the task class name),
+          ``name`` (the task name) and ``calls`` (a list of ``[method,
+          args, kws]`` lists).
+
+        See also
+        --------
+        from_config
+        """
+        return dict(type=self.__class__.__name__, name=_to_json(self.name),
+                    calls=[[method, list(args), dict(kws)]
+                           for method, args, kws, selector in self._config_calls])
+
+    @classmethod
+    def from_config(cls, config, name=None, commit=True):
+        """
+        Creates a task from a definition returned by `to_config`.
+
+        Parameters
+        ----------
+
+        config : dict
+          The task definition, possibly loaded from JSON.
+
+        name : {str, None}
+          The name of the new task. Task names must be unique within
+          a process, so by default the driver generates a name.
+
+        commit : bool
+          If True then the new task is committed with
+          ``alter_state('commit')`` so that it starts quickly.
+
+        Returns
+        -------
+
+        task : Task
+          An instance of the task class given in `config`.
+        """
+        task_cls = globals().get(config['type'])
+        if not (isinstance(task_cls, type) and issubclass(task_cls, cls)):
+            raise ValueError('Expected %s subclass name but got %r' % (cls.__name__, config['type']))
+        task = task_cls(name or '')
+        for method, args, kws in config['calls']:
+            getattr(task, method)(*args, **dict((str(k), v) for k, v in kws.items()))
+        if commit:
+            task.alter_state('commit')
+        return task
+
     # Not implemented: DAQmxAddGlobalChansToTask, DAQmxLoadTask
     # DAQmxGetNthTaskChannel
 
@@ -1774,6 +2230,21 @@ class Task(uInt32):
         when_val = self._get_map_value('when', when_map, when)
         return CALL ('CfgDigPatternRefTrig', self, source, pattern, when_val, uInt32(pre_trigger_samps))==0
 
+    def get_reference_trigger_pretrigger_samples(self):
+        """
+        Indicates the number of samples per channel acquired before
+        the Reference Trigger, that is, the index of the trigger
+        sample in a reference triggered record.
+
+        See also
+        --------
+        configure_analog_edge_reference_trigger,
+        configure_digital_edge_reference_trigger
+        """
+        d = uInt32(0)
+        CALL('GetRefTrigPretrigSamples', self, ctypes.byref(d))
+        return d.value
+
 
     def disable_reference_trigger(self):
         """
@@ -1837,10 +2308,7 @@ class Task(uInt32):
         virtual channel is based.
         """
         channel_name = str (channel_name)
-        buf_size = default_buf_size
-        buf = ctypes.create_string_buffer(b'\000' * buf_size)
-        CALL('GetPhysicalChanName', self, channel_name, ctypes.byref(buf), uInt32(buf_size))
-        return buf.value
+        return get_string_property('GetPhysicalChanName', self, channel_name)
 
     def get_channel_type(self, channel_name):
         """
@@ -2519,6 +2987,79 @@ class Task(uInt32):
         when_val = self._get_map_value('when', when_map, when)
         return CALL (routine, self, when_val)
 
+    def _describe_channel(self, channel_name):
+        def get(method, *args):
+            try:
+                return getattr(self, method)(*args)
+            except RuntimeError:
+                # the property does not apply to the channel
+                return None
+        kws = dict(name=channel_name,
+                   physical_channel_name=get('get_physical_channel_name', channel_name),
+                   channel_type=get('get_channel_type', channel_name),
+                   is_global=get('is_channel_global', channel_name))
+        if self.channel_type in ['AI', 'AO']:
+            kws.update(measurement_type=get('get_measurment_type', channel_name),
+                       min=get('get_min', channel_name),
+                       max=get('get_max', channel_name),
+                       units=get('get_units', channel_name),
+                       data_transfer_mechanism=get('get_data_transfer_mechanism', channel_name))
+        if self.channel_type == 'AI':
+            kws.update(high=get('get_high', channel_name),
+                       low=get('get_low', channel_name),
+                       auto_zero_mode=get('get_auto_zero_mode', channel_name))
+        if self.channel_type == 'CI':
+            kws.update(timebase_rate=get('get_timebase_rate', channel_name),
+                       duplicate_count_prevention=get('get_duplicate_count_prevention', channel_name))
+        return ChannelDescription(**kws)
+
+    def describe(self):
+        """
+        Returns the properties of the task and its channels.
+
+        All properties are queried from the driver in one pass. The
+        result is cached and returned by subsequent calls until the
+        task is reconfigured, that is, until a ``create_*``,
+        ``configure_*``, ``set_*``, ``reset_*`` or ``disable_*``
+        method of the task is called. Driver functions called directly
+        with `CALL` are not noticed. Polling the description of an
+        unchanged task does not call the driver.
+
+        Returns
+        -------
+        description : TaskDescription
+
+        See also
+        --------
+        get_info_str
+        """
+        description = self._description
+        if description is not None and description[0] == self._configuration_count:
+            return description[1]
+        count = self._configuration_count
+        buffer_size = sample_clock_rate = None
+        if self.channel_type is not None:
+            try:
+                buffer_size = self.get_buffer_size()
+            except RuntimeError:
+                pass
+            try:
+                sample_clock_rate = self.get_sample_clock_rate()
+            except RuntimeError:
+                pass
+        channels = tuple(self._describe_channel(channel_name)
+                         for channel_name in self.get_names_of_channels())
+        description = TaskDescription(
+            name=self.name, devices=tuple(self.get_devices()),
+            channel_type=self.channel_type,
+            channel_io_type=None if self.channel_type is None else self.channel_io_type,
+            buffer_size=buffer_size, sample_clock_rate=sample_clock_rate,
+            sample_mode=self.sample_mode,
+            samples_per_channel=self.samples_per_channel,
+            channels=channels)
+        self._description = (count, description)
+        return description
+
     def get_info_str(self, global_info=False):
         """
         Return verbose information string about the task and its
@@ -2529,57 +3070,65 @@ class Task(uInt32):
 
         global_info: bool
           If True then include global information.
+
+        See also
+        --------
+        describe
         """
         lines = []
         tab = ''
         if global_info:
-            lines.append(tab+'NI-DAQwx version: %s' % (self.get_version()))
-            lines.append(tab+'System devices: %s' % (', '.join(self.get_system_devices()) or None))
-            lines.append(tab+'System global channels: %s' % (', '.join(self.get_system_global_channels()) or None))
-            lines.append(tab+'System tasks: %s' % (', '.join(self.get_system_tasks()) or None))
+            # Device properties come from the inventory cache to avoid
+            # dozens of driver calls per device.
+            from .inventory import get_inventory
+            system = self.system
+            lines.append(tab+'NI-DAQwx version: %s' % (system.version))
+            lines.append(tab+'System devices: %s' % (', '.join(system.devices) or None))
+            lines.append(tab+'System global channels: %s' % (', '.join(system.global_channels) or None))
+            lines.append(tab+'System tasks: %s' % (', '.join(system.tasks) or None))
             tab += '  '
-            for device in self.get_system_devices():
-                lines.append(tab[:-1]+'Device: %s' % (device))
-                lines.append(tab + 'Product type: %s' % (device.get_product_type()))
-                lines.append(tab + 'Product number: %s' % (device.get_product_number()))
-                lines.append(tab + 'Serial number: %s' % (device.get_serial_number()))
-                lines.append (tab+'Bus: %s' % (device.get_bus ()))
-                lines.append (tab+'Analog input channels: %s' % (make_pattern(device.get_analog_input_channels()) or None))
-                lines.append (tab+'Analog output channels: %s' % (make_pattern(device.get_analog_output_channels()) or None))
-                lines.append (tab+'Digital input lines: %s' % (make_pattern(device.get_digital_input_lines()) or None))
-                lines.append (tab+'Digital input ports: %s' % (make_pattern(device.get_digital_input_ports()) or None))
-                lines.append (tab+'Digital output lines: %s' % (make_pattern(device.get_digital_output_lines()) or None))
-                lines.append (tab+'Digital output ports: %s' % (make_pattern(device.get_digital_output_ports()) or None))
-                lines.append (tab+'Counter input channels: %s' % (make_pattern(device.get_counter_input_channels()) or None))
-                lines.append (tab+'Counter output channels: %s' % (make_pattern(device.get_counter_output_channels()) or None))
-        lines.append(tab[:-1]+'Task name: %s' % (self.name))
-        lines.append(tab+'Names of devices: %s' % (', '.join(self.get_devices()) or None))
-        lines.append(tab+'Number of channels: %s' % (self.get_number_of_channels()))
-        lines.append(tab+'Names of channels: %s' % (', '.join(self.get_names_of_channels()) or None))
-        lines.append(tab+'Channel type: %s' % (self.channel_type))
-        lines.append(tab+'Channel I/O type: %s' % (self.channel_io_type))
-        lines.append(tab+'Buffer size: %s' % (self.get_buffer_size()))
+            for record in get_inventory().devices():
+                lines.append(tab[:-1]+'Device: %s' % (record['name']))
+                lines.append(tab + 'Product type: %s' % (record['product_type']))
+                lines.append(tab + 'Product number: %s' % (record['product_number']))
+                lines.append(tab + 'Serial number: %s' % (record['serial_number']))
+                lines.append (tab+'Bus: %s' % (record['bus']))
+                lines.append (tab+'Analog input channels: %s' % (make_pattern(record['analog_input_channels'] or []) or None))
+                lines.append (tab+'Analog output channels: %s' % (make_pattern(record['analog_output_channels'] or []) or None))
+                lines.append (tab+'Digital input lines: %s' % (make_pattern(record['digital_input_lines'] or []) or None))
+                lines.append (tab+'Digital input ports: %s' % (make_pattern(record['digital_input_ports'] or []) or None))
+                lines.append (tab+'Digital output lines: %s' % (make_pattern(record['digital_output_lines'] or []) or None))
+                lines.append (tab+'Digital output ports: %s' % (make_pattern(record['digital_output_ports'] or []) or None))
+                lines.append (tab+'Counter input channels: %s' % (make_pattern(record['counter_input_channels'] or []) or None))
+                lines.append (tab+'Counter output channels: %s' % (make_pattern(record['counter_output_channels'] or []) or None))
+        info = self.describe()
+        lines.append(tab[:-1]+'Task name: %s' % (info.name))
+        lines.append(tab+'Names of devices: %s' % (', '.join(info.devices) or None))
+        lines.append(tab+'Number of channels: %s' % (len(info.channels)))
+        lines.append(tab+'Names of channels: %s' % (', '.join(c.name for c in info.channels) or None))
+        lines.append(tab+'Channel type: %s' % (info.channel_type))
+        lines.append(tab+'Channel I/O type: %s' % (info.channel_io_type))
+        lines.append(tab+'Buffer size: %s' % (info.buffer_size))
 
         tab += '  '
-        for channel_name in self.get_names_of_channels():
-            lines.append(tab[:-1]+'Channel name: %s' % (channel_name))
-            lines.append(tab+'Physical channel name: %s' % (self.get_physical_channel_name(channel_name)))
-            lines.append(tab+'Channel type: %s' % (self.get_channel_type (channel_name)))
-            lines.append(tab+'Is global: %s' % (self.is_channel_global(channel_name)))
-            if self.channel_type in ['AI', 'AO']:
-                lines.append(tab+'Measurment type: %s' % (self.get_measurment_type(channel_name)))
-                lines.append(tab+'Minimum/Maximum values: %s/%s %s' % (self.get_min(channel_name),
-                                                                   self.get_max(channel_name),
-                                                                   self.get_units(channel_name)))
-                #lines.append(tab+'Gain: %s' % (self.get_gain (channel_name)))
-                lines.append(tab+'Data transfer mechanism: %s' % (self.get_data_transfer_mechanism(channel_name)))
-            if self.channel_type=='AI':
-                lines.append(tab+'High/Low values: %s/%s' % (self.get_high(channel_name),
-                                                             self.get_low (channel_name)))
-                lines.append(tab+'Auto zero mode: %s' % (self.get_auto_zero_mode(channel_name)))
-            if self.channel_type=='CI':
-                lines.append(tab+'Timebase rate: %sHz' % (self.get_timebase_rate(channel_name)))
-                lines.append(tab+'Dublicate count prevention: %s' % (self.get_dublicate_count_prevention(channel_name)))
+        for channel in info.channels:
+            lines.append(tab[:-1]+'Channel name: %s' % (channel.name))
+            lines.append(tab+'Physical channel name: %s' % (channel.physical_channel_name))
+            lines.append(tab+'Channel type: %s' % (channel.channel_type))
+            lines.append(tab+'Is global: %s' % (channel.is_global))
+            if info.channel_type in ['AI', 'AO']:
+                lines.append(tab+'Measurment type: %s' % (channel.measurement_type))
+                lines.append(tab+'Minimum/Maximum values: %s/%s %s' % (channel.min,
+                                                                   channel.max,
+                                                                   channel.units))
+                lines.append(tab+'Data transfer mechanism: %s' % (channel.data_transfer_mechanism))
+            if info.channel_type=='AI':
+                lines.append(tab+'High/Low values: %s/%s' % (channel.high,
+                                                             channel.low))
+                lines.append(tab+'Auto zero mode: %s' % (channel.auto_zero_mode))
+            if info.channel_type=='CI':
+                lines.append(tab+'Timebase rate: %sHz' % (channel.timebase_rate))
+                lines.append(tab+'Dublicate count prevention: %s' % (channel.duplicate_count_prevention))
         return '\n'.join(lines)
 
     def get_read_current_position (self):
@@ -3044,7 +3593,7 @@ class AnalogInputTask(Task):
         return r==0
 
     def read(self, samples_per_channel=None, timeout=10.0,
-             fill_mode='group_by_scan_number'):
+             fill_mode='group_by_scan_number', out=None):
         """
         Reads multiple floating-point samples from a task that
         contains one or more analog input channels.
@@ -3099,6 +3648,13 @@ class AnalogInputTask(Task):
               
                 ch0:s1, ch1:s1, ch2:s1, ch0:s2, ch1:s2, ch2:s2,...
 
+        out : {array, None}
+          A C-contiguous ``float64`` array of shape
+          ``(samples_per_channel, number_of_channels)`` (or the
+          transpose for 'group_by_channel') to read the samples into
+          instead of allocating a new array. If `samples_per_channel`
+          is None then it is taken from the shape of `out`.
+
         Returns
         -------
         
@@ -3110,21 +3666,31 @@ class AnalogInputTask(Task):
         fill_mode_val = self._get_map_value('fill_mode', fill_mode_map, fill_mode)
 
         if samples_per_channel is None:
-            samples_per_channel = self.get_samples_per_channel_available()
+            if out is not None:
+                samples_per_channel = out.shape[0 if fill_mode=='group_by_scan_number' else 1]
+            else:
+                samples_per_channel = self.get_samples_per_channel_available()
 
         number_of_channels = self.get_number_of_channels()
         # pylint: disable=no-member
         if fill_mode=='group_by_scan_number':
-            data = np.zeros((samples_per_channel, number_of_channels),dtype=np.float64)
+            shape = (samples_per_channel, number_of_channels)
+        else:
+            shape = (number_of_channels, samples_per_channel)
+        if out is None:
+            data = np.zeros(shape, dtype=np.float64)
         else:
-            data = np.zeros((number_of_channels, samples_per_channel),dtype=np.float64)
+            if out.shape != shape or out.dtype != np.float64 or not out.flags['C_CONTIGUOUS']:
+                raise ValueError('Expected C-contiguous float64 array of shape %s but got %s %s array'
+                                 % (shape, out.dtype, out.shape))
+            data = out
         # pylint: enable=no-member
         samples_read = int32(0)
 
         CALL('ReadAnalogF64', self, samples_per_channel, float64(timeout),
              fill_mode_val, data.ctypes.data, data.size, ctypes.byref(samples_read), None)
 
-        if samples_per_channel < samples_read.value:
+        if samples_per_channel > samples_read.value:
             if fill_mode=='group_by_scan_number':
                 return data[:samples_read.value]
             else:
@@ -3430,13 +3996,64 @@ class DigitalTask (Task):
                 return data[:,:samples_read.value], bytes_per_sample.value
         return data, bytes_per_sample.value
 
+    def read_packed(self, samples_per_channel=None, timeout=10.0, fill_mode='group_by_scan_number'):
+        """
+        Reads multiple unsigned 32-bit integer samples from a task
+        that contains one or more digital channels. Each sample packs
+        the lines of a channel into the bits of an integer at their
+        line positions within the port.
+
+        Parameters
+        ----------
+
+        samples_per_channel, timeout, fill_mode :
+          See `read`.
+
+        Returns
+        -------
+
+          data : array
+            The ``uint32`` array of samples organized according to
+            `fill_mode`.
+
+        See also
+        --------
+        read
+        """
+        fill_mode_map = dict(group_by_channel = DAQmx.Val_GroupByChannel,
+                             group_by_scan_number = DAQmx.Val_GroupByScanNumber)
+        fill_mode_val = self._get_map_value('fill_mode', fill_mode_map, fill_mode)
+
+        if samples_per_channel in [None,-1]:
+            samples_per_channel = self.get_samples_per_channel_available()
+
+        number_of_channels = self.get_number_of_channels()
+        # pylint: disable=no-member
+        if fill_mode=='group_by_scan_number':
+            data = np.zeros((samples_per_channel, number_of_channels),dtype=np.uint32)
+        else:
+            data = np.zeros((number_of_channels, samples_per_channel),dtype=np.uint32)
+        # pylint: enable=no-member
+
+        samples_read = int32(0)
+
+        CALL ('ReadDigitalU32', self, samples_per_channel, float64 (timeout),
+              fill_mode_val, data.ctypes.data, uInt32 (data.size),
+              ctypes.byref (samples_read), None)
+        if samples_read.value < samples_per_channel:
+            if fill_mode=='group_by_scan_number':
+                return data[:samples_read.value]
+            else:
+                return data[:,:samples_read.value]
+        return data
+
 class DigitalInputTask(DigitalTask):
 
     """Exposes NI-DAQmx digital input task to Python.
     """
 
     def __init__(self, name=""):
-        super(DigitalInputTask, self).__init__(name)
+        DigitalTask.__init__(self, name)
         self.one_channel_for_all_lines = None
     
     channel_type = 'DI'
@@ -3500,7 +4117,7 @@ class DigitalOutputTask(DigitalTask):
     channel_type = 'DO'
 
     def __init__(self, name=""):
-        super(DigitalOutputTask, self).__init__(name)
+        DigitalTask.__init__(self, name)
         self.one_channel_for_all_lines = None
 
     def create_channel(self, lines, name='', grouping='per_line'):
@@ -3659,7 +4276,7 @@ class CounterInputTask(Task):
     channel_type = 'CI'
 
     def __init__(self, name=""):
-        super(CounterInputTask, self).__init__(name)
+        Task.__init__(self, name)
         self.data_type = float
 
     def create_channel_count_edges (self, counter, name="", edge='rising',
@@ -3732,6 +4349,7 @@ class CounterInputTask(Task):
         edge_val = self._get_map_value ('edge', edge_map, edge)
         direction_val = self._get_map_value ('direction', direction_map, direction)
         init = uInt32(init)
+        self.data_type = int
         return CALL ('CreateCICountEdgesChan', self, counter, name, edge_val, init, direction_val)==0
 
     def create_channel_linear_encoder(
@@ -3852,6 +4470,8 @@ class CounterInputTask(Task):
         if units_val != DAQmx.Val_FromCustomScale:
             customScaleName = None
 
+        self.data_type = float
+
         return CALL(
                 'CreateCILinEncoderChan',
                 self,
@@ -4101,9 +4721,14 @@ class CounterInputTask(Task):
 
     def read(self, samples_per_channel=None, timeout=10.0):
         """
-        Reads multiple 32-bit integer samples from a counter task.
-        Use this function when counter samples are returned unscaled,
-        such as for edge counting.
+        Reads multiple samples from a counter task.
+
+        Counter samples that are returned unscaled, such as for edge
+        counting, are read as unsigned 32-bit integers. Samples that
+        are scaled to a floating-point value, such as for frequency,
+        period or encoder position measurements, are read as 64-bit
+        floats. The choice follows `data_type` that is set by the
+        channel creation method.
 
         Parameters
         ----------
@@ -4146,27 +4771,38 @@ class CounterInputTask(Task):
         -------
         
         data :
-          The array to read samples into, organized according to `fill_mode`.
+          The array of samples read, ``uint32`` for unscaled counts
+          and ``float64`` for scaled measurements.
+
+        See also
+        --------
+        nidaqmx.counters.CounterUnwrapper
         """
 
         if samples_per_channel is None:
             samples_per_channel = self.get_samples_per_channel_available()
 
-        data = np.zeros((samples_per_channel,),dtype=np.int32) # pylint: disable=no-member
+        # pylint: disable=no-member
+        if self.data_type is int:
+            data = np.zeros((samples_per_channel,),dtype=np.uint32)
+            routine = 'ReadCounterU32'
+        else:
+            data = np.zeros((samples_per_channel,),dtype=np.float64)
+            routine = 'ReadCounterF64'
+        # pylint: enable=no-member
         samples_read = int32(0)
 
-        
-        CALL('ReadCounterU32', self, samples_per_channel, float64(timeout),
-             data.ctypes.data, data.size, ctypes.byref(samples_read), None)
+        CALL(routine, self, samples_per_channel, float64(timeout),
+             data.ctypes.data, uInt32(data.size), ctypes.byref(samples_read), None)
         
         return data[:samples_read.value]
 
     def read_scalar(self, timeout=10.0):
         """
-        Reads a single floating-point sample from a counter task. Use
-        this function when the counter sample is scaled to a
-        floating-point value, such as for frequency and period
-        measurement.
+        Reads a single sample from a counter task. Unscaled counts,
+        such as for edge counting, are returned as integers and scaled
+        samples, such as for frequency and period measurement, as
+        floats.
 
         timeout : float
           The amount of time, in seconds, to wait for the function to
@@ -4188,8 +4824,13 @@ class CounterInputTask(Task):
         """
 
         timeout = float64(timeout)
-        data = float64(0)
-        CALL("ReadCounterScalarF64", self,
+        if self.data_type is int:
+            data = uInt32(0)
+            routine = "ReadCounterScalarU32"
+        else:
+            data = float64(0)
+            routine = "ReadCounterScalarF64"
+        CALL(routine, self,
              timeout, ctypes.byref(data), None)
         #assert ret == 0
         return data.value
@@ -4448,6 +5089,21 @@ SignalEventCallback_map = dict(AI=ctypes.CFUNCTYPE (int32, AnalogInputTask, int3
 
 ########################################################################
 
+# Record channel creation and configuration calls for Task.to_config,
+# and count all configuration changes for Task.describe and
+# Task.apply_config.
+for _cls in [Task, AnalogInputTask, AnalogOutputTask, DigitalTask,
+             DigitalInputTask, DigitalOutputTask, CounterInputTask,
+             CounterOutputTask]:
+    for _name, _func in list(vars(_cls).items()):
+        if not callable(_func):
+            continue
+        if _name.startswith(('create_', 'configure_', 'set_')):
+            setattr(_cls, _name, _record_call(_func))
+        elif _name.startswith(('reset_', 'disable_')):
+            setattr(_cls, _name, _count_configuration(_func))
+del _cls, _name, _func
+
 def main():
     #_test_make_pattern()
 
@@ -0,0 +1,384 @@
+"""
+Offloading chunk processing to worker processes via shared memory.
+
+Processing read chunks in the acquisition process competes with the
+read loop for the GIL. `OffloadPool` copies each chunk into a ring in
+shared memory and sends worker processes only a small descriptor
+(sequence number, offset and shape), so the chunk data is never
+pickled. The workers run a user function on a view of the chunk and
+send its result back. `OffloadPool.submit` never waits for the
+workers: when the ring is full or too many chunks are pending, the
+chunk is dropped and counted. A worker that exits is restarted and
+the chunks it held are released and counted as lost, so a failing
+analysis cannot block the submission of later chunks.
+
+Requires Python 3.8 or newer (`multiprocessing.shared_memory`).
+
+.. autosummary::
+
+  OffloadPool
+  SharedRing
+
+Example usage
+=============
+
+The processing function must be importable by the worker processes,
+i.e. be defined at module level::
+
+>>> import numpy as np
+>>> from nidaqmx import AnalogInputTask
+>>> from nidaqmx.offload import OffloadPool
+>>> def spectrum(chunk):
+...     return np.abs(np.fft.rfft(chunk, axis=0)).max(axis=0)
+>>> task = AnalogInputTask()
+>>> task.create_voltage_channel('Dev1/ai0:7', min_val=-10, max_val=10)
+>>> task.configure_timing_sample_clock(rate=1e6)
+>>> pool = OffloadPool(spectrum, processes=4)
+>>> pool.start()
+>>> task.start()
+>>> while True:
+...     pool.submit(task.read(100000))
+...     for seq, result in pool.get_results():
+...         print(seq, result)
+
+"""
+
+from __future__ import print_function, division, absolute_import
+
+import sys
+import pickle
+import threading
+import collections
+import multiprocessing
+try:
+    import queue
+except ImportError: # Python 2
+    import Queue as queue
+try:
+    from multiprocessing import shared_memory
+except ImportError: # Python < 3.8
+    shared_memory = None
+
+import numpy as np
+
+__all__ = ['OffloadPool', 'SharedRing']
+
+_ALIGNMENT = 64
+
+def _attach(name):
+    try:
+        # Python 3.13+: do not let the resource tracker of a worker
+        # unlink the segment that the parent owns.
+        return shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:
+        return shared_memory.SharedMemory(name=name)
+
+class SharedRing(object):
+    """
+    Byte ring in shared memory holding variable size chunks.
+
+    Every chunk is stored contiguously; regions are allocated at the
+    head of the ring and released in allocation order, a region being
+    reused only after it and all older regions have been released.
+
+    Parameters
+    ----------
+
+    size : int
+      The size of the ring in bytes.
+
+    name : {str, None}
+      The name of an existing shared memory segment to attach to. By
+      default a new segment is created.
+    """
+
+    def __init__(self, size=None, name=None):
+        if shared_memory is None:
+            raise RuntimeError('SharedRing requires multiprocessing.shared_memory (Python 3.8+)')
+        if name is None:
+            self.shm = shared_memory.SharedMemory(create=True, size=size)
+            self.owner = True
+        else:
+            self.shm = _attach(name)
+            self.owner = False
+        self.name = self.shm.name
+        self.size = self.shm.size
+        self._lock = threading.Lock()
+        self._head = 0
+        # (sequence, start, end) of regions in use, oldest first
+        self._regions = collections.deque()
+        self._released = set()
+
+    def allocate(self, seq, nbytes):
+        """
+        Reserves `nbytes` for chunk `seq` and returns the offset, or
+        None if the ring is full.
+        """
+        n = -(-nbytes // _ALIGNMENT) * _ALIGNMENT
+        with self._lock:
+            regions = self._regions
+            if not regions:
+                start = 0 if n <= self.size else None
+            else:
+                tail, head = regions[0][1], self._head
+                if head > tail:
+                    if self.size - head >= n:
+                        start = head
+                    elif n <= tail:
+                        start = 0
+                    else:
+                        start = None
+                elif head < tail and tail - head >= n:
+                    start = head
+                else:
+                    start = None
+            if start is None:
+                return None
+            self._head = start + n
+            regions.append((seq, start, start + n))
+        return start
+
+    def release(self, seq):
+        """
+        Releases the region of chunk `seq`.
+        """
+        with self._lock:
+            self._released.add(seq)
+            regions = self._regions
+            while regions and regions[0][0] in self._released:
+                self._released.discard(regions.popleft()[0])
+
+    def view(self, offset, shape, dtype):
+        """
+        Returns an array viewing the ring at `offset`.
+        """
+        return np.ndarray(shape, dtype=dtype, buffer=self.shm.buf, offset=offset)
+
+    def close(self):
+        """
+        Detaches from the segment and removes it if it was created
+        here.
+        """
+        self.shm.close()
+        if self.owner:
+            self.shm.unlink()
+
+def _worker(name, func, tasks, results, index):
+    shm = _attach(name)
+    try:
+        while True:
+            item = tasks.get()
+            if item is None:
+                break
+            seq, offset, shape, dtype = item
+            chunk = np.ndarray(shape, dtype=dtype, buffer=shm.buf, offset=offset)
+            try:
+                # Pickled here so that an unpicklable result is
+                # reported rather than lost in the queue feeder thread.
+                result, error = pickle.dumps(func(chunk), pickle.HIGHEST_PROTOCOL), None
+            except Exception as exc: # pylint: disable=broad-except
+                result, error = None, '%s: %s' % (exc.__class__.__name__, exc)
+            del chunk
+            results.put((index, seq, result, error))
+    finally:
+        shm.close()
+
+class OffloadPool(object):
+    """
+    Runs a function on read chunks in worker processes.
+
+    Parameters
+    ----------
+
+    func : callable
+      A picklable function ``func(chunk)`` returning a picklable
+      result. `chunk` is a read-only-by-convention view of shared
+      memory that is valid only during the call.
+
+    processes : int
+      The number of worker processes.
+
+    ring_size : int
+      The size of the shared memory ring in bytes. It should hold
+      several chunks.
+
+    max_pending : int
+      The maximal number of chunks submitted but not yet processed.
+
+    callback : {callable, None}
+      If given then ``callback(seq, result)`` is called from a
+      collector thread for every result. Otherwise results are
+      queued for `get_results`.
+
+    check_interval : float
+      The maximal time in seconds between checks that the workers
+      are alive.
+
+    Attributes
+    ----------
+
+    submitted, dropped, completed, errors, lost : int
+      Counters of chunks. Errors include failures of `func`, of
+      pickling its result and of `callback`. Lost chunks were pending
+      in a worker that exited.
+    restarts : int
+      The number of workers restarted.
+    """
+
+    def __init__(self, func, processes=2, ring_size=64 << 20, max_pending=64,
+                 callback=None, check_interval=0.1):
+        self.func = func
+        self.processes = processes
+        self.ring_size = ring_size
+        self.max_pending = max_pending
+        self.callback = callback
+        self.check_interval = check_interval
+        self.submitted = self.dropped = self.completed = self.errors = self.lost = 0
+        self.restarts = 0
+        self._seq = 0
+        self._workers = []
+
+    def start(self):
+        """
+        Creates the ring and starts the worker processes.
+        """
+        self.ring = SharedRing(self.ring_size)
+        self._results = multiprocessing.Queue()
+        self._local_results = queue.Queue()
+        self._lock = threading.Lock()
+        self._closing = False
+        # The sequence numbers of the chunks queued to each worker.
+        self._pending = [set() for i in range(self.processes)]
+        self._tasks = [None] * self.processes
+        self._workers = [None] * self.processes
+        for i in range(self.processes):
+            self._start_worker(i)
+        self._collector = threading.Thread(target=self._collect, name='nidaqmx-offload-collector')
+        self._collector.daemon = True
+        self._collector.start()
+
+    def _start_worker(self, i):
+        # Every worker has its own queue, so that the chunks held by
+        # a worker are known when it exits.
+        self._tasks[i] = multiprocessing.Queue()
+        self._workers[i] = worker = multiprocessing.Process(
+            target=_worker, args=(self.ring.name, self.func, self._tasks[i], self._results, i),
+            name='nidaqmx-offload-%s' % (i))
+        worker.daemon = True
+        worker.start()
+
+    def _check_workers(self):
+        for i, worker in enumerate(self._workers):
+            if worker.is_alive():
+                continue
+            with self._lock:
+                if self._closing:
+                    return
+                lost, self._pending[i] = self._pending[i], set()
+                for seq in lost:
+                    self.ring.release(seq)
+                self.lost += len(lost)
+                self.restarts += 1
+                self._start_worker(i)
+            print('Offload worker %s exited with code %s, restarted, %s chunks lost'
+                  % (i, worker.exitcode, len(lost)), file=sys.stderr)
+
+    def _collect(self):
+        while True:
+            try:
+                item = self._results.get(timeout=self.check_interval)
+            except queue.Empty:
+                item = ()
+            if item is None:
+                break
+            if item:
+                self._finish(*item)
+            self._check_workers()
+
+    def _finish(self, i, seq, result, error):
+        with self._lock:
+            if seq not in self._pending[i]:
+                return # released when the worker exited
+            self._pending[i].discard(seq)
+            self.ring.release(seq)
+            self.completed += 1
+        if error is None:
+            try:
+                result = pickle.loads(result)
+                if self.callback is not None:
+                    self.callback(seq, result)
+                else:
+                    self._local_results.put((seq, result))
+            except Exception as exc: # pylint: disable=broad-except
+                error = '%s: %s' % (exc.__class__.__name__, exc)
+        if error is not None:
+            self.errors += 1
+            print('Offloaded processing of chunk %s failed: %s' % (seq, error),
+                  file=sys.stderr)
+
+    def submit(self, chunk):
+        """
+        Copies a chunk into the ring and queues it for processing.
+
+        Returns
+        -------
+
+        seq : {int, None}
+          The sequence number of the chunk, or None if it was dropped
+          because the ring was full or `max_pending` chunks were
+          pending.
+        """
+        # pylint: disable=no-member
+        chunk = np.asarray(chunk)
+        seq = self._seq
+        self._seq += 1
+        with self._lock:
+            pending = self._pending
+            offset = None
+            if sum(len(p) for p in pending) < self.max_pending:
+                offset = self.ring.allocate(seq, chunk.nbytes)
+            if offset is None:
+                self.dropped += 1
+                return None
+            i = min(range(len(pending)), key=lambda i: len(pending[i]))
+            pending[i].add(seq)
+            tasks = self._tasks[i]
+        # Only submit allocates, so the region is not reused during the
+        # copy even if the worker exits and the region is released.
+        self.ring.view(offset, chunk.shape, chunk.dtype)[...] = chunk
+        tasks.put((seq, offset, chunk.shape, chunk.dtype.str))
+        self.submitted += 1
+        return seq
+
+    def get_results(self, timeout=0):
+        """
+        Returns the available ``(seq, result)`` pairs, waiting up to
+        `timeout` seconds for the first one.
+        """
+        results = []
+        try:
+            results.append(self._local_results.get(timeout=timeout) if timeout
+                           else self._local_results.get_nowait())
+            while True:
+                results.append(self._local_results.get_nowait())
+        except queue.Empty:
+            pass
+        return results
+
+    def close(self, timeout=10.0):
+        """
+        Waits for the queued chunks to be processed, stops the workers
+        and removes the ring.
+        """
+        with self._lock:
+            self._closing = True
+        for tasks in self._tasks:
+            tasks.put(None)
+        for worker in self._workers:
+            worker.join(timeout)
+            if worker.is_alive():
+                worker.terminate()
+        self._results.put(None)
+        self._collector.join(timeout)
+        self._workers = []
+        self.ring.close()
@@ -16,7 +16,7 @@ def set_di_options (parser):
     if os.name == 'posix':
         parser.run_methods = ['subcommand']
 
-    import nidaqmx
+    from nidaqmx.inventory import get_inventory
     from nidaqmx.libnidaqmx import make_pattern
     parser.set_usage ('''\
 %prog [options]
@@ -24,9 +24,7 @@ def set_di_options (parser):
 Description:
   %prog provides graphical interface to NIDAQmx digital input task.
 ''')
-    phys_channel_choices = []
-    for dev in nidaqmx.DigitalInputTask.get_system_devices():
-        phys_channel_choices.extend(dev.get_digital_input_lines())
+    phys_channel_choices = get_inventory().collect('digital_input_lines')
     pattern = make_pattern(phys_channel_choices)
     parser.add_option ('--create-channel-lines',
                        type = 'string',
@@ -41,7 +39,7 @@ def set_do_options (parser):
     if os.name == 'posix':
         parser.run_methods = ['subcommand']
 
-    import nidaqmx
+    from nidaqmx.inventory import get_inventory
     from nidaqmx.libnidaqmx import make_pattern
     parser.set_usage ('''\
 %prog [options]
@@ -49,9 +47,7 @@ def set_do_options (parser):
 Description:
   %prog provides graphical interface to NIDAQmx digital output task.
 ''')
-    phys_channel_choices = []
-    for dev in nidaqmx.DigitalOutputTask.get_system_devices():
-        phys_channel_choices.extend(dev.get_digital_output_lines())
+    phys_channel_choices = get_inventory().collect('digital_output_lines')
     pattern = make_pattern(phys_channel_choices)
     parser.add_option ('--create-channel-lines',
                        type = 'string',
@@ -67,7 +63,7 @@ def set_ai_options (parser):
     if os.name == 'posix':
         parser.run_methods = ['subcommand']
 
-    import nidaqmx
+    from nidaqmx.inventory import get_inventory
     from nidaqmx.libnidaqmx import make_pattern
     parser.set_usage ('''\
 %prog [options]
@@ -75,9 +71,7 @@ def set_ai_options (parser):
 Description:
   %prog provides graphical interface to NIDAQmx analog input task.
 ''')
-    ai_phys_channel_choices = []
-    for dev in nidaqmx.AnalogInputTask.get_system_devices():
-        ai_phys_channel_choices.extend(dev.get_analog_input_channels())
+    ai_phys_channel_choices = get_inventory().collect('analog_input_channels')
     pattern = make_pattern(ai_phys_channel_choices)
     parser.add_option ('--create-voltage-channel-phys-channel',
                        type = 'string',
@@ -86,14 +80,23 @@ Description:
     get_ai_read_options_group (parser, parser)
     parser.add_option('--ai-task',
                       default = 'print',
-                      choices = ['print', 'plot', 'show'])
+                      choices = ['print', 'plot', 'show', 'fast_show', 'record'])
+    parser.add_option('--ai-record-file',
+                      type = 'string', default = 'ai_record.dat',
+                      help = 'File to stream samples to when --ai-task=record. Default: %default.')
+    parser.add_option('--ai-record-duration',
+                      type = 'float', default = 0.0,
+                      help = 'Recording duration in seconds, 0 records until interrupted. Default: %default.')
+    parser.add_option('--ai-record-flush-interval',
+                      type = 'float', default = 1.0,
+                      help = 'Seconds between flushing the record file to disk. Default: %default.')
     parser.add_option_group (get_configure_timing_options_group (parser))
 
 def set_ao_options (parser):
     if os.name == 'posix':
         parser.run_methods = ['subcommand']
 
-    import nidaqmx
+    from nidaqmx.inventory import get_inventory
     from nidaqmx.libnidaqmx import make_pattern
 
     parser.set_usage ('''\
@@ -102,9 +105,7 @@ def set_ao_options (parser):
 Description:
   %prog provides graphical interface to NIDAQmx analog output task.
 ''')
-    ao_phys_channel_choices = []
-    for dev in nidaqmx.AnalogOutputTask.get_system_devices():
-        ao_phys_channel_choices.extend(dev.get_analog_output_channels())
+    ao_phys_channel_choices = get_inventory().collect('analog_output_channels')
     pattern = make_pattern(ao_phys_channel_choices)
     parser.add_option ('--create-voltage-channel-phys-channel',
                        type = 'string',
@@ -0,0 +1,486 @@
+"""
+Threaded streaming pipelines: a source, processing stages and sinks.
+
+.. autosummary::
+
+  Pipeline
+  TaskSource
+  Stage
+  ScaleStage
+  DecimateStage
+  StatisticsStage
+  FunctionStage
+  FileSink
+  RingSink
+  CallbackSink
+
+Each stage and the sinks run in their own thread and are connected by
+bounded queues. When a consumer falls behind, the queue in front of
+it fills up and its producer blocks (backpressure), so memory use
+stays bounded; if the source is blocked for too long the task buffer
+overflows and the driver reports an error. numpy releases the GIL in
+most array operations, so stages run in parallel on several cores.
+
+Example usage
+=============
+
+>>> from nidaqmx import AnalogInputTask
+>>> from nidaqmx.filters import FIRDecimator
+>>> from nidaqmx.statistics import StreamStatistics
+>>> from nidaqmx.pipeline import (Pipeline, TaskSource, DecimateStage,
+...                               StatisticsStage, FileSink)
+>>> task = AnalogInputTask()
+>>> task.create_voltage_channel('Dev1/ai0:7', min_val=-10, max_val=10)
+>>> task.configure_timing_sample_clock(rate=1e6)
+>>> stats = StreamStatistics()
+>>> pipeline = Pipeline(TaskSource(task, 100000),
+...                     [DecimateStage(FIRDecimator(10)),
+...                      DecimateStage(FIRDecimator(10)),
+...                      StatisticsStage(stats)],
+...                     [FileSink('data.f64')])
+>>> pipeline.start()
+>>> import time
+>>> time.sleep(60)
+>>> pipeline.stop()
+>>> print(pipeline.get_counters())
+
+"""
+
+from __future__ import print_function, division, absolute_import
+
+import sys
+import time
+import threading
+try:
+    import queue
+except ImportError: # Python 2
+    import Queue as queue
+
+import numpy as np
+
+__all__ = ['Pipeline', 'TaskSource', 'Stage', 'ScaleStage', 'DecimateStage',
+           'StatisticsStage', 'FunctionStage', 'FileSink', 'RingSink',
+           'CallbackSink', 'Counters']
+
+timer = getattr(time, 'perf_counter', time.time)
+
+class Counters(object):
+    """
+    Throughput and latency counters of a pipeline element.
+
+    Attributes
+    ----------
+
+    chunks, samples : int
+      The number of chunks and of rows of the chunks (samples per
+      channel in 'group_by_scan_number' layout) processed.
+    busy : float
+      The time in seconds spent processing.
+    latency, max_latency : float
+      The total and maximal time in seconds from reading a chunk to
+      finishing its processing by this element.
+    blocked : float
+      The time in seconds spent waiting for room in the output queue.
+    """
+
+    def __init__(self):
+        self.chunks = self.samples = 0
+        self.busy = self.latency = self.max_latency = self.blocked = 0.0
+
+    def as_dict(self, elapsed=None):
+        """
+        Returns the counters and derived rates as a dictionary.
+        """
+        d = dict(chunks=self.chunks, samples=self.samples, busy=self.busy,
+                 blocked=self.blocked, max_latency=self.max_latency,
+                 mean_latency=self.latency / self.chunks if self.chunks else None)
+        if elapsed:
+            d['samples_per_second'] = self.samples / elapsed
+            d['utilization'] = self.busy / elapsed
+        return d
+
+class TaskSource(object):
+    """
+    Reads chunks from a started or unstarted input task.
+
+    Parameters
+    ----------
+
+    task : nidaqmx.libnidaqmx.Task
+      An input task, it is started by the pipeline unless
+      `start_task` is False.
+
+    samples_per_channel : int
+      The chunk size.
+
+    timeout : float
+      The read timeout in seconds.
+
+    read_kws : dict
+      Additional arguments to the ``read`` method of the task, such as
+      ``fill_mode``.
+    """
+
+    def __init__(self, task, samples_per_channel, timeout=10.0, start_task=True,
+                 **read_kws):
+        self.task = task
+        self.samples_per_channel = samples_per_channel
+        self.timeout = timeout
+        self.start_task = start_task
+        self.read_kws = read_kws
+
+    def start(self):
+        if self.start_task:
+            self.task.start()
+
+    def stop(self):
+        if self.start_task:
+            self.task.stop()
+
+    def read(self):
+        """
+        Returns the next chunk.
+        """
+        return self.task.read(self.samples_per_channel, timeout=self.timeout,
+                              **self.read_kws)
+
+class Stage(object):
+    """
+    Base class of processing stages.
+
+    Subclasses implement `process`, which receives a chunk and returns
+    the processed chunk or None to drop it. A stage must not return an
+    array that it modifies later, since the next stage may still be
+    working on it in another thread.
+    """
+
+    def process(self, chunk):
+        raise NotImplementedError('%s.process' % (self.__class__.__name__))
+
+    def close(self):
+        """
+        Called when the pipeline stops.
+        """
+
+    def __repr__(self):
+        return self.__class__.__name__
+
+class FunctionStage(Stage):
+    """
+    Applies ``func(chunk)`` to every chunk.
+    """
+
+    def __init__(self, func):
+        self.func = func
+
+    def process(self, chunk):
+        return self.func(chunk)
+
+    def __repr__(self):
+        return 'FunctionStage(%s)' % (getattr(self.func, '__name__', self.func))
+
+class ScaleStage(Stage):
+    """
+    Computes ``chunk * gain + offset`` in place. Scalars or arrays
+    broadcasting against the chunk are accepted, e.g. per-channel
+    calibration factors.
+    """
+
+    def __init__(self, gain=1.0, offset=0.0):
+        self.gain = gain
+        self.offset = offset
+
+    def process(self, chunk):
+        chunk *= self.gain
+        chunk += self.offset
+        return chunk
+
+class DecimateStage(Stage):
+    """
+    Filters and decimates chunks with a
+    `nidaqmx.filters.FIRDecimator`. Chunks without outputs are
+    dropped.
+    """
+
+    def __init__(self, decimator):
+        self.decimator = decimator
+
+    def process(self, chunk):
+        # the decimator reuses its output buffer
+        result = self.decimator.process(chunk).copy()
+        if not result.size:
+            return None
+        return result
+
+class StatisticsStage(Stage):
+    """
+    Updates a `nidaqmx.statistics.StreamStatistics` and passes the
+    chunk on unchanged.
+    """
+
+    def __init__(self, statistics):
+        self.statistics = statistics
+
+    def process(self, chunk):
+        self.statistics.update(chunk)
+        return chunk
+
+class FileSink(object):
+    """
+    Appends the raw ``float64`` chunks to a file.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.file = open(path, 'wb')
+
+    def write(self, chunk):
+        np.ascontiguousarray(chunk, dtype=np.float64).tofile(self.file)
+
+    def close(self):
+        self.file.close()
+
+    def __repr__(self):
+        return 'FileSink(%r)' % (self.path)
+
+class RingSink(object):
+    """
+    Keeps the last `size` samples of ``(samples, channels)`` chunks.
+    """
+
+    def __init__(self, size):
+        self.size = size
+        self._lock = threading.Lock()
+        self._data = None
+        self._count = 0
+
+    def write(self, chunk):
+        # pylint: disable=no-member
+        chunk = np.asarray(chunk)
+        if chunk.ndim == 1:
+            chunk = chunk.reshape((chunk.size, 1))
+        with self._lock:
+            if self._data is None:
+                self._data = np.zeros((self.size, chunk.shape[1]), dtype=chunk.dtype)
+            n = min(chunk.shape[0], self.size)
+            i = (self._count + chunk.shape[0] - n) % self.size
+            k = min(n, self.size - i)
+            self._data[i:i + k] = chunk[-n:][:k]
+            self._data[:n - k] = chunk[-n:][k:]
+            self._count += chunk.shape[0]
+
+    def get(self):
+        """
+        Returns a copy of the stored samples, the oldest first.
+        """
+        # pylint: disable=no-member
+        with self._lock:
+            if self._data is None:
+                return None
+            i = self._count % self.size
+            if self._count < self.size:
+                return self._data[:i].copy()
+            return np.concatenate((self._data[i:], self._data[:i]))
+
+    def close(self):
+        pass
+
+    def __repr__(self):
+        return 'RingSink(%r)' % (self.size)
+
+class CallbackSink(object):
+    """
+    Calls ``func(chunk)`` for every chunk.
+    """
+
+    def __init__(self, func):
+        self.func = func
+
+    def write(self, chunk):
+        self.func(chunk)
+
+    def close(self):
+        pass
+
+    def __repr__(self):
+        return 'CallbackSink(%s)' % (getattr(self.func, '__name__', self.func))
+
+_stop = object()
+
+class Pipeline(object):
+    """
+    Runs a source, stages and sinks in separate threads connected by
+    bounded queues.
+
+    Parameters
+    ----------
+
+    source : TaskSource
+      An object with ``start``, ``stop`` and ``read`` methods.
+
+    stages : list
+      `Stage` instances applied in order.
+
+    sinks : list
+      Objects with ``write`` and ``close`` methods; all sinks receive
+      every chunk that passes the stages.
+
+    queue_size : int
+      The maximal number of chunks waiting in front of each stage and
+      of the sinks.
+
+    Attributes
+    ----------
+
+    error : {Exception, None}
+      The first exception raised by an element; the pipeline stops
+      when one occurs.
+    """
+
+    def __init__(self, source, stages=(), sinks=(), queue_size=4):
+        self.source = source
+        self.stages = list(stages)
+        self.sinks = list(sinks)
+        self.queue_size = queue_size
+        self.error = None
+        self._threads = []
+        self._running = threading.Event()
+
+    def _names(self):
+        return (['source'] + ['%s:%r' % (i, s) for i, s in enumerate(self.stages)]
+                + ['sinks'])
+
+    def start(self):
+        """
+        Starts the source and the processing threads.
+        """
+        self.error = None
+        n = len(self.stages) + 1
+        self._queues = [queue.Queue(self.queue_size) for i in range(n)]
+        self.counters = [Counters() for i in range(n + 1)]
+        self._running.set()
+        self._start_time = timer()
+        self._stop_time = None
+        self._threads = [threading.Thread(target=self._run_source,
+                                          name='nidaqmx-pipeline-source')]
+        for i, stage in enumerate(self.stages):
+            self._threads.append(threading.Thread(
+                target=self._run_stage, args=(i,),
+                name='nidaqmx-pipeline-%s' % (stage)))
+        self._threads.append(threading.Thread(target=self._run_sinks,
+                                              name='nidaqmx-pipeline-sinks'))
+        for thread in self._threads:
+            thread.daemon = True
+        self.source.start()
+        for thread in self._threads:
+            thread.start()
+
+    def _fail(self, exc):
+        if self.error is None:
+            self.error = exc
+            print('Pipeline failed: %s' % (exc,), file=sys.stderr)
+        self._running.clear()
+
+    def _put(self, q, item, counters):
+        t = timer()
+        while True:
+            try:
+                q.put(item, timeout=0.1)
+                break
+            except queue.Full:
+                if self.error is not None and item is not _stop:
+                    break
+        counters.blocked += timer() - t
+
+    def _account(self, counters, t_read, t_start, chunk):
+        t = timer()
+        counters.chunks += 1
+        counters.samples += chunk.shape[0] if chunk.ndim else 0
+        counters.busy += t - t_start
+        latency = t - t_read
+        counters.latency += latency
+        counters.max_latency = max(counters.max_latency, latency)
+
+    def _run_source(self):
+        counters = self.counters[0]
+        out = self._queues[0]
+        try:
+            while self._running.is_set():
+                t = timer()
+                chunk = self.source.read()
+                self._account(counters, t, t, chunk)
+                self._put(out, (t, chunk), counters)
+        except Exception as exc: # pylint: disable=broad-except
+            self._fail(exc)
+        self._put(out, _stop, counters)
+
+    def _run_stage(self, i):
+        stage = self.stages[i]
+        counters = self.counters[i + 1]
+        inp, out = self._queues[i], self._queues[i + 1]
+        while True:
+            item = inp.get()
+            if item is _stop:
+                break
+            t_read, chunk = item
+            if self.error is not None:
+                continue # drain
+            t = timer()
+            try:
+                result = stage.process(chunk)
+            except Exception as exc: # pylint: disable=broad-except
+                self._fail(exc)
+                continue
+            self._account(counters, t_read, t, chunk)
+            if result is not None:
+                self._put(out, (t_read, result), counters)
+        self._put(out, _stop, counters)
+
+    def _run_sinks(self):
+        counters = self.counters[-1]
+        inp = self._queues[-1]
+        while True:
+            item = inp.get()
+            if item is _stop:
+                break
+            t_read, chunk = item
+            if self.error is not None:
+                continue
+            t = timer()
+            try:
+                for sink in self.sinks:
+                    sink.write(chunk)
+            except Exception as exc: # pylint: disable=broad-except
+                self._fail(exc)
+                continue
+            self._account(counters, t_read, t, chunk)
+
+    def stop(self, timeout=None):
+        """
+        Stops the source, waits until the queued chunks are processed
+        and closes the stages and sinks.
+        """
+        self._running.clear()
+        for thread in self._threads:
+            thread.join(timeout)
+        self._stop_time = timer()
+        self.source.stop()
+        for element in self.stages + self.sinks:
+            element.close()
+        self._threads = []
+
+    def wait(self, timeout=None):
+        """
+        Waits until the pipeline stops by itself, i.e. after an error.
+        """
+        for thread in list(self._threads):
+            thread.join(timeout)
+
+    def get_counters(self):
+        """
+        Returns the counters of the source, the stages and the sinks
+        as a list of ``(name, dict)`` pairs, see `Counters.as_dict`.
+        """
+        elapsed = (self._stop_time or timer()) - self._start_time
+        return [(name, c.as_dict(elapsed))
+                for name, c in zip(self._names(), self.counters)]
@@ -0,0 +1,504 @@
+"""
+Fan-out of one input stream to several local subscriber processes.
+
+Only one process can own a task. `Publisher` reads the task in that
+process and writes the samples to a ring in shared memory; other
+processes on the same machine attach to the ring with `Subscriber`.
+Subscribers are registered over a Unix domain socket control channel
+and then read the ring directly, without copying the data through
+the socket. Every subscriber has its own read cursor, kept in the
+ring header, and its own decimation factor.
+
+The publisher never waits for subscribers. A subscriber that falls
+more than the ring capacity behind is reported as slow by
+`Publisher.get_subscribers`; on its next read it skips ahead to the
+recent part of the ring and counts the samples it missed.
+
+Requires Python 3.8 or newer (`multiprocessing.shared_memory`).
+
+.. autosummary::
+
+  Publisher
+  Subscriber
+
+Example usage
+=============
+
+In the process that owns the task::
+
+>>> from nidaqmx import AnalogInputTask
+>>> from nidaqmx.pipeline import TaskSource
+>>> from nidaqmx.publish import Publisher
+>>> task = AnalogInputTask()
+>>> task.create_voltage_channel('Dev1/ai0:7', min_val=-10, max_val=10)
+>>> task.configure_timing_sample_clock(rate=1e5)
+>>> publisher = Publisher(TaskSource(task, 10000), '/tmp/nidaqmx-ai.sock')
+>>> publisher.start()
+
+In a display process::
+
+>>> from nidaqmx.publish import Subscriber
+>>> subscriber = Subscriber('/tmp/nidaqmx-ai.sock', decimation=100)
+>>> while True:
+...     index, data = subscriber.read()
+...     plot(index, data)
+
+"""
+
+from __future__ import print_function, division, absolute_import
+
+import os
+import sys
+import json
+import time
+import select
+import socket
+import threading
+
+import numpy as np
+
+from .offload import shared_memory, _attach
+
+__all__ = ['Publisher', 'Subscriber']
+
+timer = getattr(time, 'perf_counter', time.time)
+
+# Layout of the int64 ring header: global fields followed by one slot
+# of _SLOT fields per subscriber.
+_WRITTEN, _CAPACITY, _CHANNELS, _STATE, _WRITING = 0, 1, 2, 3, 4
+_GLOBALS = 8
+_CURSOR, _DECIMATION, _SKIPPED = 0, 1, 2
+_SLOT = 4
+_ALIGNMENT = 64
+
+_STOPPED, _RUNNING = 0, 1
+
+def _header_size(max_subscribers):
+    nbytes = (_GLOBALS + _SLOT * max_subscribers) * 8
+    return -(-nbytes // _ALIGNMENT) * _ALIGNMENT
+
+def _send(sock, message):
+    sock.sendall((json.dumps(message) + '\n').encode('ascii'))
+
+class Publisher(object):
+    """
+    Publishes the chunks of a source through a shared memory ring.
+
+    Parameters
+    ----------
+
+    source : nidaqmx.pipeline.TaskSource
+      The source of the chunks, typically reading an
+      `nidaqmx.libnidaqmx.AnalogInputTask` or
+      `nidaqmx.libnidaqmx.DigitalInputTask` in
+      'group_by_scan_number' layout. It is started by `start`.
+
+    path : str
+      The path of the Unix domain socket of the control channel. An
+      existing socket file is replaced.
+
+    capacity : int
+      The number of samples per channel that the ring holds. Slower
+      subscribers are skipped ahead.
+
+    max_subscribers : int
+      The maximal number of subscribers at the same time.
+
+    Attributes
+    ----------
+
+    written : int
+      The number of samples per channel published.
+    slow_events : int
+      The number of times that a subscriber fell behind by more than
+      the ring capacity.
+    error : {Exception, None}
+      The exception that stopped the reading, if any.
+    """
+
+    def __init__(self, source, path, capacity=1 << 20, max_subscribers=16):
+        self.source = source
+        self.path = path
+        self.capacity = int(capacity)
+        self.max_subscribers = max_subscribers
+        self.written = 0
+        self.slow_events = 0
+        self.error = None
+        self._subscribers = {}
+        self._free_slots = list(range(max_subscribers))
+        self._lock = threading.Lock()
+        self._running = threading.Event()
+        self._threads = []
+
+    def _read(self):
+        chunk = self.source.read()
+        if isinstance(chunk, tuple):
+            # DigitalInputTask.read returns (data, bytes_per_sample)
+            chunk = chunk[0]
+        chunk = np.asarray(chunk)
+        if chunk.ndim == 1:
+            chunk = chunk.reshape((chunk.size, 1))
+        return chunk
+
+    def start(self):
+        """
+        Starts the source, creates the ring from the layout of the
+        first chunk and starts serving subscribers.
+        """
+        if shared_memory is None:
+            raise RuntimeError('Publisher requires multiprocessing.shared_memory (Python 3.8+)')
+        fill_mode = getattr(self.source, 'read_kws', {}).get('fill_mode')
+        if fill_mode not in [None, 'group_by_scan_number']:
+            raise ValueError('Publisher requires group_by_scan_number layout')
+        self.source.start()
+        chunk = self._read()
+        self.channels = chunk.shape[1]
+        self.dtype = chunk.dtype
+        header_size = _header_size(self.max_subscribers)
+        self.shm = shared_memory.SharedMemory(
+            create=True, size=header_size + self.capacity * self.channels * self.dtype.itemsize)
+        # pylint: disable=no-member
+        self._header = np.ndarray((header_size // 8,), dtype=np.int64, buffer=self.shm.buf)
+        self._ring = np.ndarray((self.capacity, self.channels), dtype=self.dtype,
+                                buffer=self.shm.buf, offset=header_size)
+        # pylint: enable=no-member
+        self._header[:] = 0
+        self._header[_CAPACITY] = self.capacity
+        self._header[_CHANNELS] = self.channels
+        self._header[_STATE] = _RUNNING
+        self._write(chunk)
+
+        if os.path.exists(self.path):
+            os.unlink(self.path)
+        self._server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self._server.bind(self.path)
+        self._server.listen(self.max_subscribers)
+        self._running.set()
+        self._threads = [threading.Thread(target=self._produce, name='nidaqmx-publish-producer'),
+                         threading.Thread(target=self._serve, name='nidaqmx-publish-control')]
+        for thread in self._threads:
+            thread.daemon = True
+            thread.start()
+
+    def _write(self, chunk):
+        n = chunk.shape[0]
+        if chunk.shape[1] != self.channels:
+            raise ValueError('Expected %s channels but got %s' % (self.channels, chunk.shape[1]))
+        capacity = self.capacity
+        written = self.written
+        if n > capacity:
+            chunk = chunk[n - capacity:]
+            written += n - capacity
+            n = capacity
+        # Announce the samples being overwritten, then publish the new
+        # samples only after they are in the ring.
+        self._header[_WRITING] = written + n
+        i = written % capacity
+        k = min(n, capacity - i)
+        self._ring[i:i + k] = chunk[:k]
+        self._ring[:n - k] = chunk[k:]
+        self.written = written + n
+        self._header[_WRITTEN] = self.written
+        self._check_subscribers()
+
+    def _check_subscribers(self):
+        header = self._header
+        oldest = self.written - self.capacity
+        for info in list(self._subscribers.values()):
+            slow = header[info['offset'] + _CURSOR] < oldest
+            if slow and not info['slow']:
+                self.slow_events += 1
+            info['slow'] = slow
+
+    def _produce(self):
+        try:
+            while self._running.is_set():
+                self._write(self._read())
+        except Exception as exc: # pylint: disable=broad-except
+            self.error = exc
+            print('Publisher failed: %s' % (exc,), file=sys.stderr)
+        self._header[_STATE] = _STOPPED
+
+    def _subscribe(self, request):
+        decimation = int(request.get('decimation', 1))
+        if decimation < 1:
+            return dict(error='Expected decimation >= 1 but got %r' % (decimation,))
+        with self._lock:
+            if not self._free_slots:
+                return dict(error='Too many subscribers (%s)' % (self.max_subscribers))
+            slot = self._free_slots.pop(0)
+            offset = _GLOBALS + _SLOT * slot
+            self._header[offset:offset + _SLOT] = 0
+            self._header[offset + _CURSOR] = self.written
+            self._header[offset + _DECIMATION] = decimation
+            self._subscribers[slot] = dict(offset=offset, pid=request.get('pid'), slow=False)
+        return dict(name=self.shm.name, slot=slot, capacity=self.capacity,
+                    channels=self.channels, dtype=self.dtype.str,
+                    header_size=_header_size(self.max_subscribers))
+
+    def _unsubscribe(self, slot):
+        with self._lock:
+            if self._subscribers.pop(slot, None) is not None:
+                self._free_slots.append(slot)
+
+    def _handle(self, request, slot):
+        command = request.get('command')
+        if command == 'subscribe':
+            if slot is not None:
+                return dict(error='Already subscribed'), slot
+            reply = self._subscribe(request)
+            return reply, reply.get('slot')
+        if command == 'set_decimation' and slot is not None:
+            decimation = int(request['decimation'])
+            if decimation < 1:
+                return dict(error='Expected decimation >= 1 but got %r' % (decimation,)), slot
+            self._header[_GLOBALS + _SLOT * slot + _DECIMATION] = decimation
+            return dict(decimation=decimation), slot
+        return dict(error='Unknown command %r' % (command,)), slot
+
+    def _serve(self):
+        # socket -> [slot, pending bytes]
+        clients = {}
+        try:
+            while self._running.is_set():
+                readable = select.select([self._server] + list(clients), [], [], 0.2)[0]
+                for sock in readable:
+                    if sock is self._server:
+                        clients[self._server.accept()[0]] = [None, b'']
+                        continue
+                    state = clients[sock]
+                    try:
+                        data = sock.recv(4096)
+                    except socket.error:
+                        data = b''
+                    if not data:
+                        # The subscriber closed or died.
+                        del clients[sock]
+                        sock.close()
+                        if state[0] is not None:
+                            self._unsubscribe(state[0])
+                        continue
+                    state[1] += data
+                    while b'\n' in state[1]:
+                        line, state[1] = state[1].split(b'\n', 1)
+                        try:
+                            request = json.loads(line.decode('ascii'))
+                            reply, state[0] = self._handle(request, state[0])
+                        except (ValueError, KeyError) as exc:
+                            reply = dict(error='Invalid request: %s' % (exc,))
+                        _send(sock, reply)
+        finally:
+            for sock, state in clients.items():
+                sock.close()
+                if state[0] is not None:
+                    self._unsubscribe(state[0])
+
+    def get_subscribers(self):
+        """
+        Returns the state of the subscribers.
+
+        Returns
+        -------
+
+        subscribers : list
+          A dict per subscriber with the keys 'slot', 'pid',
+          'decimation', 'lag' (samples per channel published but not
+          read yet), 'skipped' (samples skipped by the subscriber) and
+          'slow' (whether the lag exceeds the ring capacity).
+        """
+        header = self._header
+        result = []
+        for slot, info in sorted(self._subscribers.items()):
+            offset = info['offset']
+            result.append(dict(slot=slot, pid=info['pid'],
+                               decimation=int(header[offset + _DECIMATION]),
+                               lag=self.written - int(header[offset + _CURSOR]),
+                               skipped=int(header[offset + _SKIPPED]),
+                               slow=bool(info['slow'])))
+        return result
+
+    def stop(self, timeout=None):
+        """
+        Stops reading and serving, and removes the socket file and the
+        ring. Attached subscribers can still read the samples left in
+        the ring, after which their reads raise EOFError.
+        """
+        self._running.clear()
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+        self.source.stop()
+        self._header[_STATE] = _STOPPED
+        self._server.close()
+        if os.path.exists(self.path):
+            os.unlink(self.path)
+        del self._header, self._ring
+        self.shm.close()
+        self.shm.unlink()
+
+class Subscriber(object):
+    """
+    Reads the stream of a `Publisher` from another process.
+
+    Parameters
+    ----------
+
+    path : str
+      The path of the control socket of the publisher.
+
+    decimation : int
+      Only every `decimation`-th sample is read, namely those whose
+      index in the stream is a multiple of `decimation`.
+
+    poll_interval : float
+      The time in seconds between checks for new samples in `read`.
+
+    latest : bool
+      If True then reading starts with the next published sample,
+      otherwise with the oldest published sample that is at most
+      half the ring capacity old.
+
+    Attributes
+    ----------
+
+    cursor : int
+      The stream index of the next sample to read.
+    skipped : int
+      The number of samples per channel skipped because the
+      subscriber fell behind by more than the ring capacity.
+    """
+
+    def __init__(self, path, decimation=1, poll_interval=1e-3, latest=True):
+        if shared_memory is None:
+            raise RuntimeError('Subscriber requires multiprocessing.shared_memory (Python 3.8+)')
+        self.poll_interval = poll_interval
+        self._sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self._sock.connect(path)
+        self._pending = b''
+        info = self._request(dict(command='subscribe', decimation=decimation, pid=os.getpid()))
+        self.slot = info['slot']
+        self.capacity = info['capacity']
+        self.channels = info['channels']
+        self.dtype = np.dtype(info['dtype'])
+        self.shm = _attach(info['name'])
+        header_size = info['header_size']
+        # pylint: disable=no-member
+        self._header = np.ndarray((header_size // 8,), dtype=np.int64, buffer=self.shm.buf)
+        self._ring = np.ndarray((self.capacity, self.channels), dtype=self.dtype,
+                                buffer=self.shm.buf, offset=header_size)
+        # pylint: enable=no-member
+        self._slot = self._header[_GLOBALS + _SLOT * self.slot:][:_SLOT]
+        self.decimation = int(decimation)
+        self.skipped = 0
+        written = int(self._header[_WRITTEN])
+        if not latest:
+            written = max(0, written - self.capacity // 2)
+        self._set_cursor(self._align(written))
+
+    def _request(self, message):
+        _send(self._sock, message)
+        while b'\n' not in self._pending:
+            data = self._sock.recv(4096)
+            if not data:
+                raise EOFError('Publisher closed the control channel')
+            self._pending += data
+        line, self._pending = self._pending.split(b'\n', 1)
+        reply = json.loads(line.decode('ascii'))
+        if 'error' in reply:
+            raise RuntimeError(reply['error'])
+        return reply
+
+    def _align(self, index):
+        return -(-index // self.decimation) * self.decimation
+
+    def _set_cursor(self, cursor):
+        self.cursor = cursor
+        self._slot[_CURSOR] = cursor
+        self._slot[_SKIPPED] = self.skipped
+
+    def set_decimation(self, decimation):
+        """
+        Changes the decimation factor. The cursor moves to the next
+        multiple of `decimation`.
+        """
+        self._request(dict(command='set_decimation', decimation=decimation))
+        self.decimation = int(decimation)
+        self._set_cursor(self._align(self.cursor))
+
+    def read(self, max_samples=None, timeout=10.0):
+        """
+        Reads the samples published since the last read.
+
+        Parameters
+        ----------
+
+        max_samples : {int, None}
+          The maximal number of (decimated) samples per channel to
+          return.
+
+        timeout : float
+          The time in seconds to wait for new samples.
+
+        Returns
+        -------
+
+        index : int
+          The stream index of the first returned sample. Gaps in the
+          indices show where samples were skipped.
+
+        data : array
+          A ``(samples, channels)`` array, empty on timeout.
+
+        Raises
+        ------
+
+        EOFError
+          If the publisher stopped and all samples were read.
+        """
+        # pylint: disable=no-member
+        header = self._header
+        k = self.decimation
+        capacity = self.capacity
+        deadline = timer() + timeout
+        while True:
+            written = int(header[_WRITTEN])
+            if written > self.cursor:
+                break
+            if header[_STATE] != _RUNNING:
+                raise EOFError('Publisher stopped')
+            if timer() >= deadline:
+                return self.cursor, np.empty((0, self.channels), dtype=self.dtype)
+            time.sleep(self.poll_interval)
+        start = self.cursor
+        if written - start > capacity:
+            # Fell behind: skip to the newer half of the ring.
+            start = self._align(written - capacity // 2)
+            self.skipped += start - self.cursor
+        count = -(-(written - start) // k)
+        if max_samples is not None:
+            count = min(count, max_samples)
+        data = np.empty((count, self.channels), dtype=self.dtype)
+        first = self._ring[start % capacity::k][:count]
+        n = first.shape[0]
+        data[:n] = first
+        if n < count:
+            data[n:] = self._ring[(start + n * k) % capacity::k][:count - n]
+        # Drop the samples that the publisher may have overwritten
+        # while they were copied.
+        oldest = int(header[_WRITING]) - capacity
+        if oldest > start:
+            torn = min(count, -(-(oldest - start) // k))
+            data = data[torn:]
+            self.skipped += torn * k
+            start += torn * k
+            count -= torn
+        self._set_cursor(start + count * k)
+        return start, data
+
+    def close(self):
+        """
+        Unsubscribes and detaches from the ring.
+        """
+        self._sock.close()
+        del self._header, self._ring, self._slot
+        self.shm.close()
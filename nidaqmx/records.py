@@ -0,0 +1,471 @@
+"""
+Repeated triggered acquisition of fixed length records.
+
+.. autosummary::
+
+  RecordCapture
+  RecordAverager
+  SegmentStore
+  SegmentCapture
+
+Example usage
+=============
+
+Capture 100 records of 1000 samples of two channels, each started by
+a rising edge on PFI0 that occurs every 10 ms::
+
+>>> import numpy as np
+>>> from nidaqmx import AnalogInputTask
+>>> from nidaqmx.records import RecordCapture
+>>> task = AnalogInputTask()
+>>> task.create_voltage_channel('Dev1/ai0:1', min_val=-10, max_val=10)
+>>> task.configure_timing_sample_clock(rate=1e6, sample_mode='finite',
+...                                    samples_per_channel=1000)
+>>> task.configure_trigger_digital_edge_start('PFI0')
+>>> capture = RecordCapture(task, trigger_period=0.01)
+>>> records = np.empty((100, 1000, 2))
+>>> timestamps, missed = capture.capture(records)
+
+Average 10000 records without keeping them::
+
+>>> from nidaqmx.records import RecordAverager
+>>> averager = RecordAverager(1000, 2, variance=True)
+>>> capture.average(10000, averager)
+>>> mean, variance = averager.mean, averager.get_variance()
+
+Capture up to 10000 reference triggered segments with 200 pretrigger
+samples into a memory mapped file::
+
+>>> from nidaqmx.records import SegmentStore, SegmentCapture
+>>> task = AnalogInputTask()
+>>> task.create_voltage_channel('Dev1/ai0:1', min_val=-10, max_val=10)
+>>> task.configure_timing_sample_clock(rate=1e6, sample_mode='finite',
+...                                    samples_per_channel=1000)
+>>> task.configure_analog_edge_reference_trigger('Dev1/ai0', level=2.0,
+...                                              pre_trigger_samps=200)
+>>> store = SegmentStore(10000, 1000, 2, filename='events.dat')
+>>> SegmentCapture(task, store).capture(timeout=-1)
+>>> store.data[:store.count], store.index[:store.count]
+
+"""
+
+from __future__ import print_function, division, absolute_import
+
+import time
+
+import numpy as np
+
+__all__ = ['RecordCapture', 'RecordAverager', 'SegmentStore',
+           'SegmentCapture', 'segment_dtype']
+
+timer = getattr(time, 'perf_counter', time.time)
+
+#: The record type of the segment index: the index of the trigger
+#: sample within the segment and the estimated trigger time in seconds
+#: of the ``time.perf_counter`` clock.
+segment_dtype = np.dtype([('trigger_index', np.int64), ('time', np.float64)])
+
+class RecordCapture(object):
+    """
+    Captures records of a finite, start triggered analog input task
+    into a preallocated array.
+
+    The task is committed once, so that rearming it for the next
+    trigger costs only a start and a stop call. With
+    ``retriggerable=True`` the task is started once and rearmed by the
+    hardware, which is supported by X Series devices.
+
+    Parameters
+    ----------
+
+    task : nidaqmx.AnalogInputTask
+      A task configured with finite sample clock timing, the number of
+      samples per channel being the record length, and a start
+      trigger.
+
+    trigger_period : {float, None}
+      The expected trigger period in seconds, used to estimate the
+      number of missed triggers from host times, see `capture`.
+
+    retriggerable : bool
+      If True then the start trigger is made retriggerable and the
+      task runs until `stop` is called.
+
+    buffer_records : int
+      The number of records the input buffer holds when
+      `retriggerable` is True.
+    """
+
+    def __init__(self, task, trigger_period=None, retriggerable=False,
+                 buffer_records=16):
+        if task.sample_mode != 'finite':
+            raise ValueError('Expected task with finite sample mode but got %r'
+                             % (task.sample_mode,))
+        self.task = task
+        self.samples = task.samples_per_channel
+        self.rate = task.get_sample_clock_rate()
+        self.trigger_period = trigger_period
+        self.retriggerable = retriggerable
+        if retriggerable:
+            # Imported here so that RecordAverager and SegmentStore do
+            # not need the driver.
+            from .libnidaqmx import CALL, bool32
+            CALL('SetStartTrigRetriggerable', task, bool32(1))
+            task.set_buffer_size(self.samples * buffer_records)
+        task.alter_state('commit')
+        self._running = False
+        self._last_time = None
+
+    def start(self):
+        """
+        Starts a retriggerable capture. Does nothing otherwise.
+        """
+        if self.retriggerable and not self._running:
+            self.task.start()
+            self._running = True
+
+    def stop(self):
+        """
+        Stops a retriggerable capture. The task returns to the
+        committed state.
+        """
+        if self._running:
+            self.task.stop()
+            self._running = False
+        self._last_time = None
+
+    def _read_record(self, out, timeout):
+        task = self.task
+        if self.retriggerable:
+            task.read(self.samples, timeout=timeout, out=out)
+            return
+        task.start()
+        try:
+            task.read(self.samples, timeout=timeout, out=out)
+        finally:
+            task.stop()
+
+    def capture(self, out, timeout=10.0):
+        """
+        Captures ``len(out)`` records.
+
+        Parameters
+        ----------
+
+        out : array
+          A C-contiguous ``float64`` array of shape ``(records,
+          samples, channels)`` that the records are read into.
+
+        timeout : float
+          The time in seconds to wait for a trigger and a record.
+
+        Returns
+        -------
+
+        timestamps : array
+          Host-side approximations of the trigger times in seconds of
+          the ``time.perf_counter`` clock (``time.time`` on Python 2):
+          the time when the read of each record returned minus the
+          record duration. They include the read latency and the
+          scheduling jitter of the host; they are not hardware
+          timestamps.
+
+        missed : int
+          A host-side approximation of the number of triggers that
+          occurred between the records and were not captured: the gaps
+          between the timestamps rounded to multiples of
+          `trigger_period`, 0 if `trigger_period` was not given. A
+          read delayed by half a trigger period or more counts as a
+          missed trigger. Timestamp the trigger with a counter task
+          where exact counts are needed. The gap between the first
+          record and the previous `capture` call is included when
+          capturing continues without `stop`.
+        """
+        # pylint: disable=no-member
+        if out.ndim != 3 or out.shape[1] != self.samples:
+            raise ValueError('Expected (records, %s, channels) array but got %s'
+                             % (self.samples, out.shape))
+        duration = self.samples / self.rate
+        timestamps = np.empty(out.shape[0], dtype=np.float64)
+        self.start()
+        for i in range(out.shape[0]):
+            self._read_record(out[i], timeout)
+            timestamps[i] = timer() - duration
+        missed = 0
+        if self.trigger_period and timestamps.size:
+            if self._last_time is None:
+                gaps = np.diff(timestamps)
+            else:
+                gaps = np.diff(np.concatenate(([self._last_time], timestamps)))
+            periods = np.rint(gaps / self.trigger_period)
+            missed = int(np.maximum(periods - 1, 0).sum())
+        if timestamps.size:
+            self._last_time = timestamps[-1]
+        return timestamps, missed
+
+    def average(self, count, averager=None, timeout=10.0):
+        """
+        Captures `count` records and accumulates them into an
+        averager.
+
+        Each record is read into the buffer of the averager and added
+        to its running mean in place, so memory use and the work per
+        record do not depend on `count`.
+
+        Parameters
+        ----------
+
+        count : int
+          The number of records to capture.
+
+        averager : {RecordAverager, None}
+          The averager to accumulate into, for instance to continue
+          averaging over several calls. By default a new averager
+          without variance is used.
+
+        timeout : float
+          The time in seconds to wait for a trigger and a record.
+
+        Returns
+        -------
+
+        averager : RecordAverager
+        """
+        if averager is None:
+            averager = RecordAverager(self.samples, self.task.get_number_of_channels())
+        self.start()
+        for i in range(count):
+            self._read_record(averager.record, timeout)
+            averager.add()
+        return averager
+
+class RecordAverager(object):
+    """
+    Running mean and, optionally, variance of records, updated in
+    place with Welford's algorithm.
+
+    Parameters
+    ----------
+
+    samples, channels : int
+      The shape of a record.
+
+    variance : bool
+      If True then the sum of squared deviations is accumulated as
+      well, see `get_variance`.
+
+    Attributes
+    ----------
+
+    record : array
+      A ``(samples, channels)`` buffer to read the next record into,
+      see `add`.
+    mean : array
+      The running mean, updated in place.
+    count : int
+      The number of records averaged.
+    """
+
+    def __init__(self, samples, channels, variance=False):
+        # pylint: disable=no-member
+        shape = (samples, channels)
+        self.record = np.empty(shape, dtype=np.float64)
+        self.mean = np.zeros(shape, dtype=np.float64)
+        self._delta = np.empty(shape, dtype=np.float64)
+        if variance:
+            self._m2 = np.zeros(shape, dtype=np.float64)
+            self._delta2 = np.empty(shape, dtype=np.float64)
+        else:
+            self._m2 = None
+        self.count = 0
+
+    def reset(self):
+        """
+        Forget the accumulated records.
+        """
+        self.mean.fill(0)
+        if self._m2 is not None:
+            self._m2.fill(0)
+        self.count = 0
+
+    def add(self, record=None):
+        """
+        Adds a record to the running mean.
+
+        Parameters
+        ----------
+
+        record : {array, None}
+          A ``(samples, channels)`` array, by default the `record`
+          buffer.
+        """
+        # pylint: disable=no-member
+        if record is None:
+            record = self.record
+        self.count += 1
+        delta = self._delta
+        np.subtract(record, self.mean, out=delta)
+        if self._m2 is None:
+            delta /= self.count
+            self.mean += delta
+        else:
+            delta2 = self._delta2
+            np.divide(delta, self.count, out=delta2)
+            self.mean += delta2
+            np.subtract(record, self.mean, out=delta2)
+            delta *= delta2
+            self._m2 += delta
+
+    def get_variance(self, out=None, ddof=1):
+        """
+        Returns the variance of the records about the mean.
+
+        Parameters
+        ----------
+
+        out : {array, None}
+          A ``(samples, channels)`` array to write the variance to.
+
+        ddof : int
+          Delta degrees of freedom, the divisor is ``count - ddof``.
+        """
+        # pylint: disable=no-member
+        if self._m2 is None:
+            raise ValueError('RecordAverager was created without variance')
+        if out is None:
+            out = np.empty_like(self._m2)
+        np.divide(self._m2, max(self.count - ddof, 1), out=out)
+        return out
+
+class SegmentStore(object):
+    """
+    Preallocated storage of reference triggered segments.
+
+    Parameters
+    ----------
+
+    segments : int
+      The capacity in segments.
+
+    samples, channels : int
+      The shape of a segment.
+
+    filename : {str, None}
+      If given then the segments are stored in a memory mapped file
+      of that name and the index in a file with an additional
+      ``.index`` suffix. Otherwise they are stored in memory.
+
+    overwrite : bool
+      If True then the store is used as a ring buffer and the oldest
+      segments are overwritten when it is full.
+
+    Attributes
+    ----------
+
+    data : array
+      The ``(segments, samples, channels)`` ``float64`` segments.
+    index : array
+      The `segment_dtype` records of the segments.
+    count : int
+      The number of segments stored so far, including overwritten
+      ones. Segment ``i`` is stored at ``i % segments``.
+    """
+
+    def __init__(self, segments, samples, channels, filename=None, overwrite=False):
+        # pylint: disable=no-member
+        shape = (segments, samples, channels)
+        if filename is None:
+            self.data = np.empty(shape, dtype=np.float64)
+            self.index = np.zeros(segments, dtype=segment_dtype)
+        else:
+            self.data = np.memmap(filename, dtype=np.float64, mode='w+', shape=shape)
+            self.index = np.memmap(filename + '.index', dtype=segment_dtype,
+                                   mode='w+', shape=(segments,))
+        self.overwrite = overwrite
+        self.count = 0
+
+    @property
+    def full(self):
+        """
+        True when no segments can be added without overwriting.
+        """
+        return self.count >= len(self.data) and not self.overwrite
+
+    def next_slot(self):
+        """
+        Returns the position of the next segment.
+        """
+        if self.full:
+            raise IndexError('Segment store is full')
+        return self.count % len(self.data)
+
+    def flush(self):
+        """
+        Writes memory mapped segments to disk.
+        """
+        for a in [self.data, self.index]:
+            if hasattr(a, 'flush'):
+                a.flush()
+
+class SegmentCapture(RecordCapture):
+    """
+    Captures the segments of a reference triggered analog input task
+    into a `SegmentStore`.
+
+    The task is committed once and each segment is captured with one
+    start, read and stop call, writing the pre- and posttrigger
+    samples directly into the store.
+
+    Parameters
+    ----------
+
+    task : nidaqmx.AnalogInputTask
+      A task configured with finite sample clock timing, the number of
+      samples per channel being the segment length, and a reference
+      trigger, see e.g.
+      `nidaqmx.libnidaqmx.Task.configure_analog_edge_reference_trigger`.
+
+    store : SegmentStore
+      The store to write segments to.
+    """
+
+    def __init__(self, task, store):
+        RecordCapture.__init__(self, task)
+        if store.data.shape[1] != self.samples:
+            raise ValueError('Expected store with %s samples per segment but got %s'
+                             % (self.samples, store.data.shape[1]))
+        self.store = store
+        self.pretrigger_samples = task.get_reference_trigger_pretrigger_samples()
+
+    def capture(self, count=None, timeout=10.0):
+        """
+        Captures segments.
+
+        Parameters
+        ----------
+
+        count : {int, None}
+          The number of segments to capture. By default segments are
+          captured until the store is full, or forever if the store
+          overwrites old segments.
+
+        timeout : float
+          The time in seconds to wait for a trigger and a segment,
+          -1 to wait forever.
+
+        Returns
+        -------
+
+        captured : int
+          The number of segments captured.
+        """
+        store = self.store
+        posttrigger = (self.samples - self.pretrigger_samples) / self.rate
+        captured = 0
+        while (count is None or captured < count) and not store.full:
+            slot = store.next_slot()
+            self._read_record(store.data[slot], timeout)
+            store.index[slot] = (self.pretrigger_samples, timer() - posttrigger)
+            store.count += 1
+            captured += 1
+        return captured
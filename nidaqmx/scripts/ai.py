@@ -12,14 +12,84 @@ import time
 ### START UPDATE SYS.PATH ###
 ### END UPDATE SYS.PATH ###
 
+import signal
 import numpy as np
 
-from ioc.optparse_gui import OptionParser
+try:
+    from ioc.optparse_gui import OptionParser
+except ImportError:
+    # Headless operation, e.g. the record task under a service manager.
+    from optparse import OptionParser
 from optparse import OptionGroup
 
 from nidaqmx import AnalogInputTask
 from nidaqmx.optparse_options import get_method_arguments, set_ai_options
 
+def record (task, options, channels, clock_rate, read_kws):
+    """
+    Stream samples to options.ai_record_file until the duration
+    elapses or the process is interrupted (Ctrl-C or SIGTERM).
+
+    Every chunk returned by task.read is appended to the file as raw
+    float64 samples in the read fill mode. A description of the
+    recording is written to a .txt file next to it.
+    """
+    filename = options.ai_record_file
+    fill_mode = read_kws.get ('fill_mode', 'group_by_scan_number')
+    samples_per_channel = read_kws.get('samples_per_channel') or max(1, int(clock_rate/10))
+    timeout = read_kws.get('timeout', 10.0)
+    buffer_size = task.get_buffer_size()
+
+    f = open(filename + '.txt', 'w')
+    f.write('channels: %s\n' % (', '.join(channels)))
+    f.write('sample_rate: %s\n' % (clock_rate))
+    f.write('dtype: float64\n')
+    f.write('fill_mode: %s\n' % (fill_mode))
+    f.write('samples_per_chunk: %s\n' % (samples_per_channel))
+    f.close()
+
+    stopped = []
+    def on_signal(signum, frame):
+        stopped.append(signum)
+    signal.signal(signal.SIGTERM, on_signal)
+
+    f = open(filename, 'wb')
+    total_samples = 0
+    max_backlog = 0
+    error = None
+    start_time = last_flush = time.time()
+    print 'Recording to %r, press Ctrl-C to stop.' % (filename)
+    try:
+        while not stopped:
+            data = task.read(samples_per_channel, timeout=timeout, fill_mode=fill_mode)
+            data.tofile(f)
+            total_samples += data.size // len(channels)
+            max_backlog = max(max_backlog, task.get_samples_per_channel_available())
+            now = time.time()
+            if now - last_flush >= options.ai_record_flush_interval:
+                f.flush()
+                os.fsync(f.fileno())
+                last_flush = now
+            if options.ai_record_duration and now - start_time >= options.ai_record_duration:
+                break
+    except KeyboardInterrupt:
+        print 'Caught Ctrl-C.'
+    except RuntimeError, msg:
+        error = msg
+    finally:
+        f.flush()
+        os.fsync(f.fileno())
+        f.close()
+    elapsed = time.time() - start_time
+    nbytes = total_samples * len (channels) * 8
+    print 'Recorded %s samples per channel in %.3f seconds' % (total_samples, elapsed)
+    print 'Throughput: %.1f samples/s per channel, %.3f MB/s' % (total_samples/elapsed, nbytes/elapsed/1e6)
+    print 'Maximum backlog: %s of %s samples per channel (%.1f%%)' % (max_backlog, buffer_size, 100.0*max_backlog/max(buffer_size, 1))
+    if error is not None:
+        print 'Acquisition stopped on error: %s' % (error)
+        return False
+    return True
+
 def runner (parser, options, args):
     task = AnalogInputTask()
 
@@ -45,7 +115,7 @@ def runner (parser, options, args):
     fill_mode = kws.get ('fill_mode', 'group_by_scan_number')
     print 'read', read_kws
 
-    if options.ai_task=='show':
+    if options.ai_task in ['show', 'fast_show']:
         from nidaqmx.wxagg_plot import animated_plot
         start_time = time.time()
         def func(task=task):
@@ -56,10 +126,22 @@ def runner (parser, options, args):
             tm = np.arange(data.shape[-1], dtype=float)/clock_rate + (current_time - start_time)
             return tm, data, channels
         try:
-            animated_plot(func, 1000*(task.samples_per_channel/clock_rate+0.1))
+            if options.ai_task=='fast_show':
+                # stopping the task aborts a read pending in the
+                # acquisition thread, the task is cleared after the
+                # thread has exited
+                animated_plot(func, 1000/30.0, fast=True, stop=task.stop)
+            else:
+                animated_plot(func, 1000*(task.samples_per_channel/clock_rate+0.1))
         finally:
+            task.clear()
             del task
         return
+    elif options.ai_task=='record':
+        try:
+            record(task, options, channels, clock_rate, read_kws)
+        finally:
+            del task
     elif options.ai_task=='print':
         try:
             data = task.read (**kws)
@@ -0,0 +1,14 @@
+#!/usr/bin/env python
+# -*- python-mode -*-
+"""
+Runs nidaqmx benchmarks and prints the results as JSON.
+"""
+
+import sys
+### START UPDATE SYS.PATH ###
+### END UPDATE SYS.PATH ###
+
+from nidaqmx.benchmark import main
+
+if __name__=="__main__":
+    sys.exit(main())
@@ -0,0 +1,625 @@
+"""
+Local acquisition server and client with binary framing.
+
+`AcquisitionServer` owns the tasks of a chassis and serves them to
+clients over a Unix domain socket or a localhost TCP socket. Clients
+create and configure tasks from task definitions (see
+`nidaqmx.libnidaqmx.Task.to_config`), start and stop them, and
+subscribe to their data. `AcquisitionClient` returns the data as
+numpy arrays and does not create any tasks itself.
+
+All messages are length-prefixed frames. Requests and replies carry
+a JSON body; data frames carry a fixed binary header followed by the
+raw samples of one read chunk, so there is no per-sample encoding.
+The server sends the chunk returned by the read directly from its
+buffer with ``socket.sendmsg`` (where available), and sends all
+frames queued for a client with one call. A client that does not
+keep up loses chunks rather than stalling the acquisition; the
+stream indices in the data frames show the gaps.
+
+.. autosummary::
+
+  AcquisitionServer
+  AcquisitionClient
+
+Example usage
+=============
+
+The server process::
+
+>>> from nidaqmx.server import AcquisitionServer
+>>> server = AcquisitionServer('/tmp/nidaqmx.sock')
+>>> server.start()
+>>> server.wait()
+
+A client process::
+
+>>> from nidaqmx.server import AcquisitionClient
+>>> client = AcquisitionClient('/tmp/nidaqmx.sock')
+>>> client.create_task('ai', config) # config from Task.to_config()
+>>> client.subscribe('ai')
+>>> client.start_task('ai', samples_per_channel=10000)
+>>> while True:
+...     name, index, data = client.read()
+
+"""
+
+from __future__ import print_function, division, absolute_import
+
+import os
+import sys
+import json
+import struct
+import select
+import socket
+import threading
+try:
+    import queue
+except ImportError: # Python 2
+    import Queue as queue
+
+import numpy as np
+
+from .libnidaqmx import Task
+
+__all__ = ['AcquisitionServer', 'AcquisitionClient']
+
+# Frame header: body length and frame kind.
+_FRAME = struct.Struct('<IB3x')
+_REQUEST, _REPLY, _DATA, _END = 1, 2, 3, 4
+# Data frame body header: stream id, stream index of the first
+# sample, samples per channel, channels and numpy dtype string,
+# followed by the samples in C order.
+_DATA_HEADER = struct.Struct('<IQII8s')
+_IOV_MAX = 1024
+
+def _json_frame(kind, message):
+    body = json.dumps(message).encode('utf-8')
+    return _FRAME.pack(len(body), kind) + body
+
+def _send_buffers(sock, buffers):
+    """
+    Sends the buffers with as few system calls as possible, without
+    joining them where ``sendmsg`` is available (Python 3).
+    """
+    if not hasattr(sock, 'sendmsg'):
+        # One copy is cheaper than a system call per buffer.
+        data = bytearray()
+        for buf in buffers:
+            data += memoryview(buf)
+        sock.sendall(data)
+        return
+    buffers = [memoryview(buf).cast('B') for buf in buffers]
+    while buffers:
+        sent = sock.sendmsg(buffers[:_IOV_MAX])
+        while sent:
+            n = buffers[0].nbytes
+            if sent < n:
+                buffers[0] = buffers[0][sent:]
+                break
+            sent -= n
+            buffers.pop(0)
+        while buffers and not buffers[0].nbytes:
+            buffers.pop(0)
+
+def _recv_into(sock, buf):
+    # pylint: disable=no-member
+    view = memoryview(buf)
+    pos, n = 0, len(view)
+    while pos < n:
+        k = sock.recv_into(view[pos:])
+        if not k:
+            raise EOFError('Connection closed')
+        pos += k
+
+def _recv_exact(sock, n):
+    buf = bytearray(n)
+    _recv_into(sock, buf)
+    return bytes(buf)
+
+def _socket(address):
+    if isinstance(address, str):
+        return socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    return socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+
+_stop = object()
+
+class _Connection(object):
+
+    def __init__(self, server, sock):
+        self.server = server
+        self.sock = sock
+        self.dropped = 0
+        self._queue = queue.Queue(server.queue_size)
+        self._threads = [threading.Thread(target=self._receive, name='nidaqmx-server-receive'),
+                         threading.Thread(target=self._send, name='nidaqmx-server-send')]
+        for thread in self._threads:
+            thread.daemon = True
+            thread.start()
+
+    def send_data(self, header, chunk):
+        try:
+            self._queue.put_nowait((header, chunk))
+        except queue.Full:
+            self.dropped += 1
+
+    def send_message(self, kind, message, block=True):
+        try:
+            self._queue.put((_json_frame(kind, message),), block)
+        except queue.Full:
+            self.dropped += 1
+
+    def _send(self):
+        max_batch = self.server.max_batch
+        try:
+            while True:
+                batch = [self._queue.get()]
+                while len(batch) < max_batch:
+                    try:
+                        batch.append(self._queue.get_nowait())
+                    except queue.Empty:
+                        break
+                buffers = []
+                for item in batch:
+                    if item is _stop:
+                        break
+                    buffers.extend(item)
+                _send_buffers(self.sock, buffers)
+                if item is _stop:
+                    break
+        except socket.error:
+            pass
+        self.sock.close()
+
+    def _receive(self):
+        try:
+            while True:
+                length, kind = _FRAME.unpack(_recv_exact(self.sock, _FRAME.size))
+                body = _recv_exact(self.sock, length)
+                if kind != _REQUEST:
+                    raise ValueError('Expected request frame but got kind %s' % (kind))
+                self.send_message(_REPLY, self.server._handle(self, json.loads(body.decode('utf-8'))))
+        except (EOFError, socket.error, ValueError):
+            pass
+        self.server._disconnect(self)
+        self._queue.put(_stop)
+
+class _Stream(object):
+
+    def __init__(self, server, ident, name, task, samples_per_channel, timeout):
+        self.server = server
+        self.ident = ident
+        self.name = name
+        self.task = task
+        self.samples_per_channel = samples_per_channel
+        self.timeout = timeout
+        self.index = 0
+        self.error = None
+        self._running = threading.Event()
+        self._running.set()
+        self._thread = threading.Thread(target=self._run, name='nidaqmx-server-%s' % (name))
+        self._thread.daemon = True
+
+    def start(self):
+        self.task.start()
+        self._thread.start()
+
+    def _run(self):
+        try:
+            while self._running.is_set():
+                chunk = self.task.read(self.samples_per_channel, timeout=self.timeout)
+                if isinstance(chunk, tuple):
+                    # DigitalInputTask.read returns (data, bytes_per_sample)
+                    chunk = chunk[0]
+                # pylint: disable=no-member
+                chunk = np.ascontiguousarray(chunk)
+                if chunk.ndim == 1:
+                    chunk = chunk.reshape((chunk.size, 1))
+                rows, channels = chunk.shape
+                header = _FRAME.pack(_DATA_HEADER.size + chunk.nbytes, _DATA) + _DATA_HEADER.pack(
+                    self.ident, self.index, rows, channels, chunk.dtype.str.encode('ascii'))
+                for connection in self.server._subscribers(self.name):
+                    connection.send_data(header, chunk)
+                self.index += rows
+        except Exception as exc: # pylint: disable=broad-except
+            if self._running.is_set():
+                self.error = '%s: %s' % (exc.__class__.__name__, exc)
+                print('Stream %s failed: %s' % (self.name, self.error), file=sys.stderr)
+            # else the read was aborted by stop
+        message = dict(stream=self.ident, index=self.index, error=self.error)
+        for connection in self.server._subscribers(self.name):
+            connection.send_message(_END, message, block=False)
+
+    def is_alive(self):
+        return self._thread.is_alive()
+
+    def stop(self, timeout=None):
+        self._running.clear()
+        # Stopping the task aborts a pending read, so the join does
+        # not wait for the read timeout.
+        self.task.stop()
+        self._thread.join(timeout)
+
+class AcquisitionServer(object):
+    """
+    Serves tasks to `AcquisitionClient` instances.
+
+    Parameters
+    ----------
+
+    address : {str, tuple}
+      The path of a Unix domain socket, or a ``(host, port)`` pair
+      of a TCP socket. Use a localhost address, the server does not
+      authenticate clients.
+
+    tasks : {dict, None}
+      Tasks created by the server process, by name.
+
+    queue_size : int
+      The maximal number of frames queued per client. Data chunks
+      for a client with a full queue are dropped.
+
+    max_batch : int
+      The maximal number of queued frames sent with one system call.
+
+    Notes
+    -----
+
+    Clients send requests with a ``command`` item and receive a reply
+    with an ``error`` item on failure:
+
+    ``list``
+      Returns ``tasks``, the task definitions by name, and
+      ``streams``, the running streams by name.
+    ``create`` (``name``, ``config``)
+      Creates a task with `nidaqmx.libnidaqmx.Task.from_config`.
+    ``configure`` (``name``, ``config``)
+      Applies ``config``, a list of ``[key, value]`` pairs, with
+      `nidaqmx.libnidaqmx.Task.apply_config`.
+    ``clear`` (``name``)
+      Stops and clears a task.
+    ``start`` (``name``, ``samples_per_channel``, ``timeout``)
+      Starts a task and the reading of chunks, also after the
+      reading failed.
+    ``stop`` (``name``)
+      Stops a task.
+    ``subscribe``, ``unsubscribe`` (``name``)
+      Starts or stops sending the data of a task to the client.
+    """
+
+    def __init__(self, address, tasks=None, queue_size=64, max_batch=16):
+        self.address = address
+        self.tasks = dict(tasks or {})
+        self.queue_size = queue_size
+        self.max_batch = min(max_batch, _IOV_MAX // 2)
+        self._lock = threading.RLock()
+        self._streams = {}
+        self._stopping = {}
+        self._stream_ids = {}
+        self._subscriptions = {}
+        self._connections = []
+        self._running = threading.Event()
+
+    def start(self):
+        """
+        Starts accepting clients.
+        """
+        if isinstance(self.address, str) and os.path.exists(self.address):
+            os.unlink(self.address)
+        self._server = _socket(self.address)
+        if not isinstance(self.address, str):
+            self._server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self._server.bind(self.address)
+        self._server.listen(16)
+        self.address = self._server.getsockname()
+        self._running.set()
+        self._thread = threading.Thread(target=self._accept, name='nidaqmx-server-accept')
+        self._thread.daemon = True
+        self._thread.start()
+
+    def _accept(self):
+        while self._running.is_set():
+            if not select.select([self._server], [], [], 0.2)[0]:
+                continue
+            try:
+                sock = self._server.accept()[0]
+            except socket.error:
+                continue
+            if sock.family != getattr(socket, 'AF_UNIX', None):
+                sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            with self._lock:
+                self._connections.append(_Connection(self, sock))
+
+    def _disconnect(self, connection):
+        with self._lock:
+            if connection in self._connections:
+                self._connections.remove(connection)
+            for name, subscribers in self._subscriptions.items():
+                self._subscriptions[name] = subscribers - set([connection])
+
+    def _subscribers(self, name):
+        # Subscriber sets are replaced rather than modified, so the
+        # streams can iterate them without holding the lock.
+        return self._subscriptions.get(name, ())
+
+    def _task(self, name):
+        task = self.tasks.get(name)
+        if task is None:
+            raise KeyError('No task named %r' % (name,))
+        return task
+
+    def _pop_stream(self, name, release):
+        # Stopping a stream joins its thread, so it is left to the
+        # caller to do after releasing the lock.
+        stream = self._streams.pop(name, None)
+        if stream is not None:
+            self._stopping[name] = stream
+            release.append(lambda: self._stop_stream(stream))
+
+    def _stop_stream(self, stream):
+        try:
+            stream.stop()
+        finally:
+            with self._lock:
+                self._stopping.pop(stream.name, None)
+
+    def _handle(self, connection, request):
+        # Commands run under the lock and return the slow parts,
+        # stopping streams and clearing tasks, in `release`.
+        release = []
+        try:
+            try:
+                with self._lock:
+                    return self._execute(connection, request, release)
+            finally:
+                for func in release:
+                    func()
+        except Exception as exc: # pylint: disable=broad-except
+            return dict(error='%s: %s' % (exc.__class__.__name__, exc))
+
+    def _execute(self, connection, request, release):
+        command = request.get('command')
+        name = request.get('name')
+        if command == 'list':
+            return dict(tasks=dict((n, t.to_config()) for n, t in self.tasks.items()),
+                        streams=dict((n, dict(stream=s.ident, index=s.index, error=s.error))
+                                     for n, s in self._streams.items()),
+                        dropped=connection.dropped)
+        if command == 'create':
+            if name in self.tasks:
+                raise ValueError('Task %r exists' % (name,))
+            self.tasks[name] = Task.from_config(request['config'])
+            return {}
+        if command == 'configure':
+            config = [(tuple(key) if isinstance(key, list) else key, value)
+                      for key, value in request['config']]
+            self._task(name).apply_config(config)
+            return {}
+        if command == 'clear':
+            task = self._task(name)
+            if name in self._stopping:
+                raise ValueError('Task %r is stopping' % (name,))
+            self._pop_stream(name, release)
+            release.append(task.clear)
+            del self.tasks[name]
+            return {}
+        if command == 'start':
+            task = self._task(name)
+            stream = self._streams.get(name)
+            if stream is not None and not stream.is_alive():
+                # The reading failed, its error was sent to the
+                # subscribers. The thread has exited, so stopping is
+                # quick.
+                del self._streams[name]
+                stream.stop()
+            if name in self._streams:
+                raise ValueError('Task %r is running' % (name,))
+            if name in self._stopping:
+                raise ValueError('Task %r is stopping' % (name,))
+            ident = self._stream_ids.setdefault(name, len(self._stream_ids))
+            stream = _Stream(self, ident, name, task, int(request['samples_per_channel']),
+                             float(request.get('timeout', 10.0)))
+            stream.start()
+            self._streams[name] = stream
+            return dict(stream=ident)
+        if command == 'stop':
+            self._task(name)
+            self._pop_stream(name, release)
+            return {}
+        if command == 'subscribe':
+            self._task(name)
+            subscribers = self._subscriptions.get(name, frozenset())
+            self._subscriptions[name] = subscribers | set([connection])
+            return dict(stream=self._stream_ids.setdefault(name, len(self._stream_ids)))
+        if command == 'unsubscribe':
+            subscribers = self._subscriptions.get(name, frozenset())
+            self._subscriptions[name] = subscribers - set([connection])
+            return {}
+        raise ValueError('Unknown command %r' % (command,))
+
+    def wait(self, timeout=None):
+        """
+        Waits until the server is stopped.
+        """
+        self._thread.join(timeout)
+
+    def stop(self):
+        """
+        Stops the streams, disconnects the clients and stops
+        accepting new ones. The tasks are not cleared.
+        """
+        self._running.clear()
+        self._thread.join()
+        release = []
+        with self._lock:
+            for name in list(self._streams):
+                self._pop_stream(name, release)
+            for connection in list(self._connections):
+                try:
+                    connection.sock.shutdown(socket.SHUT_RDWR)
+                except socket.error:
+                    pass
+        for func in release:
+            func()
+        self._server.close()
+        if isinstance(self.address, str) and os.path.exists(self.address):
+            os.unlink(self.address)
+
+class AcquisitionClient(object):
+    """
+    Client of an `AcquisitionServer`.
+
+    Parameters
+    ----------
+
+    address : {str, tuple}
+      The address of the server, see `AcquisitionServer`.
+
+    Attributes
+    ----------
+
+    errors : dict
+      The errors of failed streams by task name.
+    """
+
+    def __init__(self, address):
+        self.sock = _socket(address)
+        self.sock.connect(address)
+        if self.sock.family != getattr(socket, 'AF_UNIX', None):
+            self.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self._names = {}
+        self._pending = []
+        self.errors = {}
+
+    def _receive(self):
+        # pylint: disable=no-member
+        length, kind = _FRAME.unpack(_recv_exact(self.sock, _FRAME.size))
+        if kind != _DATA:
+            return kind, json.loads(_recv_exact(self.sock, length).decode('utf-8'))
+        ident, index, rows, channels, dtype = _DATA_HEADER.unpack(
+            _recv_exact(self.sock, _DATA_HEADER.size))
+        data = np.empty((rows, channels), dtype=np.dtype(dtype.rstrip(b'\0').decode('ascii')))
+        _recv_into(self.sock, data.reshape(-1).view(np.uint8))
+        return kind, (self._names.get(ident), index, data)
+
+    def request(self, command, **kws):
+        """
+        Sends a request to the server and returns the reply.
+
+        Data frames received while waiting are kept for `read`.
+
+        Raises
+        ------
+
+        RuntimeError
+          If the server reports an error.
+        """
+        kws['command'] = command
+        self.sock.sendall(_json_frame(_REQUEST, kws))
+        while True:
+            kind, message = self._receive()
+            if kind == _REPLY:
+                break
+            self._pending.append((kind, message))
+        if 'error' in message:
+            raise RuntimeError(message['error'])
+        return message
+
+    def list_tasks(self):
+        """
+        Returns the task definitions by name.
+        """
+        return self.request('list')['tasks']
+
+    def create_task(self, name, config):
+        """
+        Creates a task on the server from a definition returned by
+        `nidaqmx.libnidaqmx.Task.to_config`.
+        """
+        self.request('create', name=name, config=config)
+
+    def configure_task(self, name, config):
+        """
+        Applies a configuration to a task, see
+        `nidaqmx.libnidaqmx.Task.apply_config`.
+        """
+        if isinstance(config, dict):
+            config = list(config.items())
+        self.request('configure', name=name, config=config)
+
+    def clear_task(self, name):
+        """
+        Clears a task on the server.
+        """
+        self.request('clear', name=name)
+
+    def start_task(self, name, samples_per_channel, timeout=10.0):
+        """
+        Starts a task; the server reads it in chunks of
+        `samples_per_channel` and sends them to the subscribers.
+        """
+        self.request('start', name=name, samples_per_channel=samples_per_channel,
+                     timeout=timeout)
+
+    def stop_task(self, name):
+        """
+        Stops a task.
+        """
+        self.request('stop', name=name)
+
+    def subscribe(self, name):
+        """
+        Requests the data of a task.
+        """
+        self._names[self.request('subscribe', name=name)['stream']] = name
+
+    def unsubscribe(self, name):
+        """
+        Stops receiving the data of a task. Chunks already sent are
+        still returned by `read`.
+        """
+        self.request('unsubscribe', name=name)
+
+    def read(self, timeout=None):
+        """
+        Returns the next chunk of a subscribed task.
+
+        Parameters
+        ----------
+
+        timeout : {float, None}
+          The time in seconds to wait for a chunk, None for no limit.
+
+        Returns
+        -------
+
+        name : {str, None}
+          The name of the task, None on timeout.
+
+        index : int
+          The stream index of the first sample of the chunk. Chunks
+          dropped by the server show as gaps in the indices.
+
+        data : {array, None}
+          A ``(samples, channels)`` array, None when the stream ended
+          or on timeout. The error of a failed stream is stored in
+          `errors`.
+        """
+        if self._pending:
+            kind, message = self._pending.pop(0)
+        else:
+            if timeout is not None and not select.select([self.sock], [], [], timeout)[0]:
+                return None, 0, None
+            kind, message = self._receive()
+        if kind == _DATA:
+            return message
+        name = self._names.get(message['stream'])
+        if message.get('error'):
+            self.errors[name] = message['error']
+        return name, message['index'], None
+
+    def close(self):
+        """
+        Disconnects from the server.
+        """
+        self.sock.close()
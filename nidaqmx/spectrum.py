@@ -0,0 +1,280 @@
+"""
+Streaming spectral estimation of analog input data.
+
+.. autosummary::
+
+  WelchEstimator
+
+Example usage
+=============
+
+>>> from nidaqmx import AnalogInputTask
+>>> from nidaqmx.spectrum import WelchEstimator
+>>> task = AnalogInputTask()
+>>> task.create_voltage_channel('Dev1/ai0:3', min_val=-10, max_val=10)
+>>> task.configure_timing_sample_clock(rate=1e5)
+>>> welch = WelchEstimator(1e5, nperseg=4096, frames=100)
+>>> task.start()
+>>> for i in range(1000):
+...     welch.update(task.read(10000))
+>>> freqs, psd = welch.frequencies, welch.get_psd()
+>>> spectrogram = welch.get_spectrogram() # the last 100 segments
+
+"""
+
+from __future__ import print_function, division, absolute_import
+
+import numpy as np
+from numpy.lib.stride_tricks import as_strided
+
+__all__ = ['WelchEstimator', 'get_window']
+
+def get_window(window, nperseg):
+    """
+    Returns a periodic window of length `nperseg`.
+
+    Parameters
+    ----------
+
+    window : {'hann', 'hamming', 'boxcar', array}
+      The name of the window or the window itself.
+    """
+    # pylint: disable=no-member
+    if not isinstance(window, str):
+        window = np.asarray(window, dtype=np.float64)
+        if window.shape != (nperseg,):
+            raise ValueError('Expected window of length %s but got shape %s'
+                             % (nperseg, window.shape))
+        return window
+    n = np.arange(nperseg, dtype=np.float64)
+    if window == 'hann':
+        return 0.5 - 0.5 * np.cos(2 * np.pi * n / nperseg)
+    if window == 'hamming':
+        return 0.54 - 0.46 * np.cos(2 * np.pi * n / nperseg)
+    if window == 'boxcar':
+        return np.ones(nperseg, dtype=np.float64)
+    raise ValueError('Unknown window %r' % (window,))
+
+class WelchEstimator(object):
+    """
+    Streaming Welch power spectral density and spectrogram estimator.
+
+    Chunks of samples are split into windowed segments of `nperseg`
+    samples that overlap by `noverlap` samples. The samples after the
+    last complete segment are carried over to the next chunk, so the
+    segments, and thus the estimates, do not depend on how the stream
+    is split into chunks. The segments of all channels of a chunk are
+    transformed with a single ``np.fft.rfft`` call. Their power
+    spectra are added to the Welch average and stored as frames of a
+    spectrogram ring. Memory use is bounded by the largest chunk and
+    the number of frames.
+
+    The estimates are one-sided densities in units squared per Hz,
+    without detrending, like ``scipy.signal.welch(x, rate,
+    window, nperseg, noverlap, detrend=False)``.
+
+    Parameters
+    ----------
+
+    rate : float
+      The sample rate in Hz.
+
+    nperseg : int
+      The segment length.
+
+    noverlap : {int, None}
+      The overlap of segments, by default ``nperseg // 2``.
+
+    window : {str, array}
+      See `get_window`.
+
+    frames : int
+      The number of most recent segments kept as spectrogram frames.
+
+    fill_mode : {'group_by_scan_number', 'group_by_channel'}
+      The layout of the chunks, see
+      `nidaqmx.libnidaqmx.AnalogInputTask.read`.
+
+    Attributes
+    ----------
+
+    frequencies : array
+      The frequencies of the spectra.
+    segments : int
+      The number of segments averaged since the last `reset`.
+    """
+
+    def __init__(self, rate, nperseg=1024, noverlap=None, window='hann',
+                 frames=0, fill_mode='group_by_scan_number'):
+        # pylint: disable=no-member
+        if noverlap is None:
+            noverlap = nperseg // 2
+        if not 0 <= noverlap < nperseg:
+            raise ValueError('Expected 0 <= noverlap < nperseg but got %r' % (noverlap,))
+        if fill_mode not in ['group_by_scan_number', 'group_by_channel']:
+            raise ValueError('Unknown fill_mode %r' % (fill_mode,))
+        self.rate = float(rate)
+        self.nperseg = nperseg
+        self.step = nperseg - noverlap
+        self.fill_mode = fill_mode
+        self.window = get_window(window, nperseg)
+        self.frequencies = np.fft.rfftfreq(nperseg, 1 / self.rate)
+        nfreq = self.frequencies.size
+        self._scale = np.empty(nfreq, dtype=np.float64)
+        self._scale.fill(1 / (self.rate * (self.window ** 2).sum()))
+        # one-sided: fold the power of negative frequencies
+        if nperseg % 2:
+            self._scale[1:] *= 2
+        else:
+            self._scale[1:-1] *= 2
+        self.nframes = frames
+        self.channels = None
+
+    def _allocate(self, channels):
+        # pylint: disable=no-member
+        self.channels = channels
+        nfreq = self.frequencies.size
+        self._buffer = np.empty((channels, 0), dtype=np.float64)
+        self._segments = np.empty((channels, 0, self.nperseg), dtype=np.float64)
+        self._power = np.empty((channels, 0, nfreq), dtype=np.float64)
+        self._sum = np.zeros((channels, nfreq), dtype=np.float64)
+        self._psd = np.zeros((channels, nfreq), dtype=np.float64)
+        self.frames = np.zeros((self.nframes, channels, nfreq), dtype=np.float64)
+        self.reset()
+
+    def reset(self):
+        """
+        Forget all samples and segments.
+        """
+        if self.channels is None:
+            return
+        self._pending = 0
+        self._sum.fill(0)
+        self.segments = 0
+        self.frames.fill(0)
+        self._frame_position = 0
+
+    def update(self, data):
+        """
+        Adds a chunk of samples.
+
+        Parameters
+        ----------
+
+        data : array
+          A ``(samples, channels)`` array for 'group_by_scan_number' or
+          a ``(channels, samples)`` array for 'group_by_channel'
+          layout. A 1-d array is taken as samples of a single channel.
+
+        Returns
+        -------
+
+        segments : int
+          The number of new segments.
+        """
+        # pylint: disable=no-member
+        data = np.asarray(data, dtype=np.float64)
+        if data.ndim == 1:
+            data = data.reshape((1, data.size))
+        elif self.fill_mode == 'group_by_scan_number':
+            data = data.T
+        channels, n = data.shape
+        if self.channels is None:
+            self._allocate(channels)
+        elif channels != self.channels:
+            raise ValueError('Expected %s channels but got %s' % (self.channels, channels))
+
+        # The pending samples, fewer than nperseg, are kept at the
+        # start of the buffer.
+        p = self._pending
+        total = p + n
+        if self._buffer.shape[1] < total:
+            buf = np.empty((channels, total), dtype=np.float64)
+            buf[:, :p] = self._buffer[:, :p]
+            self._buffer = buf
+        buf = self._buffer
+        buf[:, p:total] = data
+        if total < self.nperseg:
+            self._pending = total
+            return 0
+        nseg = (total - self.nperseg) // self.step + 1
+        if self._segments.shape[1] < nseg:
+            self._segments = np.empty((channels, nseg, self.nperseg), dtype=np.float64)
+            self._power = np.empty((channels, nseg, self.frequencies.size), dtype=np.float64)
+        s0, s1 = buf.strides
+        view = as_strided(buf, shape=(channels, nseg, self.nperseg),
+                          strides=(s0, self.step * s1, s1))
+        segments = self._segments[:, :nseg]
+        np.multiply(view, self.window, out=segments)
+        spectra = np.fft.rfft(segments, axis=-1)
+        power = self._power[:, :nseg]
+        np.multiply(spectra.real, spectra.real, out=power)
+        power += spectra.imag ** 2
+        power *= self._scale
+        self._sum += power.sum(axis=1)
+        self.segments += nseg
+        if self.nframes:
+            self._store_frames(power)
+
+        start = nseg * self.step
+        self._pending = total - start
+        buf[:, :self._pending] = buf[:, start:total]
+        return nseg
+
+    def _store_frames(self, power):
+        nseg = power.shape[1]
+        frames = self.frames
+        if nseg >= self.nframes:
+            frames[:] = power[:, -self.nframes:].transpose(1, 0, 2)
+            self._frame_position = 0
+            return
+        i = self._frame_position
+        k = min(nseg, self.nframes - i)
+        frames[i:i + k] = power[:, :k].transpose(1, 0, 2)
+        frames[:nseg - k] = power[:, k:].transpose(1, 0, 2)
+        self._frame_position = (i + nseg) % self.nframes
+
+    def get_psd(self):
+        """
+        Returns the Welch average of the segment spectra.
+
+        Returns
+        -------
+
+        psd : array
+          A ``(channels, frequencies)`` array, an internal buffer that
+          is updated by the next call.
+        """
+        if self.channels is None:
+            raise ValueError('No samples have been added')
+        np.divide(self._sum, max(self.segments, 1), out=self._psd)
+        return self._psd
+
+    def get_spectrogram(self, out=None):
+        """
+        Returns the spectrogram frames in chronological order.
+
+        Parameters
+        ----------
+
+        out : {array, None}
+          A ``(frames, channels, frequencies)`` array to write the
+          frames to.
+
+        Returns
+        -------
+
+        frames : array
+          The power spectra of the last `frames` segments, the oldest
+          first. Frames not filled yet are zero.
+        """
+        # pylint: disable=no-member
+        if self.channels is None:
+            raise ValueError('No samples have been added')
+        if out is None:
+            out = np.empty_like(self.frames)
+        i = self._frame_position
+        k = self.nframes - i
+        out[:k] = self.frames[i:]
+        out[k:] = self.frames[:i]
+        return out
@@ -0,0 +1,190 @@
+"""
+Streaming per-channel statistics of analog input data.
+
+.. autosummary::
+
+  StreamStatistics
+
+Example usage
+=============
+
+>>> from nidaqmx import AnalogInputTask
+>>> from nidaqmx.statistics import StreamStatistics
+>>> task = AnalogInputTask()
+>>> task.create_voltage_channel('Dev1/ai0:31', min_val=-10, max_val=10)
+>>> task.configure_timing_sample_clock(rate=1e4)
+>>> stats = StreamStatistics(window=10)
+>>> task.start()
+>>> while True:
+...     stats.update(task.read(1000))
+...     print(stats.windowed.rms, stats.cumulative.peak_to_peak)
+
+"""
+
+from __future__ import print_function, division, absolute_import
+
+import numpy as np
+
+__all__ = ['StreamStatistics', 'StatisticsView', 'statistics_names']
+
+#: The names of the computed statistics, in the order of the rows of
+#: `StatisticsView.array`.
+statistics_names = ('mean', 'rms', 'min', 'max', 'peak_to_peak')
+
+class StatisticsView(object):
+    """
+    Per-channel statistics. The attributes are views of the rows of
+    `array` that are updated in place by `StreamStatistics.update`;
+    copy them to keep a result.
+
+    Attributes
+    ----------
+
+    array : array
+      A ``(5, channels)`` ``float64`` array, the rows hold the
+      statistics listed in `statistics_names`.
+    mean, rms, min, max, peak_to_peak : array
+      Views of the rows of `array`.
+    count : int
+      The number of samples per channel that the statistics cover.
+    """
+
+    def __init__(self, channels):
+        # pylint: disable=no-member
+        self.array = np.zeros((len(statistics_names), channels), dtype=np.float64)
+        for i, name in enumerate(statistics_names):
+            setattr(self, name, self.array[i])
+        self.count = 0
+
+    def _compute(self, count, total, squares, minimum, maximum):
+        self.count = count
+        if not count:
+            self.array.fill(0)
+            return
+        np.divide(total, count, out=self.mean)
+        np.divide(squares, count, out=self.rms)
+        np.sqrt(self.rms, out=self.rms)
+        self.min[:] = minimum
+        self.max[:] = maximum
+        np.subtract(maximum, minimum, out=self.peak_to_peak)
+
+class StreamStatistics(object):
+    """
+    Accumulates per-channel statistics of read chunks.
+
+    Each chunk is reduced along its sample axis with vectorized numpy
+    reductions into per-chunk sums, sums of squares, minima and
+    maxima, which are merged into cumulative totals and into a ring of
+    the last `window` chunks. The results are written in place to the
+    `cumulative` and `windowed` views.
+
+    Parameters
+    ----------
+
+    window : int
+      The number of most recent chunks covered by the windowed
+      statistics.
+
+    fill_mode : {'group_by_scan_number', 'group_by_channel'}
+      The layout of the chunks, see
+      `nidaqmx.libnidaqmx.AnalogInputTask.read`.
+
+    Attributes
+    ----------
+
+    cumulative : StatisticsView
+      Statistics of all samples since the last `reset`.
+    windowed : StatisticsView
+      Statistics of the last `window` chunks.
+    """
+
+    def __init__(self, window=10, fill_mode='group_by_scan_number'):
+        if window < 1:
+            raise ValueError('Expected window >= 1 but got %r' % (window,))
+        if fill_mode not in ['group_by_scan_number', 'group_by_channel']:
+            raise ValueError('Unknown fill_mode %r' % (fill_mode,))
+        self.window = window
+        self.fill_mode = fill_mode
+        self.channels = None
+        self.cumulative = self.windowed = None
+
+    def _allocate(self, channels):
+        # pylint: disable=no-member
+        self.channels = channels
+        w = self.window
+        # rows: sum, sum of squares, min, max of each chunk in the window
+        self._ring = np.empty((4, w, channels), dtype=np.float64)
+        self._ring_count = np.zeros(w, dtype=np.int64)
+        self._chunk = np.empty((4, channels), dtype=np.float64)
+        self._totals = np.empty((4, channels), dtype=np.float64)
+        self._window_totals = np.empty((4, channels), dtype=np.float64)
+        self.cumulative = StatisticsView(channels)
+        self.windowed = StatisticsView(channels)
+        self.reset()
+
+    def reset(self):
+        """
+        Forget all accumulated chunks.
+        """
+        if self.channels is None:
+            return
+        self._position = 0
+        self._filled = 0
+        self._count = 0
+        self._ring_count.fill(0)
+        self._totals[:2].fill(0)
+        self._totals[2].fill(np.inf)
+        self._totals[3].fill(-np.inf)
+        self.cumulative._compute(0, *self._totals)
+        self.windowed._compute(0, *self._totals)
+
+    def update(self, data):
+        """
+        Adds a chunk of samples.
+
+        Parameters
+        ----------
+
+        data : array
+          A ``(samples, channels)`` array for 'group_by_scan_number' or
+          a ``(channels, samples)`` array for 'group_by_channel'
+          layout. A 1-d array is taken as samples of a single channel.
+        """
+        # pylint: disable=no-member
+        data = np.asarray(data, dtype=np.float64)
+        if data.ndim == 1:
+            data = data.reshape((data.size, 1))
+        elif self.fill_mode == 'group_by_channel':
+            data = data.T
+        n, channels = data.shape
+        if self.channels is None:
+            self._allocate(channels)
+        elif channels != self.channels:
+            raise ValueError('Expected %s channels but got %s' % (self.channels, channels))
+        if not n:
+            return
+        chunk = self._chunk
+        np.add.reduce(data, axis=0, out=chunk[0])
+        np.einsum('ij,ij->j', data, data, out=chunk[1])
+        np.minimum.reduce(data, axis=0, out=chunk[2])
+        np.maximum.reduce(data, axis=0, out=chunk[3])
+
+        totals = self._totals
+        totals[:2] += chunk[:2]
+        np.minimum(totals[2], chunk[2], out=totals[2])
+        np.maximum(totals[3], chunk[3], out=totals[3])
+        self._count += n
+        self.cumulative._compute(self._count, *totals)
+
+        i = self._position
+        self._ring[:, i] = chunk
+        self._ring_count[i] = n
+        self._position = (i + 1) % self.window
+        self._filled = min(self._filled + 1, self.window)
+        ring = self._ring[:, :self._filled]
+        window_totals = self._window_totals
+        np.add.reduce(ring[0], axis=0, out=window_totals[0])
+        np.add.reduce(ring[1], axis=0, out=window_totals[1])
+        np.minimum.reduce(ring[2], axis=0, out=window_totals[2])
+        np.maximum.reduce(ring[3], axis=0, out=window_totals[3])
+        self.windowed._compute(int(self._ring_count.sum()), *window_totals)
@@ -0,0 +1,400 @@
+"""
+Process-per-device acquisition with merged streams.
+
+Reading many devices from one process is limited by the GIL.
+`Supervisor` runs the tasks of each device in a worker process of
+its own, so reading scales with the number of cores. Tasks are given
+as serializable task definitions (see
+`nidaqmx.libnidaqmx.Task.to_config`) and grouped by the devices they
+use, see `group_by_device`. Every worker publishes its tasks with
+`nidaqmx.publish.Publisher`; the supervisor reads them with
+`nidaqmx.publish.Subscriber` from shared memory, so the samples are
+not pickled or sent through pipes. `Supervisor.read` merges the
+streams by sample index and returns the samples that all tasks have
+in common. Workers that exit unexpectedly are restarted.
+
+Merging by sample index assumes that the tasks use the same sample
+rate and are started together, for example by a shared start
+trigger.
+
+Requires Python 3.8 or newer (`multiprocessing.shared_memory`).
+
+.. autosummary::
+
+  Supervisor
+  group_by_device
+
+Example usage
+=============
+
+>>> from nidaqmx.supervisor import Supervisor
+>>> configs = [task.to_config() for task in tasks] # one or more tasks per device
+>>> supervisor = Supervisor(configs, samples_per_channel=10000)
+>>> supervisor.start()
+>>> while True:
+...     index, data = supervisor.read()
+...     for name, samples in data.items():
+...         print(name, index, samples.shape)
+
+"""
+
+from __future__ import print_function, division, absolute_import
+
+import os
+import sys
+import time
+import shutil
+import socket
+import tempfile
+import multiprocessing
+
+import numpy as np
+
+from .libnidaqmx import Task
+from .pipeline import TaskSource
+from .publish import Publisher, Subscriber
+
+__all__ = ['Supervisor', 'group_by_device']
+
+timer = getattr(time, 'perf_counter', time.time)
+
+def group_by_device(configs):
+    """
+    Groups task definitions so that tasks sharing a device are in the
+    same group.
+
+    Each task is created without committing to query
+    `nidaqmx.libnidaqmx.Task.get_devices`, and cleared again.
+
+    Parameters
+    ----------
+
+    configs : list
+      Task definitions returned by `nidaqmx.libnidaqmx.Task.to_config`.
+
+    Returns
+    -------
+
+    groups : list
+      Lists of indices into `configs`, in the order of the first task
+      of each group.
+    """
+    groups = [] # [devices, indices]
+    for i, config in enumerate(configs):
+        task = Task.from_config(config, commit=False)
+        try:
+            devices = set(task.get_devices())
+        finally:
+            task.clear()
+        merged = [devices, [i]]
+        for group in [g for g in groups if g[0] & devices]:
+            groups.remove(group)
+            merged[0] |= group[0]
+            merged[1] = group[1] + merged[1]
+        groups.append(merged)
+    groups.sort(key=lambda g: min(g[1]))
+    return [sorted(indices) for devices, indices in groups]
+
+def _run_worker(create_task, configs, paths, samples_per_channel, timeout, capacity,
+                control):
+    tasks, publishers = [], []
+    try:
+        for config, path in zip(configs, paths):
+            task = create_task(config)
+            tasks.append(task)
+            publisher = Publisher(TaskSource(task, samples_per_channel, timeout=timeout),
+                                  path, capacity=capacity)
+            publisher.start()
+            publishers.append(publisher)
+        # Anything received on the control pipe, or its closing, means
+        # stop.
+        while not control.poll(0.1):
+            for publisher in publishers:
+                if publisher.error is not None:
+                    raise publisher.error
+    finally:
+        for publisher in publishers:
+            publisher.stop()
+        for task in tasks:
+            task.clear()
+
+class _Stream(object):
+
+    def __init__(self, name, path):
+        self.name = name
+        self.path = path
+        self.subscriber = None
+        self.reset()
+
+    def reset(self, offset=0):
+        self.chunks = [] # (index, array), contiguous
+        # local index + offset = merged index, None until aligned
+        self.offset = offset
+
+    @property
+    def start(self):
+        return self.chunks[0][0]
+
+    @property
+    def end(self):
+        index, data = self.chunks[-1]
+        return index + data.shape[0]
+
+    def trim(self, size):
+        # Drops the oldest samples beyond `size`, returns their number.
+        start = self.end - size
+        if start <= self.start:
+            return 0
+        dropped = start - self.start
+        while self.chunks[0][0] + self.chunks[0][1].shape[0] <= start:
+            self.chunks.pop(0)
+        index, data = self.chunks[0]
+        self.chunks[0] = (start, data[start - index:])
+        return dropped
+
+    def close(self):
+        if self.subscriber is not None:
+            self.subscriber.close()
+            self.subscriber = None
+
+    def take(self, start, end):
+        # pylint: disable=no-member
+        pieces = []
+        while self.chunks and self.start < end:
+            index, data = self.chunks[0]
+            piece = data[max(0, start - index):end - index]
+            if piece.shape[0]:
+                pieces.append(piece)
+            if index + data.shape[0] <= end:
+                self.chunks.pop(0)
+            else:
+                self.chunks[0] = (end, data[end - index:])
+        if len(pieces) == 1:
+            return pieces[0]
+        return np.concatenate(pieces)
+
+class Supervisor(object):
+    """
+    Runs the tasks of each device in a worker process and merges
+    their streams.
+
+    Parameters
+    ----------
+
+    configs : list
+      Task definitions returned by `nidaqmx.libnidaqmx.Task.to_config`
+      of input tasks, read in 'group_by_scan_number' layout.
+
+    samples_per_channel : int
+      The chunk size of the reads in the workers.
+
+    groups : {list, None}
+      Lists of indices into `configs` of the tasks run by each worker.
+      By default ``group_by_device(configs)``.
+
+    timeout : float
+      The read timeout in seconds in the workers.
+
+    capacity : int
+      The number of samples per channel of the shared memory ring of
+      each task. It should cover several reads of the supervisor. It
+      is also the maximal number of samples per channel buffered for
+      each task while waiting for the other tasks; older samples are
+      dropped.
+
+    max_restarts : int
+      The maximal number of restarts of each worker.
+
+    create_task : {callable, None}
+      Creates a task from a definition in a worker, by default
+      `nidaqmx.libnidaqmx.Task.from_config`. It must be picklable,
+      e.g. a module level function.
+
+    Attributes
+    ----------
+
+    names : list
+      The names of the tasks, the keys of the data returned by
+      `read`.
+    restarts : list
+      The number of restarts of each worker.
+    dropped : dict
+      The number of samples per channel dropped by task name because
+      the task was more than `capacity` samples ahead of the others.
+    """
+
+    def __init__(self, configs, samples_per_channel, groups=None, timeout=10.0,
+                 capacity=1 << 18, max_restarts=10, poll_interval=1e-3,
+                 create_task=None):
+        self.configs = list(configs)
+        self.samples_per_channel = samples_per_channel
+        self.groups = groups
+        self.timeout = timeout
+        self.capacity = capacity
+        self.max_restarts = max_restarts
+        self.poll_interval = poll_interval
+        self.create_task = create_task or Task.from_config
+        self.names = [config.get('name') or 'task%s' % (i)
+                      for i, config in enumerate(self.configs)]
+        if len(set(self.names)) != len(self.names):
+            raise ValueError('Expected unique task names but got %s' % (self.names,))
+        self._workers = []
+
+    def start(self):
+        """
+        Starts the worker processes.
+        """
+        if self.groups is None:
+            self.groups = group_by_device(self.configs)
+        self._directory = tempfile.mkdtemp(prefix='nidaqmx-supervisor-')
+        self._streams = [_Stream(name, os.path.join(self._directory, '%s.sock' % (i)))
+                         for i, name in enumerate(self.names)]
+        self._workers = [None] * len(self.groups)
+        self._controls = [None] * len(self.groups)
+        self.restarts = [0] * len(self.groups)
+        self.dropped = dict((name, 0) for name in self.names)
+        # The merged index of the next sample returned by read.
+        self.index = 0
+        for i in range(len(self.groups)):
+            self._start_worker(i, 0)
+
+    def _start_worker(self, i, offset=None):
+        streams = [self._streams[j] for j in self.groups[i]]
+        for stream in streams:
+            if offset is None and stream.subscriber is not None:
+                # The exited worker could not remove its ring.
+                try:
+                    stream.subscriber.shm.unlink()
+                except (IOError, OSError):
+                    pass
+            stream.close()
+            stream.reset(offset)
+            if os.path.exists(stream.path):
+                os.unlink(stream.path)
+        # A pipe rather than a shared Event signals stopping, since a
+        # worker dying while waiting on an Event can deadlock setting it.
+        control, worker_control = multiprocessing.Pipe()
+        worker = multiprocessing.Process(
+            target=_run_worker, name='nidaqmx-supervisor-%s' % (i),
+            args=(self.create_task, [self.configs[j] for j in self.groups[i]],
+                  [s.path for s in streams], self.samples_per_channel, self.timeout,
+                  self.capacity, worker_control))
+        worker.daemon = True
+        worker.start()
+        worker_control.close()
+        if self._controls[i] is not None:
+            self._controls[i].close()
+        self._workers[i] = worker
+        self._controls[i] = control
+
+    def _check_workers(self):
+        for i, worker in enumerate(self._workers):
+            if worker.is_alive():
+                continue
+            if self.restarts[i] >= self.max_restarts:
+                raise RuntimeError('Worker %s of tasks %s exited with code %s, not restarting'
+                                   % (i, [self.names[j] for j in self.groups[i]],
+                                      worker.exitcode))
+            print('Worker %s exited with code %s, restarting' % (i, worker.exitcode),
+                  file=sys.stderr)
+            self.restarts[i] += 1
+            self._start_worker(i)
+
+    def _poll(self, stream):
+        if stream.subscriber is None:
+            if not os.path.exists(stream.path):
+                return
+            try:
+                stream.subscriber = Subscriber(stream.path, poll_interval=self.poll_interval,
+                                               latest=False)
+            except (socket.error, RuntimeError, EOFError):
+                return
+        try:
+            index, data = stream.subscriber.read(timeout=0)
+        except EOFError:
+            return
+        if not data.shape[0]:
+            return
+        if stream.offset is None:
+            # A restarted worker: align its first sample with the
+            # newest samples of the other tasks.
+            ends = [s.end for s in self._streams if s is not stream and s.chunks]
+            stream.offset = max(ends + [self.index]) - index
+        index += stream.offset
+        if stream.chunks and index != stream.end:
+            # Samples were skipped; keep only the samples after the gap.
+            stream.chunks = []
+        stream.chunks.append((index, data))
+        # Bound the memory use when the other tasks lag; read skips
+        # the dropped samples of all tasks.
+        self.dropped[stream.name] += stream.trim(self.capacity)
+
+    def read(self, max_samples=None, timeout=10.0):
+        """
+        Returns the next samples that all tasks have in common.
+
+        Parameters
+        ----------
+
+        max_samples : {int, None}
+          The maximal number of samples per channel to return.
+
+        timeout : float
+          The time in seconds to wait for samples.
+
+        Returns
+        -------
+
+        index : int
+          The merged sample index of the first returned sample. When
+          samples of a task were lost, e.g. during a worker restart,
+          the samples of all tasks in the gap are skipped.
+
+        data : {dict, None}
+          ``(samples, channels)`` arrays by task name, None on
+          timeout.
+
+        Raises
+        ------
+
+        RuntimeError
+          If a worker exited more than `max_restarts` times.
+        """
+        deadline = timer() + timeout
+        streams = self._streams
+        while True:
+            self._check_workers()
+            for stream in streams:
+                self._poll(stream)
+            if all(stream.chunks for stream in streams):
+                start = max([self.index] + [stream.start for stream in streams])
+                end = min(stream.end for stream in streams)
+                if max_samples is not None:
+                    end = min(end, start + max_samples)
+                if end > start:
+                    data = dict((stream.name, stream.take(start, end)) for stream in streams)
+                    self.index = end
+                    return start, data
+            if timer() >= deadline:
+                return self.index, None
+            time.sleep(self.poll_interval)
+
+    def stop(self, timeout=10.0):
+        """
+        Stops the workers, which clear their tasks.
+        """
+        for control in self._controls:
+            try:
+                control.send(None)
+            except (IOError, OSError):
+                pass # the worker has exited
+        for worker in self._workers:
+            worker.join(timeout)
+            if worker.is_alive():
+                worker.terminate()
+        for stream in self._streams:
+            stream.close()
+        for control in self._controls:
+            control.close()
+        self._workers = self._controls = []
+        shutil.rmtree(self._directory, ignore_errors=True)
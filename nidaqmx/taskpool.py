@@ -0,0 +1,182 @@
+"""
+Pool of configured tasks.
+
+Creating a task and its channels and verifying the configuration
+costs many driver calls, and tasks that are cleared from ``__del__``
+are released at unpredictable times. `TaskPool` keeps configured
+tasks in the committed or reserved state and hands them out again, so
+that repeated short measurements only start and stop tasks.
+
+.. autosummary::
+
+  TaskPool
+
+Example usage
+=============
+
+>>> from nidaqmx import AnalogInputTask
+>>> from nidaqmx.taskpool import TaskPool
+>>> task = AnalogInputTask()
+>>> task.create_voltage_channel('Dev1/ai0', min_val=-10, max_val=10)
+>>> task.configure_timing_sample_clock(rate=1e4, sample_mode='finite',
+...                                    samples_per_channel=1000)
+>>> config = task.to_config()
+>>> task.clear()
+>>> pool = TaskPool()
+>>> for i in range(1000):
+...     with pool.task(config) as task:
+...         task.start()
+...         data = task.read(1000)
+>>> pool.close()
+
+"""
+
+from __future__ import print_function, division, absolute_import
+
+import sys
+import json
+import threading
+import contextlib
+
+from .libnidaqmx import Task
+
+__all__ = ['TaskPool']
+
+class TaskPool(object):
+    """
+    Keeps configured tasks for reuse.
+
+    Tasks are identified by a task definition returned by
+    `nidaqmx.libnidaqmx.Task.to_config` or by a function without
+    arguments that creates and configures a task. Tasks are handed out
+    with `task` or `acquire` and returned with `release`.
+
+    Parameters
+    ----------
+
+    state : {'commit', 'reserve'}
+      The state that tasks are brought to when they are handed out,
+      see `nidaqmx.libnidaqmx.Task.alter_state`.
+
+    release_action : {'stop', 'unreserve'}
+      What to do with a returned task. ``'stop'`` keeps the hardware
+      programmed and reserved for the next use. ``'unreserve'`` frees
+      the hardware for other tasks; the next use commits the task
+      again, but still skips task and channel creation.
+
+    max_idle : int
+      The maximal number of idle tasks kept per definition. Tasks
+      returned beyond that are cleared.
+    """
+
+    def __init__(self, state='commit', release_action='stop', max_idle=4):
+        if state not in ['commit', 'reserve']:
+            raise ValueError('Expected state commit or reserve but got %r' % (state,))
+        if release_action not in ['stop', 'unreserve']:
+            raise ValueError('Expected release_action stop or unreserve but got %r'
+                             % (release_action,))
+        self.state = state
+        self.release_action = release_action
+        self.max_idle = max_idle
+        self._lock = threading.Lock()
+        self._idle = {}
+        self._keys = {}
+        self.created = 0
+        self.reused = 0
+
+    @staticmethod
+    def _key(config):
+        if callable(config):
+            return config
+        return json.dumps(config, sort_keys=True)
+
+    def acquire(self, config):
+        """
+        Returns a task for the definition `config`, reusing an idle
+        task when available. The task is in the state given by the
+        `state` parameter of the pool.
+        """
+        key = self._key(config)
+        with self._lock:
+            idle = self._idle.get(key)
+            task = idle.pop() if idle else None
+        if task is None:
+            if callable(config):
+                task = config()
+            else:
+                task = Task.from_config(config, commit=False)
+            self.created += 1
+        else:
+            self.reused += 1
+        try:
+            task.alter_state(self.state)
+        except RuntimeError:
+            self._discard(task)
+            raise
+        with self._lock:
+            self._keys[id(task)] = key
+        return task
+
+    def release(self, task):
+        """
+        Returns a task obtained from `acquire` to the pool.
+
+        The task is stopped (and unreserved if so configured). If that
+        fails or if the pool has enough idle tasks, the task is
+        cleared.
+        """
+        with self._lock:
+            key = self._keys.pop(id(task))
+        try:
+            task.stop()
+            if self.release_action == 'unreserve':
+                task.alter_state('unreserve')
+        except RuntimeError as msg:
+            print('Clearing task %s after failing to stop it: %s' % (task.name, msg),
+                  file=sys.stderr)
+            self._discard(task)
+            return
+        with self._lock:
+            idle = self._idle.setdefault(key, [])
+            if len(idle) < self.max_idle:
+                idle.append(task)
+                task = None
+        if task is not None:
+            self._discard(task)
+
+    @contextlib.contextmanager
+    def task(self, config):
+        """
+        Context manager that acquires a task for the definition
+        `config` and releases it on exit.
+        """
+        task = self.acquire(config)
+        try:
+            yield task
+        finally:
+            self.release(task)
+
+    @staticmethod
+    def _discard(task):
+        try:
+            task.clear()
+        except RuntimeError:
+            pass
+
+    def close(self):
+        """
+        Clears all idle tasks. Tasks that are in use are cleared when
+        they are released to a closed pool.
+        """
+        with self._lock:
+            tasks = [task for idle in self._idle.values() for task in idle]
+            self._idle.clear()
+            self.max_idle = 0
+        for task in tasks:
+            self._discard(task)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
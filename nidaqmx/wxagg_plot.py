@@ -2,7 +2,9 @@
 import os
 import sys
 import time
+import threading
 import traceback
+import numpy as np
 import matplotlib
 matplotlib.use('WXAgg')
 
@@ -119,9 +121,190 @@ class PlotFigure(wx.Frame):
         # this is supposed to prevent redraw flicker on some X servers...
         pass
 
-def animated_plot(func, timer_period):
+def envelope(xdata, ydata_list, pixels):
+    """ Decimate samples to a min/max envelope of ``pixels`` buckets.
+
+    Returns ``xdata`` and ``ydata_list`` unchanged when there are
+    fewer than two samples per bucket. Otherwise each bucket is
+    represented by two points, its minimum and maximum, so that the
+    plotted envelope looks the same as the plot of all samples.
+    """
+    n = ydata_list.shape[-1]
+    k = n // max(pixels, 1)
+    if k < 2:
+        return xdata, ydata_list
+    m = pixels * k
+    buckets = ydata_list[:, n-m:].reshape((ydata_list.shape[0], pixels, k))
+    yenv = np.empty((ydata_list.shape[0], 2*pixels), dtype=ydata_list.dtype)
+    buckets.min(axis=2, out=yenv[:, 0::2])
+    buckets.max(axis=2, out=yenv[:, 1::2])
+    xenv = np.repeat(xdata[n-m::k], 2)
+    return xenv, yenv
+
+class PlotRing(object):
+    """ Fixed-size ring buffer holding the plotted window of samples.
+    """
+
+    def __init__(self, nof_channels, size):
+        self.size = size
+        self.xdata = np.zeros(size, dtype=np.float64)
+        self.ydata = np.zeros((nof_channels, size), dtype=np.float64)
+        self.position = 0
+        self.count = 0
+        self.lock = threading.Lock()
+
+    def append(self, xdata, ydata_list):
+        n = len(xdata)
+        if n > self.size:
+            xdata, ydata_list = xdata[-self.size:], ydata_list[:, -self.size:]
+            n = self.size
+        with self.lock:
+            i = self.position
+            j = min(i + n, self.size)
+            self.xdata[i:j] = xdata[:j-i]
+            self.ydata[:, i:j] = ydata_list[:, :j-i]
+            if j - i < n:
+                self.xdata[:n-(j-i)] = xdata[j-i:]
+                self.ydata[:, :n-(j-i)] = ydata_list[:, j-i:]
+            self.position = (i + n) % self.size
+            self.count = min(self.count + n, self.size)
+
+    def get(self):
+        """ Return copies of the samples in acquisition order.
+        """
+        with self.lock:
+            i = self.position
+            if self.count < self.size:
+                return self.xdata[:i].copy(), self.ydata[:, :i].copy()
+            return (np.concatenate((self.xdata[i:], self.xdata[:i])),
+                    np.concatenate((self.ydata[:, i:], self.ydata[:, :i]), axis=1))
+
+class FastPlotFigure(PlotFigure):
+    """ Live plot that keeps up with high acquisition rates.
+
+    ``func`` is called repeatedly in a worker thread and the returned
+    samples are appended to a ring buffer of ``window`` samples per
+    channel. The GUI timer only decimates the ring buffer to a min/max
+    envelope of the axes width in pixels and blits the lines over a
+    cached background. The x axis shows seconds relative to the newest
+    sample, so that the background needs redrawing only when the y
+    range changes or the window is resized.
+
+    On close, ``stop()`` is called to interrupt a pending ``func``
+    call, for instance by stopping the task that ``func`` reads from,
+    and the frame waits for the worker to exit before it is destroyed.
+    """
+
+    def __init__(self, func, timer_period, window=None, stop=None):
+        self.window = window
+        self.stop = stop
+        self.ring = None
+        self.background = None
+        self.error = None
+        PlotFigure.__init__(self, func, timer_period)
+        self.canvas.mpl_connect('draw_event', self.OnDraw)
+        self.worker = threading.Thread(target=self.Acquire)
+        self.worker.daemon = True
+        self.worker.start()
+
+    def Acquire(self):
+        while not self.is_stopped:
+            try:
+                xdata, ydata_list, legend = self.func()
+            except Exception, msg:
+                if self.is_stopped:
+                    # func was interrupted by stop()
+                    return
+                self.error = msg
+                traceback.print_exc(file=sys.stderr)
+                return
+            if len (ydata_list.shape)==1:
+                ydata_list = ydata_list.reshape((1, ydata_list.size))
+            if self.ring is None:
+                size = self.window or 10*ydata_list.shape[-1]
+                self.legend = legend
+                self.ring = PlotRing(ydata_list.shape[0], size)
+            self.ring.append(xdata, ydata_list)
+
+    def OnClose(self, event):
+        self.is_stopped = True
+        self.timer.Stop()
+        if self.stop is not None:
+            try:
+                self.stop()
+            except RuntimeError:
+                traceback.print_exc(file=sys.stderr)
+        self.worker.join()
+        PlotFigure.OnClose(self, event)
+
+    def OnTimerWrap (self, evt):
+        # Acquisition runs in its own thread, so a slow draw only
+        # drops frames and must not slow down the timer.
+        if self.is_stopped:
+            return
+        try:
+            self.OnTimer (evt)
+        except KeyboardInterrupt:
+            self.OnClose(evt)
+
+    def OnDraw(self, event):
+        if self.plot is None:
+            return
+        self.background = self.canvas.copy_from_bbox(self.axes.bbox)
+        for line in self.plot:
+            self.axes.draw_artist(line)
+
+    def OnTimer(self, evt):
+        if self.error is not None:
+            self.OnClose(evt)
+            return
+        if self.ring is None:
+            return
+        xdata, ydata_list = self.ring.get()
+        if not len (xdata):
+            return
+        xdata = xdata - xdata[-1]
+        if self.plot is None:
+            self.axes = self.fig.add_axes([0.1,0.1,0.8,0.8])
+            self.plot = [self.axes.plot([], [], animated=True)[0] for ydata in ydata_list]
+            self.axes.set_xlabel('Seconds')
+            self.axes.set_ylabel('Volts')
+            self.axes.set_title('nof samples=%s' % (self.ring.size))
+            self.axes.legend (self.plot, self.legend)
+        pixels = int(self.axes.bbox.width)
+        xdata, ydata_list = envelope(xdata, ydata_list, pixels)
+        for line, data in zip (self.plot, ydata_list):
+            line.set_data(xdata, data)
+        ymin, ymax = ydata_list.min(), ydata_list.max()
+        xmin = min(xdata[0], -1e-9)
+        lo, hi = self.axes.get_ylim()
+        dy = (ymax-ymin)/20 or 1.0
+        if (self.background is None or ymin < lo or ymax > hi
+            or (hi - lo) > 4*(ymax - ymin + 2*dy)
+            or self.axes.get_xlim()[0] > xmin):
+            self.axes.set_xlim(xmin=xmin, xmax=0)
+            self.axes.set_ylim(ymin=ymin-dy, ymax=ymax+dy)
+            self.canvas.draw()
+            return
+        self.canvas.restore_region(self.background)
+        for line in self.plot:
+            self.axes.draw_artist(line)
+        self.canvas.blit(self.axes.bbox)
+
+def animated_plot(func, timer_period, fast=False, window=None, stop=None):
+    """ Show a live plot of the samples returned by ``func``.
+
+    ``func()`` must return ``(xdata, ydata_list, legend)``. When
+    ``fast`` is True, `FastPlotFigure` is used, ``window`` is the
+    number of samples per channel to display and ``stop()`` is called
+    on close to interrupt ``func``; ``func`` is no longer running when
+    this function returns.
+    """
     app = wx.PySimpleApp(clearSigInt=False)
-    frame = PlotFigure(func, timer_period)
+    if fast:
+        frame = FastPlotFigure(func, timer_period, window, stop)
+    else:
+        frame = PlotFigure(func, timer_period)
     frame.Show()
     app.MainLoop()
 
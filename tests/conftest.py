@@ -0,0 +1,16 @@
+"""
+Configuration of the tests of the hardware independent modules.
+
+The tests run without the NI-DAQmx library; tests of task methods
+replace the driver calls, see test_task_config.py.
+"""
+
+import os
+import sys
+
+root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if root not in sys.path:
+    sys.path.insert(0, root)
+
+# Interactive scripts that need a device, run them manually.
+collect_ignore = ['test_ContAcq_IntClk.py', 'test_ContGen_IntClk.py']
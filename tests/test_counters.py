@@ -0,0 +1,100 @@
+import numpy as np
+import pytest
+
+from nidaqmx.counters import CounterUnwrapper, EncoderPipeline
+
+def counts_and_raw(dtype, bits=32, n=1000, seed=0):
+    # Monotonic counts starting just below a rollover and their raw
+    # register values.
+    rng = np.random.RandomState(seed)
+    counts = (1 << bits) - 500 + np.cumsum(rng.randint(0, 1 << (bits - 2), n))
+    raw = (counts & ((1 << bits) - 1)).astype(np.uint64).astype(dtype)
+    return counts, raw
+
+def test_uint32_wraps():
+    counts, raw = counts_and_raw(np.uint32)
+    result = CounterUnwrapper().update(raw)
+    assert result.dtype == np.int64
+    assert np.array_equal(result - result[0], counts - counts[0])
+
+def test_int32_wraps():
+    # Signed reads of a counter near 2**31 and 2**32.
+    raw = np.array([2**31 - 2, 2**31 - 1, 2**31, 2**31 + 1, 2**32 - 1, 0, 1],
+                   dtype=np.uint32).view(np.int32)
+    unwrapper = CounterUnwrapper()
+    result = unwrapper.update(raw)
+    assert np.array_equal(result, [2**31 - 2, 2**31 - 1, 2**31, 2**31 + 1,
+                                   2**32 - 1, 2**32, 2**32 + 1])
+    assert unwrapper.rollovers == 1
+
+def test_chunk_split_invariance():
+    counts, raw = counts_and_raw(np.int32, n=997)
+    whole = CounterUnwrapper().update(raw)
+    unwrapper = CounterUnwrapper()
+    parts = [unwrapper.update(raw[i:i + 100]).copy() for i in range(0, raw.size, 100)]
+    assert np.array_equal(np.concatenate(parts), whole)
+    assert unwrapper.last == whole[-1]
+
+def test_bidirectional():
+    counts = np.array([5, 2, -3, -10, -4, 3, 20])
+    raw = (counts % (1 << 24)).astype(np.uint32)
+    result = CounterUnwrapper(bits=24, bidirectional=True).update(raw)
+    assert np.array_equal(result - result[0], counts - counts[0])
+
+def test_out():
+    raw = np.arange(10, dtype=np.uint32)
+    out = np.zeros(20, dtype=np.int64)
+    result = CounterUnwrapper().update(raw, out=out)
+    assert np.array_equal(out[:10], np.arange(10))
+    assert np.shares_memory(result, out)
+
+def positions(n=1000, seed=0):
+    rng = np.random.RandomState(seed)
+    return 5.0 + np.cumsum(rng.normal(0.1, 1.0, n))
+
+def encoder_reference(x, rate, window):
+    # Boxcar averages of sample-to-sample differences, starting at rest.
+    boxcar = np.ones(window) * rate / window
+    velocity = np.convolve(np.diff(x, prepend=x[0]), boxcar)[:x.size]
+    acceleration = np.convolve(np.diff(velocity, prepend=0.0), boxcar)[:x.size]
+    return x, velocity, acceleration
+
+@pytest.mark.parametrize('window', [1, 4, 25])
+def test_encoder_matches_reference(window):
+    x = positions()
+    result = EncoderPipeline(1000.0, window=window).process(x)
+    for row, expected in zip(result, encoder_reference(x, 1000.0, window)):
+        assert np.allclose(row, expected)
+
+@pytest.mark.parametrize('window', [1, 7])
+def test_encoder_chunk_split_invariance(window):
+    x = positions()
+    expected = encoder_reference(x, 50.0, window)
+    pipeline = EncoderPipeline(50.0, window=window)
+    bounds = np.cumsum([0, 1, 3, 0, 6, 100, 290, 600])
+    parts = [[row.copy() for row in pipeline.process(x[start:end])]
+             for start, end in zip(bounds[:-1], bounds[1:])]
+    for i in range(3):
+        assert np.allclose(np.concatenate([part[i] for part in parts]), expected[i])
+
+def test_encoder_reset():
+    x = positions()
+    pipeline = EncoderPipeline(100.0, window=3)
+    pipeline.process(x[:500])
+    result = pipeline.process(x[500:])
+    assert not np.allclose(result[1], encoder_reference(x[500:], 100.0, 3)[1])
+    pipeline.reset()
+    result = pipeline.process(x[500:])
+    for row, expected in zip(result, encoder_reference(x[500:], 100.0, 3)):
+        assert np.allclose(row, expected)
+
+def test_encoder_out():
+    x = positions(100)
+    out = np.zeros((3, 150))
+    position, velocity, acceleration = EncoderPipeline(10.0, window=2).process(x, out=out)
+    assert np.shares_memory(velocity, out)
+    expected = encoder_reference(x, 10.0, 2)
+    assert np.allclose(out[:, :100], expected)
+    assert not out[:, 100:].any()
+    with pytest.raises(ValueError):
+        EncoderPipeline(10.0, window=0)
@@ -0,0 +1,82 @@
+import numpy as np
+
+from nidaqmx.decoders import UARTDecoder, SPIDecoder, I2CDecoder
+
+def decode_in_chunks(decoder, words, size):
+    decoder.reset()
+    return np.concatenate([decoder.decode(words[i:i + size])
+                           for i in range(0, words.size, size)])
+
+def check_chunk_split_invariance(decoder, words):
+    whole = decode_in_chunks(decoder, words, words.size)
+    for size in [1, 7, 64, 1000]:
+        assert np.array_equal(decode_in_chunks(decoder, words, size), whole)
+    return whole
+
+def uart_samples(values, samples_per_bit=10, parity=None, line=2):
+    levels = [1] * 25
+    for i, value in enumerate(values):
+        bits = [(value >> k) & 1 for k in range(8)]
+        if parity is not None:
+            bits.append((sum(bits) + (parity == 'odd')) % 2)
+        for bit in [0] + bits + [1]:
+            levels += [bit] * samples_per_bit
+        levels += [1] * (i % 3) * samples_per_bit # idle gaps
+    return np.array(levels, dtype=np.uint32) << line
+
+def test_uart():
+    values = [0x55, 0x00, 0xff, 0x41, 0x80, 0x01]
+    words = uart_samples(values, parity='even')
+    frames = check_chunk_split_invariance(UARTDecoder(10, 1, line=2, parity='even'), words)
+    assert list(frames['data']) == values
+    assert not frames['parity_error'].any()
+    assert not frames['framing_error'].any()
+    assert list(words[frames['index']] >> 2) == [0] * len(values)
+
+def test_uart_parity_error():
+    frames = UARTDecoder(10, 1, line=2, parity='odd').decode(uart_samples([3], parity='even'))
+    assert list(frames['parity_error']) == [True]
+
+def spi_samples(words_mosi, words_miso, bits=8):
+    # lines: sclk 0, mosi 1, miso 2, cs 3; mode 0, MSB first
+    samples = [8] * 5
+    for mosi, miso in zip(words_mosi, words_miso):
+        for k in range(bits - 1, -1, -1):
+            data = (((mosi >> k) & 1) << 1) | (((miso >> k) & 1) << 2)
+            samples += [data] * 2 + [data | 1] * 2
+        samples += [0] * 2 + [8] * 3 # deassert chip select between words
+    return np.array(samples, dtype=np.uint32)
+
+def test_spi():
+    mosi, miso = [0xa5, 0x3c, 0xff, 0x00], [0x01, 0x80, 0x7e, 0x55]
+    words = spi_samples(mosi, miso)
+    frames = check_chunk_split_invariance(SPIDecoder(0, mosi=1, miso=2, cs=3), words)
+    assert list(frames['mosi']) == mosi
+    assert list(frames['miso']) == miso
+
+def test_spi_line_per_byte():
+    words = spi_samples([0x12], [0x34])
+    lines = ((words[:, None] >> np.arange(4)) & 1).astype(np.uint8)
+    frames = SPIDecoder(0, mosi=1, miso=2, cs=3).decode(lines)
+    assert list(frames['mosi']) == [0x12]
+    assert list(frames['miso']) == [0x34]
+
+def i2c_samples(transfers):
+    # lines: scl 0, sda 1; a transfer is a list of (byte, ack)
+    levels = [(1, 1)] * 4
+    for transfer in transfers:
+        levels += [(1, 0)] * 2 # START
+        for byte, ack in transfer:
+            for bit in [(byte >> k) & 1 for k in range(7, -1, -1)] + [0 if ack else 1]:
+                levels += [(0, bit)] * 2 + [(1, bit)] * 2
+        levels += [(0, 0)] * 2 + [(1, 0)] * 2 + [(1, 1)] * 3 # STOP
+    return np.array([scl | (sda << 1) for scl, sda in levels], dtype=np.uint32)
+
+def test_i2c():
+    transfers = [[(0xa0, True), (0x12, True), (0x34, False)], [(0xa1, True), (0xff, False)]]
+    words = i2c_samples(transfers)
+    frames = check_chunk_split_invariance(I2CDecoder(0, 1), words)
+    expected = [byte for transfer in transfers for byte in transfer]
+    assert list(frames['data']) == [byte for byte, ack in expected]
+    assert list(frames['ack']) == [ack for byte, ack in expected]
+    assert list(frames['start']) == [True, False, False, True, False]
@@ -0,0 +1,80 @@
+import numpy as np
+
+from nidaqmx.digital import ChangeDetectionReader, extract_edges, pack_lines
+
+def random_words(n=500, lines=8, seed=0):
+    rng = np.random.RandomState(seed)
+    # mostly unchanged samples with a few flipped lines
+    flips = (rng.rand(n, lines) < 0.1).astype(np.uint32) << np.arange(lines, dtype=np.uint32)
+    return np.bitwise_xor.accumulate(np.bitwise_or.reduce(flips, axis=1)).astype(np.uint32)
+
+def naive_edges(words, times, previous):
+    result = []
+    before = words[0] if previous is None else previous
+    for word, time in zip(words, times):
+        for line in range(32):
+            old, new = (int(before) >> line) & 1, (int(word) >> line) & 1
+            if old != new:
+                result.append((line, new - old, time))
+        before = word
+    return result
+
+def test_pack_lines():
+    data = np.array([[1, 0, 1], [0, 0, 0], [1, 1, 1]], dtype=np.uint8)
+    assert list(pack_lines(data)) == [5, 0, 7]
+    assert list(pack_lines(data[:, 0])) == [1, 0, 1]
+
+def test_extract_edges():
+    words = random_words()
+    times = np.arange(words.size) * 0.5
+    edges = extract_edges(words, times, previous=0)
+    expected = naive_edges(words, times, 0)
+    assert [(int(e['line']), int(e['direction']), float(e['time'])) for e in edges] == expected
+
+def test_extract_edges_mask():
+    words = np.array([0, 1, 3, 2], dtype=np.uint32)
+    edges = extract_edges(words, np.arange(4), mask=2)
+    assert list(edges['line']) == [1]
+    assert list(edges['direction']) == [1]
+    assert list(edges['time']) == [2]
+
+def test_extract_edges_chunk_split_invariance():
+    words = random_words()
+    times = np.arange(words.size, dtype=np.float64)
+    whole = extract_edges(words, times)
+    parts, previous = [], None
+    for i in range(0, words.size, 37):
+        parts.append(extract_edges(words[i:i + 37], times[i:i + 37], previous=previous))
+        previous = int(words[min(i + 37, words.size) - 1])
+    assert np.array_equal(np.concatenate(parts), whole)
+
+class ChunkedTask(object):
+
+    def __init__(self, data):
+        self.data = data
+        self.position = 0
+
+    def _next(self, n):
+        chunk = self.data[self.position:self.position + n]
+        self.position += n
+        return chunk
+
+    def read_packed(self, samples_per_channel, timeout=10.0):
+        return self._next(samples_per_channel)
+
+    def read(self, samples_per_channel, timeout=10.0):
+        return self._next(samples_per_channel)
+
+def test_change_detection_reader():
+    words = random_words()
+    # two ports of the same lines OR-ed together, timestamps wrapping
+    data = np.column_stack([words & 0x0f, words & 0xf0])
+    ticks = (np.cumsum(np.full(words.size, 1 << 26, dtype=np.int64))
+             & 0xffffffff).astype(np.uint32)
+    reader = ChangeDetectionReader(ChunkedTask(data), ChunkedTask(ticks), timebase_rate=1e8)
+    results = [reader.read(100) for i in range(5)]
+    assert np.array_equal(np.concatenate([r[0] for r in results]), words)
+    times = np.concatenate([r[1] for r in results])
+    assert np.allclose(np.diff(times), (1 << 26) / 1e8)
+    edges = np.concatenate([r[2] for r in results])
+    assert np.array_equal(edges, extract_edges(words, times))
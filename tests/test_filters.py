@@ -0,0 +1,63 @@
+import numpy as np
+import pytest
+
+from nidaqmx.filters import FIRDecimator, lowpass
+
+def signal(n=2000, channels=3, seed=0):
+    return np.random.RandomState(seed).normal(size=(n, channels))
+
+def reference(x, taps, factor):
+    # The stream is preceded by zeros and the first output is at the
+    # first sample.
+    return np.column_stack([np.convolve(x[:, c], taps)[:x.shape[0]:factor]
+                            for c in range(x.shape[1])])
+
+@pytest.mark.parametrize('factor', [1, 3, 10])
+def test_matches_convolve(factor):
+    x = signal()
+    decimator = FIRDecimator(factor)
+    assert np.allclose(decimator.process(x), reference(x, decimator.taps, factor))
+
+@pytest.mark.parametrize('sizes', [[1] * 50, [7, 0, 13, 1, 99], [333, 667, 1000]])
+def test_chunk_split_invariance(sizes):
+    x = signal()
+    decimator = FIRDecimator(7, taps=np.arange(1.0, 30.0))
+    bounds = np.cumsum([0] + sizes)
+    bounds[-1] = x.shape[0]
+    result = np.concatenate([decimator.process(x[start:end]).copy()
+                             for start, end in zip(bounds[:-1], bounds[1:])])
+    assert np.allclose(result, reference(x, decimator.taps, 7))
+
+def test_group_by_channel_and_single_channel():
+    x = signal()
+    expected = reference(x, lowpass(41, 0.1), 4)
+    decimator = FIRDecimator(4, taps=lowpass(41, 0.1), fill_mode='group_by_channel')
+    assert np.allclose(decimator.process(x.T), expected.T)
+    single = FIRDecimator(4, taps=lowpass(41, 0.1))
+    assert np.allclose(single.process(x[:, 0]), expected[:, 0])
+
+def test_out():
+    x = signal()
+    expected = reference(x, lowpass(41, 0.1), 4)
+    decimator = FIRDecimator(4, taps=lowpass(41, 0.1), fill_mode='group_by_channel')
+    out = np.zeros((6, 1000))
+    result = decimator.process(x.T, out=out[::2])
+    assert np.shares_memory(result, out)
+    assert np.allclose(out[::2, :500], expected.T)
+    decimator = FIRDecimator(4, taps=lowpass(41, 0.1))
+    out = np.zeros((1000, 6))
+    decimator.process(x, out=out[:, ::2])
+    assert np.allclose(out[:500, ::2], expected)
+
+@pytest.mark.parametrize('out', [np.zeros((499, 3)), np.zeros((500, 2)),
+                                 np.zeros(1500), np.zeros((500, 3), dtype=np.float32)])
+def test_bad_out(out):
+    with pytest.raises(ValueError):
+        FIRDecimator(4).process(signal(), out=out)
+
+def test_lowpass():
+    taps = lowpass(101, 0.05)
+    assert np.isclose(taps.sum(), 1)
+    assert np.allclose(taps, taps[::-1])
+    with pytest.raises(ValueError):
+        lowpass(101, 0.5)
@@ -0,0 +1,102 @@
+import os
+import ctypes
+
+import pytest
+
+from nidaqmx import libnidaqmx
+from nidaqmx.inventory import DeviceInventory
+
+class FakeLibrary(object):
+    """
+    Stands in for the driver library with one device, Dev1, whose
+    serial number and analog input channels are given by `device`.
+    Other string properties are empty and other numbers zero.
+    """
+
+    def __init__(self):
+        self.device = dict(serial=1, channels='Dev1/ai0')
+        self.calls = []
+
+    # The functions returning numbers through their last argument.
+    numbers = ['DAQmxGetSysNIDAQMajorVersion', 'DAQmxGetSysNIDAQMinorVersion',
+               'DAQmxGetDevSerialNum', 'DAQmxGetDevProductNum', 'DAQmxGetDevBusType']
+
+    def _string(self, name):
+        if name == 'DAQmxGetSysDevNames':
+            return 'Dev1'
+        if name == 'DAQmxGetDevAIPhysicalChans':
+            return self.device['channels']
+        return ''
+
+    def __getattr__(self, name):
+        def func(*args):
+            self.calls.append(name)
+            if name in self.numbers:
+                if name == 'DAQmxGetDevSerialNum':
+                    args[-1]._obj.value = self.device['serial']
+                return 0
+            value = self._string(name).encode('ascii')
+            if args[-2] is None:
+                return len(value) + 1 if value else 0
+            args[-2]._obj.value = value
+            return 0
+        return func
+
+@pytest.fixture
+def library(monkeypatch):
+    library = FakeLibrary()
+    monkeypatch.setattr(libnidaqmx, 'libnidaqmx', library)
+    class DAQmx(object):
+        # The constants of the missing header.
+        Val_Unknown, Val_PCI, Val_PCIe, Val_PXI, Val_SCXI, Val_PCCard, Val_USB = range(7)
+    monkeypatch.setattr(libnidaqmx, 'DAQmx', DAQmx)
+    monkeypatch.setattr(libnidaqmx, 'error_map', {})
+    libnidaqmx.clear_string_property_cache()
+    yield library
+    libnidaqmx.clear_string_property_cache()
+
+def test_cached_records(library, tmpdir):
+    path = os.path.join(str(tmpdir), 'inventory.json')
+    record, = DeviceInventory(path).devices()
+    assert record['name'] == 'Dev1' and record['serial_number'] == 1
+    assert record['analog_input_channels'] == ['Dev1/ai0']
+    del library.calls[:]
+    assert DeviceInventory(path).devices() == [record]
+    assert 'DAQmxGetDevAIPhysicalChans' not in library.calls
+
+def test_replaced_device_is_queried_again(library, tmpdir):
+    inventory = DeviceInventory(os.path.join(str(tmpdir), 'inventory.json'))
+    assert inventory.devices()[0]['analog_input_channels'] == ['Dev1/ai0']
+    # Another device is named Dev1 in MAX while the process runs.
+    library.device = dict(serial=2, channels='Dev1/ai0, Dev1/ai1')
+    record, = inventory.devices()
+    assert record['serial_number'] == 2
+    assert record['analog_input_channels'] == ['Dev1/ai0', 'Dev1/ai1']
+
+def test_clear_device_cache(library):
+    device = libnidaqmx.Device('Dev1')
+    assert device.get_analog_input_channels() == ['Dev1/ai0']
+    library.device['channels'] = 'Dev1/ai1'
+    assert device.get_analog_input_channels() == ['Dev1/ai0']
+    libnidaqmx.clear_string_property_cache('Dev2')
+    assert device.get_analog_input_channels() == ['Dev1/ai0']
+    libnidaqmx.clear_string_property_cache('Dev1')
+    assert device.get_analog_input_channels() == ['Dev1/ai1']
+
+@pytest.mark.parametrize('processes', [None, 1])
+def test_system_snapshot(library, processes):
+    library.device['channels'] = 'Dev1/ai0, Dev1/ai1'
+    snapshot = libnidaqmx.System().snapshot(processes=processes)
+    device = snapshot['Dev1']
+    assert snapshot.devices == (device,)
+    assert device.serial_number == 1
+    assert device.analog_input_channels == ('Dev1/ai0', 'Dev1/ai1')
+    assert device.analog_input_channels_pattern == libnidaqmx.make_pattern(
+        ['Dev1/ai0', 'Dev1/ai1'])
+    assert device.analog_output_channels == ()
+    assert device.as_dict()['analog_input_channels'] == ['Dev1/ai0', 'Dev1/ai1']
+    assert snapshot.collect('analog_input_channels') == ['Dev1/ai0', 'Dev1/ai1']
+    with pytest.raises(KeyError):
+        snapshot['Dev2']
+    with pytest.raises(AttributeError):
+        device.serial_number = 2
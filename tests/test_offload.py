@@ -0,0 +1,150 @@
+import os
+import time
+import threading
+
+import numpy as np
+import pytest
+
+try:
+    from multiprocessing import shared_memory
+except ImportError: # Python < 3.8
+    pytest.skip('multiprocessing.shared_memory is not available', allow_module_level=True)
+
+from nidaqmx.offload import OffloadPool, SharedRing
+
+@pytest.fixture
+def ring():
+    ring = SharedRing(640)
+    yield ring
+    ring.close()
+
+def test_wrap_around(ring):
+    assert ring.allocate(0, 200) == 0 # 256 bytes when aligned
+    assert ring.allocate(1, 200) == 256
+    assert ring.allocate(2, 200) is None # 128 bytes left at the end
+    ring.release(0)
+    assert ring.allocate(2, 200) == 0 # wraps around
+    assert ring.allocate(3, 1) is None # the head reached the tail
+    ring.release(1)
+    assert ring.allocate(3, 100) == 256
+    assert ring.allocate(4, 256) == 384
+    ring.release(2)
+    ring.release(3)
+    ring.release(4)
+    assert ring.allocate(5, 640) == 0
+    assert ring.allocate(6, 1) is None
+
+def test_release_out_of_order(ring):
+    for seq in range(5):
+        assert ring.allocate(seq, 128) == seq * 128
+    ring.release(1)
+    ring.release(2)
+    assert ring.allocate(5, 64) is None # chunk 0 is still in use
+    ring.release(0)
+    assert ring.allocate(5, 256) == 0
+    assert ring.allocate(6, 192) is None # 128 bytes up to chunk 3
+    ring.release(4)
+    ring.release(3)
+    assert ring.allocate(6, 384) == 256
+
+def test_view(ring):
+    offset = ring.allocate(0, 80)
+    ring.view(offset, (10,), np.float64)[:] = np.arange(10)
+    other = SharedRing(name=ring.name)
+    try:
+        assert np.array_equal(other.view(offset, (5, 2), np.float64),
+                              np.arange(10).reshape((5, 2)))
+    finally:
+        other.close()
+
+def column_sums(chunk):
+    if chunk[0, 0] < 0:
+        raise ValueError('negative')
+    if chunk[0, 0] == 1000:
+        os._exit(1)
+    if chunk[0, 0] == 2000:
+        return threading.Lock() # cannot be pickled
+    return chunk.sum(axis=0)
+
+def collect(pool, count, timeout=10.0):
+    results = []
+    deadline = time.time() + timeout
+    while len(results) < count and time.time() < deadline:
+        results.extend(pool.get_results(timeout=0.1))
+    return sorted(results, key=lambda r: r[0])
+
+def test_pool():
+    pool = OffloadPool(column_sums, processes=2, ring_size=1 << 16)
+    pool.start()
+    try:
+        chunks = [np.full((100, 3), i, dtype=np.float64) for i in range(10)]
+        seqs = [pool.submit(chunk) for chunk in chunks]
+        assert seqs == list(range(10))
+        results = collect(pool, 10)
+    finally:
+        pool.close()
+    assert [seq for seq, result in results] == seqs
+    for (seq, result), chunk in zip(results, chunks):
+        assert np.array_equal(result, chunk.sum(axis=0))
+    assert (pool.submitted, pool.completed, pool.dropped, pool.errors) == (10, 10, 0, 0)
+
+def test_pool_drops_and_errors():
+    # The ring holds a single 8000 byte chunk.
+    pool = OffloadPool(column_sums, processes=1, ring_size=8192)
+    pool.start()
+    try:
+        assert pool.submit(-np.ones((1000, 1))) == 0
+        assert pool.submit(np.ones((1000, 1))) is None
+        deadline = time.time() + 10.0
+        while pool.completed < 1 and time.time() < deadline:
+            time.sleep(1e-3)
+        assert pool.submit(np.ones((1000, 1))) == 2
+        results = collect(pool, 1)
+    finally:
+        pool.close()
+    assert [seq for seq, result in results] == [2]
+    assert (pool.submitted, pool.completed, pool.dropped, pool.errors) == (2, 2, 1, 1)
+
+def wait_for(condition, timeout=10.0):
+    deadline = time.time() + timeout
+    while not condition():
+        assert time.time() < deadline
+        time.sleep(1e-3)
+
+def test_pool_restarts_exited_worker():
+    pool = OffloadPool(column_sums, processes=2, ring_size=8192, max_pending=2)
+    pool.start()
+    try:
+        assert pool.submit(np.full((10, 1), 1000.0)) == 0
+        wait_for(lambda: pool.restarts == 1)
+        assert pool.lost == 1
+        # The region of the lost chunk was released.
+        for i in range(5):
+            chunk = np.full((1000, 1), float(i))
+            assert pool.submit(chunk) is not None
+            wait_for(lambda: pool.completed == i + 1)
+        results = collect(pool, 5)
+    finally:
+        pool.close()
+    assert [result[0] for seq, result in results] == [1000.0 * i for i in range(5)]
+    assert (pool.submitted, pool.completed, pool.errors) == (6, 5, 0)
+
+def test_pool_unpicklable_result_and_callback_error():
+    results = []
+    def callback(seq, result):
+        if seq == 1:
+            raise RuntimeError('callback')
+        results.append(seq)
+    pool = OffloadPool(column_sums, processes=1, ring_size=8192, callback=callback)
+    pool.start()
+    try:
+        assert pool.submit(np.full((1000, 1), 2000.0)) == 0
+        assert pool.submit(np.ones((10, 1))) == 1
+        wait_for(lambda: pool.completed == 2)
+        # Both regions were released and the collector still runs.
+        assert pool.submit(np.ones((1000, 1))) == 2
+        wait_for(lambda: pool.completed == 3)
+    finally:
+        pool.close()
+    assert results == [2]
+    assert (pool.completed, pool.errors, pool.lost, pool.dropped) == (3, 2, 0, 0)
@@ -0,0 +1,116 @@
+import time
+
+import numpy as np
+import pytest
+
+from nidaqmx.filters import FIRDecimator
+from nidaqmx.pipeline import (Pipeline, Stage, ScaleStage, DecimateStage,
+                              FunctionStage, RingSink, CallbackSink)
+
+class ListSource(object):
+    """
+    Returns the given chunks, then empty chunks.
+    """
+
+    def __init__(self, chunks):
+        self.chunks = list(chunks)
+        self.started = self.stopped = False
+
+    def start(self):
+        self.started = True
+
+    def stop(self):
+        self.stopped = True
+
+    def read(self):
+        if self.chunks:
+            return self.chunks.pop(0)
+        time.sleep(1e-3)
+        return np.empty((0, 2))
+
+class Collect(object):
+
+    def __init__(self):
+        self.chunks = []
+        self.closed = False
+
+    def write(self, chunk):
+        self.chunks.append(chunk)
+
+    def close(self):
+        self.closed = True
+
+def run(pipeline, samples, sink, timeout=10.0):
+    pipeline.start()
+    deadline = time.time() + timeout
+    while sum(c.shape[0] for c in sink.chunks) < samples and pipeline.error is None:
+        assert time.time() < deadline
+        time.sleep(1e-3)
+    pipeline.stop()
+
+def make_chunks(n=20, size=100):
+    data = np.random.RandomState(0).normal(size=(n * size, 2))
+    return data, [data[i:i + size].copy() for i in range(0, n * size, size)]
+
+def test_stages_and_sinks():
+    data, chunks = make_chunks()
+    source = ListSource(chunks)
+    collect, ring = Collect(), RingSink(150)
+    pipeline = Pipeline(source, [ScaleStage(2.0, 1.0), FunctionStage(np.negative)],
+                        [collect, ring], queue_size=2)
+    run(pipeline, data.shape[0], collect)
+    assert pipeline.error is None
+    assert source.started and source.stopped and collect.closed
+    assert np.allclose(np.concatenate(collect.chunks), -(2 * data + 1))
+    assert np.allclose(ring.get(), -(2 * data[-150:] + 1))
+    counters = dict(pipeline.get_counters())
+    assert list(counters) == ['source', '0:ScaleStage', '1:FunctionStage(negative)', 'sinks']
+    for name, c in counters.items():
+        assert c['samples'] == data.shape[0]
+        assert c['chunks'] >= len(chunks)
+
+def test_decimate_stage():
+    data, chunks = make_chunks()
+    collect = Collect()
+    decimator = FIRDecimator(10)
+    expected = FIRDecimator(10).process(data)
+    pipeline = Pipeline(ListSource(chunks), [DecimateStage(decimator)], [collect])
+    run(pipeline, expected.shape[0], collect)
+    assert np.allclose(np.concatenate(collect.chunks), expected)
+
+class Failing(Stage):
+
+    def process(self, chunk):
+        raise ValueError('bad chunk')
+
+def test_error_stops_pipeline():
+    data, chunks = make_chunks()
+    collect = Collect()
+    pipeline = Pipeline(ListSource(chunks), [Failing()], [collect])
+    pipeline.start()
+    pipeline.wait(10.0)
+    assert isinstance(pipeline.error, ValueError)
+    assert not collect.chunks
+    pipeline.stop()
+    assert collect.closed
+
+def test_sink_error():
+    def fail(chunk):
+        raise RuntimeError('sink')
+    data, chunks = make_chunks()
+    pipeline = Pipeline(ListSource(chunks), [], [CallbackSink(fail)])
+    pipeline.start()
+    pipeline.wait(10.0)
+    assert isinstance(pipeline.error, RuntimeError)
+    pipeline.stop()
+
+@pytest.mark.parametrize('sizes', [[10, 20], [150], [7] * 30, [0, 3]])
+def test_ring_sink(sizes):
+    ring = RingSink(100)
+    assert ring.get() is None
+    data = np.arange(2.0 * sum(sizes)).reshape((-1, 2))
+    start = 0
+    for size in sizes:
+        ring.write(data[start:start + size])
+        start += size
+    assert np.array_equal(ring.get(), data[-100:])
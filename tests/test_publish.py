@@ -0,0 +1,154 @@
+import os
+import time
+
+import numpy as np
+import pytest
+
+try:
+    from multiprocessing import shared_memory
+except ImportError: # Python < 3.8
+    pytest.skip('multiprocessing.shared_memory is not available', allow_module_level=True)
+
+try:
+    import queue
+except ImportError: # Python 2
+    import Queue as queue
+
+from nidaqmx.publish import Publisher, Subscriber
+
+CHANNELS = 2
+
+def samples(start, stop):
+    # Channel c of sample i holds 10*i + c.
+    return np.arange(start, stop)[:, None] * 10.0 + np.arange(CHANNELS)
+
+class QueueSource(object):
+    """
+    Returns the chunks put into its queue, empty chunks while it is
+    empty.
+    """
+
+    def __init__(self):
+        self.queue = queue.Queue()
+        self.written = 0
+        self.stopped = False
+
+    def push(self, n):
+        self.queue.put(samples(self.written, self.written + n))
+        self.written += n
+
+    def start(self):
+        pass
+
+    def stop(self):
+        self.stopped = True
+
+    def read(self):
+        try:
+            return self.queue.get(timeout=1e-3)
+        except queue.Empty:
+            return np.empty((0, CHANNELS))
+
+@pytest.fixture
+def publisher(tmpdir):
+    source = QueueSource()
+    source.push(100)
+    publisher = Publisher(source, os.path.join(str(tmpdir), 'ai.sock'), capacity=256)
+    publisher.start()
+    yield publisher
+    if publisher._threads:
+        publisher.stop()
+
+def push(publisher, n, timeout=10.0):
+    publisher.source.push(n)
+    deadline = time.time() + timeout
+    while publisher.written < publisher.source.written:
+        assert time.time() < deadline
+        time.sleep(1e-3)
+
+def read_all(subscriber, count):
+    indices, chunks = [], []
+    while sum(c.shape[0] for c in chunks) < count:
+        index, data = subscriber.read(timeout=10.0)
+        assert data.shape[0]
+        indices.append(index)
+        chunks.append(data)
+    return indices, np.concatenate(chunks)
+
+def test_read(publisher):
+    subscriber = Subscriber(publisher.path)
+    assert subscriber.cursor == 100
+    push(publisher, 50)
+    push(publisher, 70)
+    indices, data = read_all(subscriber, 120)
+    assert indices[0] == 100
+    assert np.array_equal(data, samples(100, 220))
+    index, data = subscriber.read(timeout=0)
+    assert (index, data.shape) == (220, (0, CHANNELS))
+    subscriber.close()
+
+def test_decimation_and_max_samples(publisher):
+    subscriber = Subscriber(publisher.path, decimation=3)
+    assert subscriber.cursor == 102
+    push(publisher, 100)
+    index, data = subscriber.read(max_samples=10)
+    assert index == 102
+    assert np.array_equal(data, samples(102, 132)[::3])
+    index, data = subscriber.read()
+    assert index == 132
+    assert np.array_equal(data, samples(132, 200)[::3])
+    subscriber.set_decimation(5)
+    assert subscriber.cursor == 205
+    push(publisher, 20)
+    index, data = subscriber.read()
+    assert np.array_equal(data, samples(205, 220)[::5])
+    assert publisher.get_subscribers()[0]['decimation'] == 5
+    subscriber.close()
+
+def test_oldest(publisher):
+    push(publisher, 300)
+    subscriber = Subscriber(publisher.path, latest=False)
+    assert subscriber.cursor == 400 - 128
+    index, data = subscriber.read()
+    assert index == 272
+    assert np.array_equal(data, samples(272, 400))
+    subscriber.close()
+
+def test_slow_subscriber_skips(publisher):
+    subscriber = Subscriber(publisher.path)
+    push(publisher, 200)
+    assert publisher.slow_events == 0
+    push(publisher, 200)
+    info, = publisher.get_subscribers()
+    assert info['lag'] == 400 and info['slow']
+    assert publisher.slow_events == 1
+    index, data = subscriber.read()
+    # Skipped ahead to the newer half of the ring.
+    assert index == 500 - 128
+    assert subscriber.skipped == index - 100
+    assert np.array_equal(data, samples(index, 500))
+    push(publisher, 10)
+    info, = publisher.get_subscribers()
+    assert info['lag'] == 10 and not info['slow'] and info['skipped'] == subscriber.skipped
+    subscriber.close()
+
+def test_eof_after_stop(publisher):
+    subscriber = Subscriber(publisher.path)
+    push(publisher, 30)
+    publisher.stop()
+    assert publisher.source.stopped
+    assert not os.path.exists(publisher.path)
+    index, data = subscriber.read()
+    assert np.array_equal(data, samples(100, 130))
+    with pytest.raises(EOFError):
+        subscriber.read()
+    subscriber.close()
+
+def test_unsubscribe_frees_slot(publisher):
+    subscriber = Subscriber(publisher.path)
+    assert len(publisher.get_subscribers()) == 1
+    subscriber.close()
+    deadline = time.time() + 10.0
+    while publisher.get_subscribers():
+        assert time.time() < deadline
+        time.sleep(1e-3)
@@ -0,0 +1,112 @@
+import os
+import ctypes
+
+import numpy as np
+import pytest
+
+from nidaqmx import libnidaqmx, records
+
+def random_records(count=20, samples=50, channels=3, seed=0):
+    rng = np.random.RandomState(seed)
+    return rng.normal(1.0, 2.0, size=(count, samples, channels))
+
+def test_averager_mean_and_variance():
+    data = random_records()
+    averager = records.RecordAverager(50, 3, variance=True)
+    for record in data:
+        averager.record[:] = record
+        averager.add()
+    assert averager.count == len(data)
+    assert np.allclose(averager.mean, data.mean(axis=0))
+    assert np.allclose(averager.get_variance(), data.var(axis=0, ddof=1))
+    out = np.empty((50, 3))
+    assert averager.get_variance(out, ddof=0) is out
+    assert np.allclose(out, data.var(axis=0))
+
+def test_averager_reset():
+    data = random_records()
+    averager = records.RecordAverager(50, 3)
+    for record in data:
+        averager.add(record)
+    averager.reset()
+    for record in data[:5]:
+        averager.add(record)
+    assert averager.count == 5
+    assert np.allclose(averager.mean, data[:5].mean(axis=0))
+    with pytest.raises(ValueError):
+        averager.get_variance()
+
+def test_segment_store_full():
+    store = records.SegmentStore(3, 10, 2)
+    for i in range(3):
+        assert store.next_slot() == i
+        store.count += 1
+    assert store.full
+    with pytest.raises(IndexError):
+        store.next_slot()
+
+def test_segment_store_overwrite():
+    store = records.SegmentStore(3, 10, 2, overwrite=True)
+    slots = []
+    for i in range(7):
+        slots.append(store.next_slot())
+        store.count += 1
+    assert slots == [0, 1, 2, 0, 1, 2, 0]
+    assert not store.full
+
+def test_segment_store_memmap(tmpdir):
+    filename = os.path.join(str(tmpdir), 'segments.f64')
+    store = records.SegmentStore(4, 10, 2, filename=filename)
+    store.data[1] = 7.5
+    store.index[1]['trigger_index'] = 10
+    store.flush()
+    data = np.memmap(filename, dtype=np.float64, mode='r', shape=(4, 10, 2))
+    index = np.memmap(filename + '.index', dtype=records.segment_dtype, mode='r', shape=(4,))
+    assert (data[1] == 7.5).all()
+    assert index[1]['trigger_index'] == 10
+
+@pytest.fixture
+def reading_driver(monkeypatch):
+    """
+    Replaces the driver calls of an analog input task with two
+    channels. A read fills the buffer with 0, 1, 2, ... and reports
+    `driver.available` samples per channel (all by default).
+    """
+    def call(name, *args):
+        if name == 'GetTaskNumChans':
+            args[1]._obj.value = 2
+        elif name == 'ReadAnalogF64':
+            samples, address, size, read = args[1], args[4], args[5], args[6]
+            buf = np.ctypeslib.as_array((ctypes.c_double * size).from_address(address))
+            buf[:] = np.arange(size)
+            read._obj.value = samples if call.available is None else call.available
+        return 0
+    call.available = None
+    class DAQmx(object):
+        # The constants of the missing header.
+        Val_GroupByChannel, Val_GroupByScanNumber = 0, 1
+    monkeypatch.setattr(libnidaqmx, 'DAQmx', DAQmx)
+    monkeypatch.setattr(libnidaqmx, 'CALL', call)
+    monkeypatch.setattr(libnidaqmx, 'get_string_property', lambda name, *args, **kws: 'task')
+    return call
+
+def test_read_into_out(reading_driver):
+    task = libnidaqmx.AnalogInputTask()
+    out = np.zeros((5, 2))
+    result = task.read(out=out)
+    assert result is out
+    assert np.array_equal(out, np.arange(10.0).reshape((5, 2)))
+    out = np.zeros((2, 5))
+    assert task.read(5, fill_mode='group_by_channel', out=out) is out
+    for bad in [np.zeros((4, 2)), np.zeros((5, 2), dtype=np.float32), np.zeros((5, 4))[:, ::2]]:
+        with pytest.raises(ValueError):
+            task.read(5, out=bad)
+
+def test_short_read_is_truncated(reading_driver):
+    task = libnidaqmx.AnalogInputTask()
+    reading_driver.available = 3
+    out = np.zeros((5, 2))
+    result = task.read(out=out)
+    assert result.shape == (3, 2) and np.shares_memory(result, out)
+    assert task.read(5).shape == (3, 2)
+    assert task.read(5, fill_mode='group_by_channel').shape == (2, 3)
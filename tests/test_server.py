@@ -0,0 +1,157 @@
+import os
+import time
+import socket
+import threading
+
+import numpy as np
+import pytest
+
+from nidaqmx.server import AcquisitionServer, AcquisitionClient, _send_buffers
+
+class FakeTask(object):
+    """
+    Returns chunks of consecutive numbers; a read blocks until the
+    next chunk is due or the task is stopped, like a driver read.
+    """
+
+    def __init__(self, period=1e-3, fail_after=None):
+        self.period = period
+        self.fail_after = fail_after
+        self.reads = 0
+        self.running = False
+        self.cleared = False
+        self._stopped = threading.Event()
+
+    def start(self):
+        self.running = True
+        self._stopped.clear()
+
+    def stop(self):
+        self.running = False
+        self._stopped.set()
+
+    def clear(self):
+        self.cleared = True
+
+    def to_config(self):
+        return dict(name='fake')
+
+    def read(self, samples_per_channel, timeout=10.0):
+        if self._stopped.wait(self.period):
+            raise RuntimeError('Read aborted')
+        if self.fail_after is not None and self.reads >= self.fail_after:
+            raise RuntimeError('Device removed')
+        start = self.reads * samples_per_channel
+        self.reads += 1
+        return np.arange(start, start + samples_per_channel, dtype=np.float64)
+
+@pytest.fixture
+def server(tmpdir):
+    server = AcquisitionServer(os.path.join(str(tmpdir), 'server.sock'))
+    server.start()
+    yield server
+    server.stop()
+
+def read_chunks(client, count):
+    chunks = []
+    while len(chunks) < count:
+        name, index, data = client.read(timeout=10.0)
+        assert data is not None
+        chunks.append((name, index, data))
+    return chunks
+
+def test_stream(server):
+    server.tasks['ai'] = task = FakeTask()
+    client = AcquisitionClient(server.address)
+    client.subscribe('ai')
+    client.start_task('ai', samples_per_channel=10)
+    chunks = read_chunks(client, 5)
+    for i, (name, index, data) in enumerate(chunks):
+        assert name == 'ai' and index == 10 * i
+        assert np.array_equal(data[:, 0], np.arange(index, index + 10))
+    client.stop_task('ai')
+    assert not task.running
+    assert not client.request('list')['streams']
+    client.close()
+
+def test_stop_aborts_read(server):
+    # Without aborting the read, stopping would wait for the read
+    # period of a minute.
+    server.tasks['ai'] = FakeTask(period=60.0)
+    client = AcquisitionClient(server.address)
+    client.subscribe('ai')
+    client.start_task('ai', samples_per_channel=10)
+    t = time.time()
+    client.stop_task('ai')
+    assert time.time() - t < 10.0
+    name, index, data = client.read(timeout=10.0)
+    assert (name, index, data) == ('ai', 0, None)
+    assert 'ai' not in client.errors
+    client.close()
+
+def test_restart_after_failure(server):
+    server.tasks['ai'] = FakeTask(fail_after=2)
+    client = AcquisitionClient(server.address)
+    client.subscribe('ai')
+    client.start_task('ai', samples_per_channel=10)
+    read_chunks(client, 2)
+    name, index, data = client.read(timeout=10.0)
+    assert (name, index, data) == ('ai', 20, None)
+    assert 'Device removed' in client.errors['ai']
+    server.tasks['ai'].fail_after = None
+    client.start_task('ai', samples_per_channel=10)
+    assert read_chunks(client, 1)[0][1] == 0
+    client.clear_task('ai')
+    assert not client.list_tasks()
+    client.close()
+
+def test_commands_not_blocked_by_stop(server):
+    server.tasks['slow'] = FakeTask()
+    server.tasks['ai'] = FakeTask()
+    slow = server.tasks['slow']
+    stop = slow.stop
+    def slow_stop():
+        stop()
+        time.sleep(1.0)
+    slow.stop = slow_stop
+    first, second = AcquisitionClient(server.address), AcquisitionClient(server.address)
+    first.start_task('slow', samples_per_channel=10)
+    thread = threading.Thread(target=first.stop_task, args=('slow',))
+    thread.start()
+    time.sleep(0.1)
+    t = time.time()
+    assert 'slow' in second.list_tasks()
+    with pytest.raises(RuntimeError):
+        second.start_task('slow', samples_per_channel=10) # still stopping
+    second.start_task('ai', samples_per_channel=10)
+    assert time.time() - t < 0.5
+    thread.join()
+    second.start_task('slow', samples_per_channel=10)
+    first.close()
+    second.close()
+
+class NoSendmsg(object):
+    # A socket without sendmsg, as on Python 2.
+
+    def __init__(self, sock):
+        self.sendall = sock.sendall
+
+@pytest.mark.parametrize('vectored', [True, False])
+def test_send_buffers(vectored):
+    sender, receiver = socket.socketpair()
+    # Larger than the socket buffers, so that sends are partial.
+    buffers = [b'header', np.arange(1 << 20, dtype=np.float64), b'', np.arange(3.0)]
+    expected = b''.join(bytes(memoryview(buf)) for buf in buffers)
+    received = []
+    def receive():
+        n = 0
+        while n < len(expected):
+            received.append(receiver.recv(1 << 16))
+            n += len(received[-1])
+    thread = threading.Thread(target=receive)
+    thread.start()
+    _send_buffers(sender if vectored else NoSendmsg(sender), buffers)
+    thread.join(10.0)
+    sender.close()
+    receiver.close()
+    assert b''.join(received) == expected
@@ -0,0 +1,66 @@
+import numpy as np
+import pytest
+
+from nidaqmx.spectrum import WelchEstimator, get_window
+
+def reference_welch(x, rate, nperseg, noverlap, window):
+    # One-sided Welch PSD without detrending, per channel.
+    step = nperseg - noverlap
+    w = get_window(window, nperseg)
+    nseg = (x.shape[0] - nperseg) // step + 1
+    segments = np.array([x[i * step:i * step + nperseg] for i in range(nseg)])
+    power = np.abs(np.fft.rfft(segments * w[:, None], axis=1)) ** 2
+    power /= rate * (w ** 2).sum()
+    if nperseg % 2:
+        power[:, 1:] *= 2
+    else:
+        power[:, 1:-1] *= 2
+    return power.mean(axis=0).T, power.transpose(0, 2, 1)
+
+def signal(n=5000, channels=2, seed=0):
+    rng = np.random.RandomState(seed)
+    t = np.arange(n) / 1000.0
+    return np.column_stack([np.sin(2 * np.pi * 50 * (c + 1) * t) + rng.normal(0, 0.1, n)
+                            for c in range(channels)])
+
+@pytest.mark.parametrize('nperseg,noverlap', [(256, None), (255, 100), (128, 0)])
+def test_psd_matches_reference(nperseg, noverlap):
+    x = signal()
+    welch = WelchEstimator(1000, nperseg=nperseg, noverlap=noverlap)
+    welch.update(x)
+    if noverlap is None:
+        noverlap = nperseg // 2
+    psd, _ = reference_welch(x, 1000, nperseg, noverlap, 'hann')
+    assert welch.segments == (len(x) - nperseg) // (nperseg - noverlap) + 1
+    assert np.allclose(welch.get_psd(), psd)
+    assert np.allclose(welch.frequencies, np.fft.rfftfreq(nperseg, 1e-3))
+
+def test_chunk_split_invariance():
+    x = signal()
+    whole = WelchEstimator(1000, nperseg=256, frames=8)
+    whole.update(x)
+    split = WelchEstimator(1000, nperseg=256, frames=8)
+    bounds = np.cumsum([0, 1, 100, 255, 0, 1000, 3644])
+    for start, end in zip(bounds[:-1], bounds[1:]):
+        split.update(x[start:end])
+    assert split.segments == whole.segments
+    assert np.allclose(split.get_psd(), whole.get_psd())
+    assert np.allclose(split.get_spectrogram(), whole.get_spectrogram())
+
+def test_spectrogram_holds_last_frames():
+    x = signal()
+    welch = WelchEstimator(1000, nperseg=256, window='hamming', frames=5)
+    for i in range(0, len(x), 300):
+        welch.update(x[i:i + 300])
+    _, frames = reference_welch(x, 1000, 256, 128, 'hamming')
+    assert np.allclose(welch.get_spectrogram(), frames[-5:])
+
+def test_group_by_channel_and_reset():
+    x = signal()
+    welch = WelchEstimator(1000, nperseg=256, fill_mode='group_by_channel')
+    welch.update(x.T)
+    psd = welch.get_psd().copy()
+    welch.reset()
+    assert welch.segments == 0
+    welch.update(x.T)
+    assert np.allclose(welch.get_psd(), psd)
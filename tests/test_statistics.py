@@ -0,0 +1,52 @@
+import numpy as np
+import pytest
+
+from nidaqmx.statistics import StreamStatistics, statistics_names
+
+def expected(data):
+    return np.array([data.mean(axis=0), np.sqrt((data ** 2).mean(axis=0)),
+                     data.min(axis=0), data.max(axis=0),
+                     data.max(axis=0) - data.min(axis=0)])
+
+def chunks(seed=0, sizes=(100, 37, 1, 250, 64, 0, 99)):
+    rng = np.random.RandomState(seed)
+    return [rng.normal(0.5, 2.0, size=(n, 4)) for n in sizes]
+
+def test_cumulative_and_windowed():
+    stats = StreamStatistics(window=3)
+    parts = chunks()
+    for part in parts:
+        stats.update(part)
+    data = np.concatenate(parts)
+    assert stats.cumulative.count == len(data)
+    assert np.allclose(stats.cumulative.array, expected(data))
+    # the window covers the last three non-empty chunks
+    window = np.concatenate([p for p in parts if len(p)][-3:])
+    assert stats.windowed.count == len(window)
+    assert np.allclose(stats.windowed.array, expected(window))
+    for i, name in enumerate(statistics_names):
+        assert np.shares_memory(getattr(stats.windowed, name), stats.windowed.array[i])
+
+def test_chunk_split_invariance():
+    data = np.concatenate(chunks())
+    whole = StreamStatistics()
+    whole.update(data)
+    split = StreamStatistics()
+    for i in range(0, len(data), 13):
+        split.update(data[i:i + 13])
+    assert np.allclose(split.cumulative.array, whole.cumulative.array)
+
+def test_group_by_channel():
+    data = np.concatenate(chunks())
+    stats = StreamStatistics(fill_mode='group_by_channel')
+    stats.update(data.T)
+    assert np.allclose(stats.cumulative.array, expected(data))
+
+def test_reset_and_channel_check():
+    stats = StreamStatistics()
+    stats.update(np.ones((10, 4)))
+    stats.reset()
+    assert stats.cumulative.count == 0
+    assert not stats.cumulative.array.any()
+    with pytest.raises(ValueError):
+        stats.update(np.ones((10, 3)))
@@ -0,0 +1,155 @@
+import os
+import time
+
+import numpy as np
+import pytest
+
+try:
+    from multiprocessing import shared_memory
+except ImportError: # Python < 3.8
+    pytest.skip('multiprocessing.shared_memory is not available', allow_module_level=True)
+
+from nidaqmx.supervisor import Supervisor, _Stream
+
+class CountingTask(object):
+    """
+    Reads consecutive numbers at about 100 kS/s. With a ``crash``
+    file in the definition, the first worker to see the file removes
+    it and exits after ``crash_after`` reads.
+    """
+
+    def __init__(self, config):
+        self.config = config
+        self.reads = 0
+
+    def start(self):
+        pass
+
+    def stop(self):
+        pass
+
+    def clear(self):
+        pass
+
+    def read(self, samples_per_channel, timeout=10.0):
+        crash = self.config.get('crash')
+        if (crash and self.reads >= self.config.get('crash_after', 0)
+                and os.path.exists(crash)):
+            os.unlink(crash)
+            os._exit(1)
+        time.sleep(samples_per_channel * 1e-5)
+        start = self.reads * samples_per_channel
+        self.reads += 1
+        return np.arange(start, start + samples_per_channel, dtype=np.float64)[:, None]
+
+class ListSubscriber(object):
+    """
+    Returns the chunks of a stream of consecutive numbers.
+    """
+
+    def __init__(self):
+        self.chunks = []
+        self.written = 0
+
+    def push(self, n):
+        self.chunks.append((self.written, np.arange(self.written, self.written + n,
+                                                    dtype=np.float64)[:, None]))
+        self.written += n
+
+    def read(self, timeout=10.0):
+        if self.chunks:
+            return self.chunks.pop(0)
+        return self.written, np.empty((0, 1))
+
+    def close(self):
+        pass
+
+def make_supervisor(names, capacity):
+    # The state of a started supervisor, without workers and reading
+    # from ListSubscribers.
+    supervisor = Supervisor([dict(name=name) for name in names], 10,
+                            groups=[[i] for i in range(len(names))], capacity=capacity)
+    supervisor._workers = supervisor._controls = []
+    supervisor._streams = [_Stream(name, None) for name in names]
+    for stream in supervisor._streams:
+        stream.subscriber = ListSubscriber()
+    supervisor.index = 0
+    supervisor.dropped = dict((name, 0) for name in names)
+    return supervisor
+
+def test_merge():
+    sup = make_supervisor(['a', 'b'], 100)
+    a, b = [stream.subscriber for stream in sup._streams]
+    a.push(30)
+    b.push(20)
+    index, data = sup.read(timeout=0)
+    assert index == 0
+    assert np.array_equal(data['a'][:, 0], np.arange(20))
+    assert np.array_equal(data['b'][:, 0], np.arange(20))
+    b.push(20)
+    index, data = sup.read(timeout=0)
+    assert index == 20 and data['a'].shape[0] == 10
+    assert sup.read(timeout=0) == (30, None)
+
+def test_lagging_task_bounds_buffer():
+    sup = make_supervisor(['a', 'b'], 100)
+    a, b = [stream.subscriber for stream in sup._streams]
+    for i in range(100):
+        a.push(10)
+        assert sup.read(timeout=0) == (0, None)
+        assert sum(c[1].shape[0] for c in sup._streams[0].chunks) <= 100
+    assert sup.dropped == dict(a=900, b=0)
+    b.push(950)
+    index, data = sup.read(timeout=0)
+    assert sup.dropped == dict(a=900, b=850)
+    assert index == 900
+    assert np.array_equal(data['a'][:, 0], np.arange(900, 950))
+    assert np.array_equal(data['b'][:, 0], np.arange(900, 950))
+
+def read_samples(supervisor, count, timeout=30.0):
+    chunks = []
+    deadline = time.time() + timeout
+    while sum(data['a'].shape[0] for index, data in chunks) < count:
+        assert time.time() < deadline
+        index, data = supervisor.read(timeout=1.0)
+        if data is not None:
+            chunks.append((index, data))
+    return chunks
+
+def test_workers():
+    supervisor = Supervisor([dict(name='a'), dict(name='b')], 100, groups=[[0], [1]],
+                            capacity=10000, create_task=CountingTask)
+    supervisor.start()
+    try:
+        chunks = read_samples(supervisor, 2000)
+    finally:
+        supervisor.stop()
+    assert chunks[0][0] == 0
+    expected = 0
+    for index, data in chunks:
+        assert index == expected
+        assert data['a'].shape == data['b'].shape
+        assert np.array_equal(data['a'][:, 0], np.arange(index, index + data['a'].shape[0]))
+        assert np.array_equal(data['b'], data['a'])
+        expected = index + data['a'].shape[0]
+    assert supervisor.restarts == [0, 0]
+
+def test_worker_restart(tmpdir):
+    crash = os.path.join(str(tmpdir), 'crash')
+    open(crash, 'w').close()
+    supervisor = Supervisor([dict(name='a'), dict(name='b', crash=crash, crash_after=5)],
+                            100, groups=[[0], [1]], capacity=10000,
+                            create_task=CountingTask)
+    supervisor.start()
+    try:
+        read_samples(supervisor, 500)
+        deadline = time.time() + 30.0
+        while supervisor.restarts == [0, 0]:
+            assert time.time() < deadline
+            supervisor.read(timeout=0.1)
+        chunks = read_samples(supervisor, 1000)
+    finally:
+        supervisor.stop()
+    assert supervisor.restarts == [0, 1]
+    for index, data in chunks:
+        assert data['a'].shape == data['b'].shape
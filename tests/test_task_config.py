@@ -0,0 +1,184 @@
+import json
+
+import pytest
+
+from nidaqmx import libnidaqmx
+
+class Constants(object):
+    """Gives every DAQmx constant a distinct value."""
+    def __init__(self):
+        self._values = iter(range(1000, 2000))
+    def __getattr__(self, name):
+        value = next(self._values)
+        setattr(self, name, value)
+        return value
+
+@pytest.fixture
+def driver(monkeypatch):
+    """
+    Replaces the driver calls so that tasks can be created and
+    configured without a device. Returns the list of called
+    functions.
+    """
+    calls = []
+    monkeypatch.setattr(libnidaqmx, 'CALL', lambda name, *args: calls.append(name) or 0)
+    monkeypatch.setattr(libnidaqmx, 'get_string_property', lambda name, *args, **kws: 'task')
+    return calls
+
+def test_set_calls_per_channel(driver):
+    task = libnidaqmx.AnalogInputTask()
+    task.set_max('Dev1/ai0', value=5.0)
+    task.set_max('Dev1/ai1', value=2.0)
+    task.set_min(channel_name='Dev1/ai0', value=-5.0)
+    task.set_max('Dev1/ai0', 4.0)
+    task.set_buffer_size(sz=1000)
+    task.set_buffer_size(2000)
+    assert task.to_config()['calls'] == [
+        ['set_max', ['Dev1/ai1'], {'value': 2.0}],
+        ['set_min', [], {'channel_name': 'Dev1/ai0', 'value': -5.0}],
+        ['set_max', ['Dev1/ai0', 4.0], {}],
+        ['set_buffer_size', [2000], {}]]
+
+def test_round_trip(driver):
+    task = libnidaqmx.AnalogInputTask()
+    task.set_max('Dev1/ai0', value=5.0)
+    task.set_max('Dev1/ai1', value=2.0)
+    config = json.loads(json.dumps(task.to_config()))
+    del driver[:]
+    copy = libnidaqmx.Task.from_config(config, commit=False)
+    assert isinstance(copy, libnidaqmx.AnalogInputTask)
+    assert copy.to_config()['calls'] == config['calls']
+    assert driver.count('SetAIMax') == 2
+
+def test_clear_once(driver):
+    cleared = []
+    class Library(object):
+        @staticmethod
+        def DAQmxClearTask(task):
+            cleared.append(task.value)
+            return 0
+    task = libnidaqmx.AnalogInputTask()
+    task.value = 7
+    task.clear(Library)
+    task.clear(Library)
+    task.__del__(Library)
+    assert cleared == [7]
+    assert task.value == 0
+
+@pytest.fixture
+def describing_driver(monkeypatch):
+    """
+    Replaces the driver calls with a single analog input channel
+    whose properties are taken from ``numbers`` and ``strings``;
+    other getters fail as if the property did not apply. Returns
+    the list of called functions.
+    """
+    calls = []
+    numbers = dict(GetTaskNumChans=1, GetBufInputBufSize=1000,
+                   GetSampClkRate=1e4, GetAIMax=5.0, GetAIMin=-5.0)
+    strings = dict(GetTaskName='task', GetTaskChannels='Dev1/ai0',
+                   GetTaskDevices='Dev1', GetPhysicalChanName='Dev1/ai0')
+    def call(name, *args):
+        calls.append(name)
+        if name.startswith('Get'):
+            if name not in numbers:
+                raise libnidaqmx.NIDAQmxRuntimeError(name)
+            args[-1]._obj.value = numbers[name]
+        return 0
+    def get_string_property(name, *args, **kws):
+        calls.append(name)
+        if name not in strings:
+            raise libnidaqmx.NIDAQmxRuntimeError(name)
+        return strings[name]
+    monkeypatch.setattr(libnidaqmx, 'CALL', call)
+    monkeypatch.setattr(libnidaqmx, 'get_string_property', get_string_property)
+    monkeypatch.setattr(libnidaqmx, 'DAQmx', Constants())
+    numbers['GetChanType'] = libnidaqmx.DAQmx.Val_AI
+    return calls
+
+def test_describe(describing_driver):
+    task = libnidaqmx.AnalogInputTask()
+    description = task.describe()
+    assert description.name == 'task'
+    assert description.devices == ('Dev1',)
+    assert description.buffer_size == 1000
+    assert description.sample_clock_rate == 1e4
+    assert [channel.name for channel in description.channels] == ['Dev1/ai0']
+    assert description.channels[0].max == 5.0
+    assert description.channels[0].min == -5.0
+    del describing_driver[:]
+    assert task.describe() is description
+    assert describing_driver == []
+
+@pytest.mark.parametrize('change', [
+    lambda task: task.set_max('Dev1/ai0', 4.0),
+    lambda task: task.reset_max('Dev1/ai0'),
+    lambda task: task.configure_timing_sample_clock(rate=2e4),
+    lambda task: task.create_voltage_channel('Dev1/ai1'),
+    lambda task: task.disable_reference_trigger()])
+def test_describe_invalidated(describing_driver, change):
+    task = libnidaqmx.AnalogInputTask()
+    description = task.describe()
+    change(task)
+    assert task.describe() is not description
+
+def test_describe_not_invalidated(describing_driver):
+    task = libnidaqmx.AnalogInputTask()
+    description = task.describe()
+    task.get_max('Dev1/ai0')
+    libnidaqmx.CALL('SetAIMax', task, 'Dev1/ai0', 4.0)
+    assert task.describe() is description
+
+@pytest.fixture
+def committing_driver(driver, monkeypatch):
+    """
+    Like `driver`, with the DAQmx constants that task state changes
+    need.
+    """
+    monkeypatch.setattr(libnidaqmx, 'DAQmx', Constants())
+    return driver
+
+def test_apply_config(committing_driver):
+    config = {'configure_timing_sample_clock': dict(rate=1e4),
+              ('set_max', 'Dev1/ai0'): 5.0,
+              'set_buffer_size': 1000}
+    task = libnidaqmx.AnalogInputTask()
+    del committing_driver[:]
+    assert len(task.apply_config(config)) == 3
+    assert committing_driver == ['CfgSampClkTiming', 'SetAIMax',
+                                 'SetBufInputBufSize', 'TaskControl']
+    del committing_driver[:]
+    assert task.apply_config(dict(config)) == []
+    assert committing_driver == []
+
+def test_apply_config_changed_set(committing_driver):
+    config = {'configure_timing_sample_clock': dict(rate=1e4),
+              ('set_max', 'Dev1/ai0'): 5.0,
+              'set_buffer_size': 1000}
+    task = libnidaqmx.AnalogInputTask()
+    task.apply_config(config)
+    del committing_driver[:]
+    config['set_buffer_size'] = 2000
+    assert task.apply_config(config) == ['set_buffer_size']
+    assert committing_driver == ['SetBufInputBufSize', 'TaskControl']
+
+def test_apply_config_changed_configure(committing_driver):
+    config = {'configure_timing_sample_clock': dict(rate=1e4),
+              ('set_max', 'Dev1/ai0'): 5.0,
+              'set_buffer_size': 1000}
+    task = libnidaqmx.AnalogInputTask()
+    task.apply_config(config)
+    del committing_driver[:]
+    config['configure_timing_sample_clock'] = dict(rate=2e4)
+    assert len(task.apply_config(config)) == 3
+    assert committing_driver == ['CfgSampClkTiming', 'SetAIMax',
+                                 'SetBufInputBufSize', 'TaskControl']
+
+def test_apply_config_after_direct_change(committing_driver):
+    config = {('set_max', 'Dev1/ai0'): 5.0, 'set_buffer_size': 1000}
+    task = libnidaqmx.AnalogInputTask()
+    task.apply_config(config)
+    task.set_max('Dev1/ai0', 4.0)
+    del committing_driver[:]
+    assert len(task.apply_config(config, commit=False)) == 2
+    assert committing_driver == ['SetAIMax', 'SetBufInputBufSize']
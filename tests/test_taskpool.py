@@ -0,0 +1,106 @@
+import pytest
+
+from nidaqmx.taskpool import TaskPool
+
+class FakeTask(object):
+    """
+    Records the state changes that the pool makes.
+    """
+    name = 'task'
+
+    def __init__(self, fail_stop=False):
+        self.states = []
+        self.fail_stop = fail_stop
+        self.cleared = False
+
+    def alter_state(self, state):
+        self.states.append(state)
+
+    def stop(self):
+        if self.fail_stop:
+            raise RuntimeError('stop failed')
+        self.states.append('stop')
+
+    def clear(self):
+        self.cleared = True
+
+def test_reuse():
+    pool = TaskPool()
+    with pool.task(FakeTask) as task:
+        assert task.states == ['commit']
+    with pool.task(FakeTask) as again:
+        assert again is task
+    assert task.states == ['commit', 'stop', 'commit', 'stop']
+    assert (pool.created, pool.reused) == (1, 1)
+    assert not task.cleared
+
+def test_definitions_are_kept_apart():
+    def other():
+        return FakeTask()
+    pool = TaskPool()
+    first = pool.acquire(FakeTask)
+    pool.release(first)
+    second = pool.acquire(other)
+    assert second is not first
+    assert pool.acquire(FakeTask) is first
+
+def test_concurrent_acquire():
+    pool = TaskPool()
+    first = pool.acquire(FakeTask)
+    second = pool.acquire(FakeTask)
+    assert first is not second
+    pool.release(first)
+    pool.release(second)
+    assert pool.created == 2
+    assert pool.acquire(FakeTask) in (first, second)
+
+def test_unreserve():
+    pool = TaskPool(state='reserve', release_action='unreserve')
+    with pool.task(FakeTask) as task:
+        pass
+    assert task.states == ['reserve', 'stop', 'unreserve']
+
+def test_max_idle():
+    pool = TaskPool(max_idle=1)
+    first = pool.acquire(FakeTask)
+    second = pool.acquire(FakeTask)
+    pool.release(first)
+    pool.release(second)
+    assert not first.cleared
+    assert second.cleared
+
+def test_discard_on_failed_stop(capsys):
+    pool = TaskPool()
+    task = pool.acquire(lambda: FakeTask(fail_stop=True))
+    pool.release(task)
+    assert task.cleared
+    assert 'stop failed' in capsys.readouterr().err
+    assert not any(pool._idle.values())
+
+def test_discard_on_failed_state():
+    tasks = []
+    class FailingTask(FakeTask):
+        def alter_state(self, state):
+            tasks.append(self)
+            raise RuntimeError('commit failed')
+    pool = TaskPool()
+    with pytest.raises(RuntimeError):
+        pool.acquire(FailingTask)
+    assert tasks[0].cleared
+
+def test_close():
+    pool = TaskPool()
+    idle = pool.acquire(FakeTask)
+    busy = pool.acquire(FakeTask)
+    pool.release(idle)
+    pool.close()
+    assert idle.cleared
+    assert not busy.cleared
+    pool.release(busy)
+    assert busy.cleared
+
+def test_invalid_arguments():
+    with pytest.raises(ValueError):
+        TaskPool(state='start')
+    with pytest.raises(ValueError):
+        TaskPool(release_action='clear')